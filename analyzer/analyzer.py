@@ -1,10 +1,32 @@
 import logging
 import argparse
-import pandas as pd
-from psycopg2 import OperationalError, DataError
+from typing import TYPE_CHECKING, Iterator, List, Optional, Union
 from config.logging_config import setup_logging
-from config.db_setup import db_config
-from api.data_api import DataAPI
+from api.factory import create_data_api
+from api.query_cache import QueryCache
+
+if TYPE_CHECKING:
+    # Results are DataFrames, but the CLI starts without importing pandas
+    import pandas as pd
+
+
+def returns_rows(query: str) -> bool:
+    """
+    Whether the query is a SELECT, possibly with a WITH clause, as DataAPI.select_data
+    decides which queries it caches.
+    """
+    return query.lstrip().lower().startswith(("select", "with"))
+
+
+def column_widths(df: "pd.DataFrame") -> List[int]:
+    """
+    The width of every column of df as printed by to_string(index=False), by position
+    since query results may repeat a column name.
+    """
+    return [
+        max(map(len, df.iloc[:, [position]].to_string(index=False).split("\n")))
+        for position in range(df.shape[1])
+    ]
 
 
 class Netflix:
@@ -14,8 +36,9 @@ class Netflix:
     """
 
     def __init__(self):
-        self.api = DataAPI(db_config)
-        setup_logging()
+        # The backend is selected by NETFLIX_DB_BACKEND, PostgreSQL by default
+        self.api = create_data_api()
+        self.use_cache = False
 
     def execute_sql(self, query):
         """
@@ -26,37 +49,162 @@ class Netflix:
         :return: Either a DataFrame (for SELECT queries) or a status message string.
         """
         try:
-            if query.lower().startswith("select"):
-                data = self.api.select_data(query)
+            if returns_rows(query):
+                data = self.api.select_data(query, use_cache=self.use_cache)
                 return data if not data.empty else "No data found."
             else:
                 rows_affected = self.api.update_data(query)
                 return f"Query executed successfully - Rows affected: {rows_affected}"
-        except (OperationalError, DataError) as db_err:
+        except self.api.database_errors as db_err:
             logging.error(f"Database error executing query: {db_err}")
             return "A database error occurred. Please check the logs for details."
         except Exception as e:
             logging.error(f"Unexpected error executing query: {e}")
             return "An unexpected error occurred. Please check the logs for details."
 
+    def stream_sql(
+        self, query: str, chunk_size: int = 10_000
+    ) -> Iterator[Union["pd.DataFrame", str]]:
+        """
+        Executes a SQL query and yields SELECT results in DataFrame chunks of chunk_size
+        rows, so results of any size can be printed or exported with flat memory use.
+        Other queries, empty results and errors yield a single status message.
+
+        :param query: The SQL query to be executed.
+        :param chunk_size: The number of rows per yielded DataFrame.
+        """
+        if not returns_rows(query):
+            yield self.execute_sql(query)
+            return
+        if self.use_cache:
+            # Cached results are read whole, so they are only sliced into chunks
+            result = self.execute_sql(query)
+            if isinstance(result, str):
+                yield result
+                return
+            for start in range(0, len(result), chunk_size):
+                yield result.iloc[start : start + chunk_size]
+            return
+        try:
+            found = False
+            for chunk in self.api.stream_data(query, chunk_size=chunk_size):
+                found = True
+                yield chunk
+            if not found:
+                yield "No data found."
+        except self.api.database_errors as db_err:
+            logging.error(f"Database error executing query: {db_err}")
+            yield "A database error occurred. Please check the logs for details."
+        except Exception as e:
+            logging.error(f"Unexpected error executing query: {e}")
+            yield "An unexpected error occurred. Please check the logs for details."
+
     def analyze(self):
         """
         Parses the command line arguments for a SQL query and executes it,
-        then prints the result. DataFrames are printed in a readable format.
+        then prints the result chunk by chunk. DataFrames are printed in a readable
+        format, or appended to a CSV file when --output is given.
         """
         parser = argparse.ArgumentParser(
             description="Netflix Data API Command Line Tool"
         )
-        parser.add_argument("sql_query", help="SQL query to execute")
+        parser.add_argument("sql_query", nargs="?", help="SQL query to execute")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=10_000,
+            help="Number of rows fetched and printed at a time",
+        )
+        parser.add_argument(
+            "--output",
+            help="Export SELECT results to this CSV file instead of printing",
+        )
+        parser.add_argument(
+            "--cache",
+            action="store_true",
+            help="Serve SELECT results from the local query cache and store them in it",
+        )
+        parser.add_argument(
+            "--cache-ttl",
+            type=float,
+            default=3600.0,
+            help="Seconds after which a cached result is no longer used",
+        )
+        parser.add_argument(
+            "--cache-stats",
+            action="store_true",
+            help="Print the query cache hit/miss statistics",
+        )
+        parser.add_argument(
+            "--clear-query-cache",
+            action="store_true",
+            help="Delete every cached query result",
+        )
         args = parser.parse_args()
 
-        result = self.execute_sql(args.sql_query)
-        if isinstance(result, pd.DataFrame):
-            print(result.to_string(index=False))  # Pretty print the DataFrame
+        cache = QueryCache(ttl=args.cache_ttl)
+        if args.clear_query_cache:
+            cache.clear()
+            print("Query cache cleared.")
+        if args.sql_query is None:
+            if not (args.cache_stats or args.clear_query_cache):
+                parser.error("sql_query is required")
         else:
-            print(result)
+            # Attached even without --cache, so that writes invalidate cached results
+            self.api.query_cache = cache
+            self.use_cache = args.cache
+            self.print_results(
+                self.stream_sql(args.sql_query, args.chunk_size), args.output
+            )
+        if args.cache_stats:
+            self.print_cache_stats(cache)
+
+    def print_cache_stats(self, cache: QueryCache) -> None:
+        """
+        Prints the hit, miss, eviction and invalidation counters of the query cache.
+        """
+        stats = cache.stats()
+        print(
+            f"Query cache: {stats['hits']} hits, {stats['misses']} misses "
+            f"(hit ratio {stats['hit_ratio']:.1%}), {stats['evictions']} evictions, "
+            f"{stats['invalidations']} invalidations, {stats['entries']} entries, "
+            f"{stats['bytes'] / 1024 ** 2:.1f} of {stats['max_bytes'] / 1024 ** 2:.0f} MB"
+        )
+
+    def print_results(
+        self,
+        results: Iterator[Union["pd.DataFrame", str]],
+        output: Optional[str] = None,
+    ) -> None:
+        """
+        Prints (or exports to CSV) results as they arrive, writing the header only once.
+        Printed chunks use the column widths of the first one, so their rows line up
+        with its header; wider values only widen their own line.
+
+        :param results: DataFrame chunks or status messages, as yielded by stream_sql.
+        :param output: Optional path of a CSV file to write DataFrame chunks to.
+        """
+        header = True
+        widths = None
+        for result in results:
+            if isinstance(result, str):
+                print(result)
+                continue
+            if output:
+                result.to_csv(
+                    output, mode="w" if header else "a", header=header, index=False
+                )
+            else:
+                if widths is None:
+                    widths = column_widths(result)
+                # Pretty print the DataFrame
+                print(result.to_string(index=False, header=header, col_space=widths))
+            header = False
+        if output and not header:
+            print(f"Results written to {output}")
 
 
 if __name__ == "__main__":
+    setup_logging()
     analyzer = Netflix()
     analyzer.analyze()
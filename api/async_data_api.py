@@ -0,0 +1,226 @@
+import asyncio
+import io
+import time
+import logging
+import pandas as pd
+from typing import Any, Dict, Optional
+from psycopg import OperationalError, DataError, sql
+from psycopg.conninfo import make_conninfo
+from psycopg_pool import AsyncConnectionPool
+from api.data_api import COPY_NULL, iter_chunks
+from api.sql_types import sql_type_for
+
+# ConnectionPool settings of config.db_setup.pool_config and their psycopg_pool names
+POOL_SETTINGS = {
+    "min_size": "min_size",
+    "max_size": "max_size",
+    "idle_timeout": "max_idle",
+    "checkout_timeout": "timeout",
+}
+
+
+class AsyncDataAPI:
+    """
+    Asyncio counterpart of DataAPI, built on a psycopg 3 AsyncConnectionPool, so that
+    one event loop can run many queries concurrently. Statements are prepared on the
+    server and cached per connection once they ran prepare_threshold times. The pool
+    is opened by open() or by entering the AsyncDataAPI as an async context manager.
+    """
+
+    def __init__(
+        self,
+        db_config: Dict[str, Any],
+        pool_config: Optional[Dict[str, Any]] = None,
+        prepare_threshold: Optional[int] = 0,
+        prepared_max: int = 100,
+    ):
+        """
+        :param db_config: A dictionary containing the database connection parameters.
+        :param pool_config: Optional settings of the connection pool, in the format of
+                            config.db_setup.pool_config (min_size, max_size,
+                            idle_timeout, checkout_timeout).
+        :param prepare_threshold: Number of executions after which a statement is
+                                  prepared; 0 prepares every statement on first use and
+                                  None disables prepared statements (e.g. behind
+                                  PgBouncer in transaction mode).
+        :param prepared_max: Maximum number of prepared statements kept per connection.
+        """
+        conninfo = make_conninfo(
+            host=db_config.get("host"),
+            dbname=db_config.get("database"),
+            user=db_config.get("user"),
+            password=db_config.get("password") or None,
+        )
+        settings = {
+            POOL_SETTINGS[name]: value
+            for name, value in (pool_config or {}).items()
+            if name in POOL_SETTINGS
+        }
+        self.prepared_max = prepared_max
+        self.pool = AsyncConnectionPool(
+            conninfo,
+            kwargs={"prepare_threshold": prepare_threshold},
+            configure=self._configure,
+            open=False,
+            **settings,
+        )
+
+    async def _configure(self, connection) -> None:
+        connection.prepared_max = self.prepared_max
+
+    async def open(self) -> None:
+        """
+        Opens the connection pool and waits for its min_size connections.
+        """
+        await self.pool.open(wait=True)
+
+    async def close(self) -> None:
+        """
+        Closes the connection pool.
+        """
+        await self.pool.close()
+
+    async def __aenter__(self) -> "AsyncDataAPI":
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def select_data(self, query: str, params=None) -> pd.DataFrame:
+        """
+        Selects data from the database using a pooled connection. Returns a DataFrame.
+        """
+        try:
+            async with self.pool.connection() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(query, params)
+                    if cursor.description is None:
+                        return pd.DataFrame()
+                    columns = [column.name for column in cursor.description]
+                    rows = await cursor.fetchall()
+            return pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+        except Exception as e:
+            logging.error(f"Error fetching data: {e}")
+            raise
+
+    async def update_data(self, query: str, params=None) -> None:
+        """
+        Executes DML queries
+        """
+        try:
+            async with self.pool.connection() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(query, params)
+                    rows_affected = cursor.rowcount
+                await conn.commit()
+            logging.debug(
+                "Query executed successfully: %s - Rows affected: %s",
+                query,
+                rows_affected,
+            )
+        except (OperationalError, DataError) as e:
+            logging.error(f"Error updating data: {e}")
+            raise
+
+    async def administrative_query(
+        self, query: str, params=None, autocommit: bool = False
+    ) -> None:
+        """
+        Executes administrative queries such as permissions & constraints.
+
+        :param autocommit: Run the query outside a transaction block, as required by
+                           e.g. CREATE INDEX CONCURRENTLY and VACUUM.
+        """
+        try:
+            async with self.pool.connection() as conn:
+                await conn.set_autocommit(autocommit)
+                try:
+                    await conn.execute(query, params, prepare=False)
+                    await conn.commit()
+                    logging.info(f"Admin query executed successfully: {query}")
+                finally:
+                    # Pooled connections are handed out in transaction mode
+                    if autocommit and not conn.closed:
+                        await conn.set_autocommit(False)
+        except (OperationalError, DataError) as e:
+            logging.error(f"Error executing admin query: {e}")
+            raise
+
+    async def load_data_to_db(
+        self,
+        dataframe: pd.DataFrame,
+        table_name: str,
+        column_types: Optional[Dict[str, str]] = None,
+        if_exists: str = "replace",
+    ) -> None:
+        """
+        Loads data from a DataFrame into the specified table in the database through
+        COPY FROM STDIN, in a single transaction, replacing the table if it already
+        exists unless if_exists is "append".
+
+        :param dataframe: The DataFrame to load.
+        :param table_name: The name of the target table.
+        :param column_types: Optional SQL types overriding the ones inferred from dtypes.
+        :param if_exists: "replace" recreates the table, "append" adds the rows to it
+                          (creating it if needed).
+        """
+        if if_exists not in ("replace", "append"):
+            raise ValueError(f"Unsupported if_exists value: {if_exists}")
+        column_types = column_types or {}
+        table = sql.Identifier(table_name)
+        columns = [sql.Identifier(str(column)) for column in dataframe.columns]
+        definitions = sql.SQL(", ").join(
+            sql.SQL("{} {}").format(
+                identifier,
+                sql.SQL(column_types.get(column) or sql_type_for(dtype)),
+            )
+            for identifier, (column, dtype) in zip(columns, dataframe.dtypes.items())
+        )
+        copy = sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv, NULL {})").format(
+            table, sql.SQL(", ").join(columns), sql.Literal(COPY_NULL)
+        )
+        try:
+            logging.info(f"Starting to load data into {table_name}")
+            start = time.perf_counter()
+            async with self.pool.connection() as conn:
+                async with conn.cursor() as cursor:
+                    if if_exists == "replace":
+                        await cursor.execute(
+                            sql.SQL("DROP TABLE IF EXISTS {}").format(table)
+                        )
+                    await cursor.execute(
+                        sql.SQL("CREATE TABLE IF NOT EXISTS {} ({})").format(
+                            table, definitions
+                        )
+                    )
+                    async with cursor.copy(copy) as writer:
+                        for chunk in iter_chunks(dataframe):
+                            # Serialized off the event loop, so large loads do not
+                            # stall the other queries
+                            await writer.write(await asyncio.to_thread(_to_csv, chunk))
+                await conn.commit()
+            elapsed = time.perf_counter() - start
+            rows = len(dataframe)
+            logging.info(
+                f"Data loaded successfully into {table_name}: {rows} rows in "
+                f"{elapsed:.2f}s ({rows / max(elapsed, 1e-9):.0f} rows/s)"
+            )
+        except Exception as e:
+            logging.error(f"Error loading data to database: {e}")
+            raise
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """
+        Returns connection pool statistics (pool size, waiting requests, wait time, ...).
+        """
+        return self.pool.get_stats()
+
+
+def _to_csv(chunk: pd.DataFrame) -> str:
+    """
+    Serializes a chunk of rows to the CSV text COPY FROM STDIN expects.
+    """
+    buffer = io.StringIO()
+    chunk.to_csv(buffer, index=False, header=False, na_rep=COPY_NULL)
+    return buffer.getvalue()
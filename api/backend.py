@@ -0,0 +1,171 @@
+from abc import ABC, abstractmethod
+from functools import lru_cache, wraps
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple
+from typing import Type, Union
+from api.query_cache import read_tables, written_tables
+from monitoring.metrics import metrics
+
+if TYPE_CHECKING:
+    # Only for annotations, so importing a backend does not import pandas
+    import pandas as pd
+
+
+class DataBackend(ABC):
+    """
+    The interface shared by the storage backends: DataAPI on PostgreSQL and the
+    embedded SQLiteDataAPI and DuckDBDataAPI. Queries use the %s placeholders of
+    psycopg2 on every backend. Backends without PostgreSQL's constraint, index and
+    role statements set supports_constraints to False, and the pipeline skips
+    those phases for them. database_errors lists the exception types of the
+    database driver for failed connections and invalid data, so callers can handle
+    them without importing the driver.
+    """
+
+    name = "base"
+    supports_constraints = False
+    query_cache = None
+    database_errors: Tuple[Type[Exception], ...] = ()
+
+    @abstractmethod
+    def select_data(
+        self, query: str, params=None, use_cache: bool = True
+    ) -> "pd.DataFrame":
+        """
+        Runs a query and returns its result as a DataFrame.
+        """
+
+    @abstractmethod
+    def update_data(self, query: str, params=None) -> None:
+        """
+        Executes DML queries
+        """
+
+    @abstractmethod
+    def insert_rows(
+        self, table_name: str, columns: List[str], rows: List[Tuple]
+    ) -> int:
+        """
+        Inserts many rows in one transaction and returns their number.
+        """
+
+    @abstractmethod
+    def administrative_query(
+        self, query: str, params=None, autocommit: bool = False
+    ) -> None:
+        """
+        Executes administrative queries such as permissions & constraints.
+        """
+
+    @abstractmethod
+    def load_data_to_db(
+        self,
+        dataframe: "pd.DataFrame",
+        table_name: str,
+        method: str = "copy",
+        column_types: Optional[Dict[str, str]] = None,
+        if_exists: str = "replace",
+    ) -> None:
+        """
+        Loads a DataFrame into a table, replacing the table unless if_exists is
+        "append".
+        """
+
+    def stream_data(
+        self, query: str, params=None, chunk_size: int = 10_000, as_frames: bool = True
+    ) -> Iterator[Union["pd.DataFrame", List[Tuple]]]:
+        """
+        Yields the result of a query in chunks of chunk_size rows. Embedded backends
+        hold the result in process memory anyway, so it is read whole and sliced.
+        """
+        result = self.select_data(query, params)
+        for start in range(0, len(result), chunk_size):
+            chunk = result.iloc[start : start + chunk_size]
+            yield chunk if as_frames else list(chunk.itertuples(index=False, name=None))
+
+    def primary_key(self, table_name: str) -> Optional[List[str]]:
+        """
+        The primary key columns of a table. Embedded backends report None, so
+        incremental loads replace their tables.
+        """
+        return None
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """
+        Embedded backends use a single connection, reported like a pool of size one.
+        """
+        return {"size": 1, "max_size": 1}
+
+    def close(self) -> None:
+        """
+        Releases the connections of the backend.
+        """
+
+
+def qmark(query: str) -> str:
+    """
+    Converts psycopg2 %s placeholders to the ? placeholders of SQLite and DuckDB.
+    """
+    return query.replace("%s", "?").replace("%%", "%")
+
+
+def instrumented(function: Callable) -> Callable:
+    """
+    Records every call of a backend method in the db_call metrics, labeled with the
+    backend, the method, the statement type and the table. The rows returned (or
+    loaded) are added to db_call_rows_total. Labels are only computed while metrics
+    are enabled.
+    """
+
+    @wraps(function)
+    def wrapper(self, *args, **kwargs):
+        if not metrics.enabled:
+            return function(self, *args, **kwargs)
+        labels = lambda: call_labels(self.name, function.__name__, args, kwargs)
+        with metrics.timed("db_call", labels) as timer:
+            result = function(self, *args, **kwargs)
+            if function.__name__ == "load_data_to_db":
+                timer.rows = len(args[0] if args else kwargs["dataframe"])
+            elif isinstance(result, int):
+                timer.rows = result
+            elif result is not None:
+                timer.rows = len(result)
+            return result
+
+    return wrapper
+
+
+def call_labels(backend: str, method: str, args: Tuple, kwargs: Dict) -> Dict[str, str]:
+    """
+    The metric labels of a backend call: the statement type is the first keyword of
+    the query, and the table the first one it writes or, failing that, reads.
+    """
+    if method == "load_data_to_db":
+        table = args[1] if len(args) > 1 else kwargs["table_name"]
+        return {
+            "backend": backend,
+            "method": method,
+            "statement": "load",
+            "table": table,
+        }
+    if method == "insert_rows":
+        table = args[0] if args else kwargs["table_name"]
+        return {
+            "backend": backend,
+            "method": method,
+            "statement": "insert",
+            "table": table,
+        }
+    statement, table = _statement_labels(args[0] if args else kwargs["query"])
+    return {
+        "backend": backend,
+        "method": method,
+        "statement": statement,
+        "table": table,
+    }
+
+
+@lru_cache(maxsize=1024)
+def _statement_labels(query: str) -> Tuple[str, str]:
+    keyword = query.split(None, 1)[0].lower() if query.strip() else ""
+    tables = sorted(written_tables(query)) or sorted(read_tables(query))
+    return keyword, tables[0] if tables else ""
@@ -1,77 +1,575 @@
+import io
+import threading
+import time
+import uuid
 import pandas as pd
 import logging
-from sqlalchemy import create_engine
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from api.backend import DataBackend, instrumented
+from api.query_cache import QueryCache, written_tables
+from api.sql_types import sql_type_for
 from database.database_connection import DatabaseConnection
-from psycopg2 import OperationalError, DataError
+from psycopg2 import OperationalError, DataError, sql
+from psycopg2.extras import execute_values
 
+# Target size of the in-memory CSV buffer sent per COPY round trip
+COPY_BUFFER_BYTES = 32 * 1024 * 1024
+COPY_NULL = "\\N"
 
-class DataAPI:
+
+class DataAPI(DataBackend):
     """
     Provides an interface for performing database operations such as
     selecting data, updating data, performing administrative queries, and
-    loading data into the database from a DataFrame.
+    loading data into the database from a DataFrame. This is the PostgreSQL
+    backend; see api.factory.create_data_api for the embedded ones.
     """
 
-    def __init__(self, db_config):
+    name = "postgres"
+    supports_constraints = True
+    database_errors = (OperationalError, DataError)
+
+    def __init__(
+        self,
+        db_config,
+        pool_config: Optional[Dict[str, Any]] = None,
+        query_cache: Optional[QueryCache] = None,
+    ):
+        """
+        Initializes the DataAPI with database configuration settings and the
+        settings of the connection pool shared by all of its queries.
+
+        :param query_cache: Optional cache of select_data results; writes made through
+                            this DataAPI invalidate the entries of the tables written.
         """
-        Initializes the DataAPI with database configuration settings
+        self.db_connection = DatabaseConnection(db_config, pool_config)
+        self.query_cache = query_cache
+        self.db_config = db_config
+        self._engine = None
+        self._engine_lock = threading.Lock()
+
+    @property
+    def engine(self):
         """
-        self.db_connection = DatabaseConnection(db_config)
-        self.engine = create_engine(
-            f"postgresql+psycopg2://"
-            f"{db_config['user']}:{db_config['password']}@{db_config['host']}/{db_config['database']}"
-        )
+        The SQLAlchemy engine, only needed by DataFrame.to_sql. SQLAlchemy is imported
+        and the engine created on first use, so the COPY and query paths never pay
+        for them. Tables loaded concurrently share a single engine and its pool.
+        """
+        if self._engine is None:
+            with self._engine_lock:
+                if self._engine is None:
+                    from sqlalchemy import create_engine
+
+                    db_config = self.db_config
+                    self._engine = create_engine(
+                        f"postgresql+psycopg2://"
+                        f"{db_config['user']}:{db_config['password']}@{db_config['host']}/{db_config['database']}"
+                    )
+        return self._engine
 
-    def select_data(self, query: str) -> pd.DataFrame:
+    @instrumented
+    def select_data(
+        self, query: str, params=None, use_cache: bool = True
+    ) -> pd.DataFrame:
         """
-        Selects data from the database. Returns a DataFrame.
+        Selects data from the database using a pooled connection. Returns a DataFrame.
+        With a query cache, SELECT results are served from and stored in the cache
+        unless use_cache is False.
         """
+        cacheable = (
+            use_cache
+            and self.query_cache is not None
+            and query.lstrip().lower().startswith(("select", "with"))
+        )
+        if cacheable:
+            cached = self.query_cache.get(query, params)
+            if cached is not None:
+                return cached
         try:
-            df = pd.read_sql(query, self.engine)
-            return df
+            started = time.time()
+            with self.db_connection.connect() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(query, params)
+                    if cursor.description is None:
+                        return pd.DataFrame()
+                    columns = [column.name for column in cursor.description]
+                    rows = cursor.fetchall()
+            result = pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+            if cacheable:
+                self.query_cache.put(query, params, result, started)
+            return result
         except Exception as e:
             logging.error(f"Error fetching data: {e}")
             raise
 
+    def stream_data(
+        self, query: str, params=None, chunk_size: int = 10_000, as_frames: bool = True
+    ) -> Iterator[Union[pd.DataFrame, List[Tuple]]]:
+        """
+        Streams the result of a SELECT query through a server-side (named) cursor, so
+        only one chunk of rows is held in memory at a time.
+
+        :param query: The SELECT query to run.
+        :param params: Optional query parameters.
+        :param chunk_size: Number of rows fetched from the server per chunk.
+        :param as_frames: Yield DataFrames if True, lists of row tuples otherwise.
+        :yield: One DataFrame or list of tuples per chunk; nothing for an empty result.
+        """
+        try:
+            with self.db_connection.connect() as conn:
+                with conn.cursor(name=f"stream_{uuid.uuid4().hex}") as cursor:
+                    cursor.itersize = chunk_size
+                    cursor.execute(query, params)
+                    columns = None
+                    while True:
+                        rows = cursor.fetchmany(chunk_size)
+                        if not rows:
+                            break
+                        if not as_frames:
+                            yield rows
+                            continue
+                        if columns is None:
+                            columns = [column.name for column in cursor.description]
+                        yield pd.DataFrame.from_records(
+                            rows, columns=columns, coerce_float=True
+                        )
+        except Exception as e:
+            logging.error(f"Error streaming data: {e}")
+            raise
+
+    @instrumented
     def update_data(self, query: str, params=None) -> None:
         """
         Executes DML queries
         """
+        self._invalidate(written_tables(query))
         try:
             with self.db_connection.connect() as conn:
                 with conn.cursor() as cursor:
                     cursor.execute(query, params)
                     rows_affected = cursor.rowcount
                     conn.commit()
-                    logging.info(
-                        f"Query executed successfully: {query} - Rows affected: {rows_affected}"
+                    logging.debug(
+                        "Query executed successfully: %s - Rows affected: %s",
+                        query,
+                        rows_affected,
                     )
         except (OperationalError, DataError) as e:
             logging.error(f"Error updating data: {e}")
             raise
+        finally:
+            self._invalidate(written_tables(query))
 
-    def administrative_query(self, query: str, params=None) -> None:
+    @instrumented
+    def insert_rows(
+        self, table_name: str, columns: List[str], rows: List[Tuple]
+    ) -> int:
         """
-        Executes administrative queries such as permissions & constraints.
+        Inserts many rows with a single multi-row INSERT in one transaction.
+
+        :param table_name: The name of the target table.
+        :param columns: The columns the row values are given for.
+        :param rows: The row tuples to insert.
+        :return: The number of inserted rows.
         """
+        if not rows:
+            return 0
+        self._invalidate([table_name])
+        query = sql.SQL("INSERT INTO {} ({}) VALUES %s").format(
+            sql.Identifier(table_name),
+            sql.SQL(", ").join(sql.Identifier(column) for column in columns),
+        )
         try:
             with self.db_connection.connect() as conn:
                 with conn.cursor() as cursor:
-                    cursor.execute(query, params)
-                    conn.commit()
-                    logging.info(f"Admin query executed successfully: {query}")
+                    execute_values(
+                        cursor, query.as_string(cursor), rows, page_size=len(rows)
+                    )
+                conn.commit()
+            logging.debug("Inserted %d rows into %s", len(rows), table_name)
+            return len(rows)
+        except (OperationalError, DataError) as e:
+            logging.error(f"Error inserting rows: {e}")
+            raise
+        finally:
+            self._invalidate([table_name])
+
+    @instrumented
+    def administrative_query(
+        self, query: str, params=None, autocommit: bool = False
+    ) -> None:
+        """
+        Executes administrative queries such as permissions & constraints.
+
+        :param autocommit: Run the query outside a transaction block, as required by
+                           e.g. CREATE INDEX CONCURRENTLY and VACUUM.
+        """
+        self._invalidate(written_tables(query))
+        try:
+            with self.db_connection.connect() as conn:
+                conn.autocommit = autocommit
+                try:
+                    with conn.cursor() as cursor:
+                        cursor.execute(query, params)
+                        conn.commit()
+                        logging.info(f"Admin query executed successfully: {query}")
+                finally:
+                    # Pooled connections are handed out in transaction mode
+                    if autocommit and not conn.closed:
+                        conn.autocommit = False
         except (OperationalError, DataError) as e:
             logging.error(f"Error executing admin query: {e}")
             raise
+        finally:
+            self._invalidate(written_tables(query))
 
-    def load_data_to_db(self, dataframe: pd.DataFrame, table_name: str) -> None:
+    @instrumented
+    def load_data_to_db(
+        self,
+        dataframe: pd.DataFrame,
+        table_name: str,
+        method: str = "copy",
+        column_types: Optional[Dict[str, str]] = None,
+        if_exists: str = "replace",
+    ) -> None:
         """
-        Loads data from a DataFrame into the specified table in the database.
+        Loads data from a DataFrame into the specified table in the database,
+        replacing the table if it already exists unless if_exists is "append".
+
+        :param dataframe: The DataFrame to load.
+        :param table_name: The name of the target table.
+        :param method: "copy" streams the rows through COPY FROM STDIN and falls back to
+                       DataFrame.to_sql if that fails; "to_sql" uses to_sql directly.
+        :param column_types: Optional SQL types overriding the ones inferred from dtypes.
+        :param if_exists: "replace" recreates the table, "append" adds the rows to it
+                          (creating it if needed), e.g. for the chunks of a large file.
         """
+        if if_exists not in ("replace", "append"):
+            raise ValueError(f"Unsupported if_exists value: {if_exists}")
+        self._invalidate([table_name])
         try:
             logging.info(f"Starting to load data into {table_name}")
-            dataframe.to_sql(table_name, self.engine, if_exists="replace", index=False)
-            logging.info(f"Data loaded successfully into {table_name}")
+            start = time.perf_counter()
+            if method == "copy":
+                try:
+                    self._copy_dataframe(dataframe, table_name, column_types, if_exists)
+                except Exception as e:
+                    logging.warning(
+                        f"COPY into {table_name} failed, falling back to to_sql: {e}"
+                    )
+                    self._to_sql(dataframe, table_name, if_exists)
+            else:
+                self._to_sql(dataframe, table_name, if_exists)
+            elapsed = time.perf_counter() - start
+            rows = len(dataframe)
+            logging.info(
+                f"Data loaded successfully into {table_name}: {rows} rows in "
+                f"{elapsed:.2f}s ({rows / max(elapsed, 1e-9):.0f} rows/s)"
+            )
         except Exception as e:
             logging.error(f"Error loading data to database: {e}")
             raise
+        finally:
+            self._invalidate([table_name])
+
+    def _to_sql(
+        self, dataframe: pd.DataFrame, table_name: str, if_exists: str = "replace"
+    ) -> None:
+        dataframe.to_sql(table_name, self.engine, if_exists=if_exists, index=False)
+
+    def _copy_dataframe(
+        self,
+        dataframe: pd.DataFrame,
+        table_name: str,
+        column_types: Optional[Dict[str, str]] = None,
+        if_exists: str = "replace",
+    ) -> None:
+        """
+        Recreates the table (or creates it if missing, when appending) with explicit
+        column types and streams the DataFrame into it through COPY FROM STDIN, one
+        in-memory CSV chunk at a time, in a single transaction.
+        """
+        column_types = column_types or {}
+        table = sql.Identifier(table_name)
+        columns = [sql.Identifier(str(column)) for column in dataframe.columns]
+        definitions = sql.SQL(", ").join(
+            sql.SQL("{} {}").format(
+                identifier,
+                sql.SQL(column_types.get(column) or sql_type_for(dtype)),
+            )
+            for identifier, (column, dtype) in zip(columns, dataframe.dtypes.items())
+        )
+
+        with self.db_connection.connect() as conn:
+            with conn.cursor() as cursor:
+                if if_exists == "replace":
+                    cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(table))
+                cursor.execute(
+                    sql.SQL("CREATE TABLE IF NOT EXISTS {} ({})").format(
+                        table, definitions
+                    )
+                )
+                _copy_rows(conn, cursor, table, dataframe)
+            conn.commit()
+
+    def primary_key(self, table_name: str) -> Optional[List[str]]:
+        """
+        Returns the primary key columns of a table, in key order.
+
+        :return: The column names, an empty list if the table has no primary key, or
+                 None if the table does not exist.
+        """
+        with self.db_connection.connect() as conn:
+            with conn.cursor() as cursor:
+                relation = sql.Identifier(table_name).as_string(conn)
+                cursor.execute("SELECT to_regclass(%s)", (relation,))
+                if cursor.fetchone()[0] is None:
+                    return None
+                cursor.execute(
+                    """
+                    SELECT a.attname
+                    FROM pg_index i
+                    JOIN pg_attribute a
+                      ON a.attrelid = i.indrelid AND a.attnum = ANY (i.indkey)
+                    WHERE i.indrelid = to_regclass(%s) AND i.indisprimary
+                    ORDER BY array_position(i.indkey::int2[], a.attnum)
+                    """,
+                    (relation,),
+                )
+                return [row[0] for row in cursor.fetchall()]
+
+    def upsert_dataframes(
+        self,
+        dataframes: Dict[str, pd.DataFrame],
+        primary_keys: Dict[str, List[str]],
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Incrementally applies DataFrames to existing tables in a single transaction,
+        instead of replacing the tables, so their constraints, indexes and unrelated
+        rows are kept. Every DataFrame is copied into a temporary staging table shaped
+        like its target. Rows whose key is no longer staged are deleted, new keys are
+        inserted, and existing rows are updated only when a column actually changed,
+        with INSERT ... ON CONFLICT DO UPDATE. Deletes run from the last table to the
+        first and upserts from the first to the last, so with referenced tables listed
+        first, foreign keys hold at every step.
+
+        :param dataframes: The new contents of each table, referenced tables first.
+        :param primary_keys: The primary key columns of each table, which must be
+                             backed by a primary key or unique index.
+        :return: Per table: inserted, updated, deleted and skipped (null key) rows,
+                 and the seconds spent on the table.
+        :raises ValueError: If the columns of a DataFrame differ from its table's.
+        """
+        self._invalidate(dataframes)
+        stats = {
+            table_name: {"inserted": 0, "updated": 0, "deleted": 0, "skipped": 0}
+            for table_name in dataframes
+        }
+        timings = {table_name: 0.0 for table_name in dataframes}
+        with self.db_connection.connect() as conn:
+            with conn.cursor() as cursor:
+                for table_name, dataframe in dataframes.items():
+                    start = time.perf_counter()
+                    self._stage_dataframe(conn, cursor, table_name, dataframe)
+                    timings[table_name] += time.perf_counter() - start
+
+                for table_name in reversed(list(dataframes)):
+                    start = time.perf_counter()
+                    cursor.execute(
+                        _delete_missing_statement(table_name, primary_keys[table_name])
+                    )
+                    stats[table_name]["deleted"] = cursor.rowcount
+                    timings[table_name] += time.perf_counter() - start
+
+                for table_name, dataframe in dataframes.items():
+                    start = time.perf_counter()
+                    key = primary_keys[table_name]
+                    cursor.execute(
+                        sql.SQL("SELECT count(*) FROM {} WHERE {}").format(
+                            sql.Identifier(f"stage_{table_name}"),
+                            sql.SQL(" OR ").join(
+                                sql.SQL("{} IS NULL").format(sql.Identifier(column))
+                                for column in key
+                            ),
+                        )
+                    )
+                    stats[table_name]["skipped"] = cursor.fetchone()[0]
+                    cursor.execute(
+                        _upsert_statement(table_name, key, list(dataframe.columns))
+                    )
+                    inserted, updated = cursor.fetchone()
+                    stats[table_name]["inserted"] = inserted
+                    stats[table_name]["updated"] = updated
+                    timings[table_name] += time.perf_counter() - start
+            conn.commit()
+        self._invalidate(dataframes)
+
+        for table_name, table_stats in stats.items():
+            table_stats["seconds"] = timings[table_name]
+            if table_stats["skipped"]:
+                logging.warning(
+                    f"Skipped {table_stats['skipped']} rows of {table_name} "
+                    f"with a null primary key"
+                )
+            logging.info(
+                f"Upserted {table_name}: {table_stats['inserted']} inserted, "
+                f"{table_stats['updated']} updated, {table_stats['deleted']} deleted "
+                f"in {timings[table_name]:.2f}s"
+            )
+        return stats
+
+    def _stage_dataframe(
+        self, conn, cursor, table_name: str, dataframe: pd.DataFrame
+    ) -> None:
+        """
+        Copies a DataFrame into a temporary stage_<table> table with the columns and
+        types of the target table, dropped when the transaction ends.
+        """
+        stage = sql.Identifier(f"stage_{table_name}")
+        cursor.execute(
+            sql.SQL("CREATE TEMP TABLE {} (LIKE {}) ON COMMIT DROP").format(
+                stage, sql.Identifier(table_name)
+            )
+        )
+        cursor.execute(sql.SQL("SELECT * FROM {} LIMIT 0").format(stage))
+        columns = {column.name for column in cursor.description}
+        if columns != {str(column) for column in dataframe.columns}:
+            raise ValueError(
+                f"Columns of {table_name} changed: the table has {sorted(columns)}, "
+                f"the data has {sorted(map(str, dataframe.columns))}"
+            )
+        _copy_rows(conn, cursor, stage, dataframe)
+        cursor.execute(sql.SQL("ANALYZE {}").format(stage))
+
+    def _invalidate(self, tables) -> None:
+        """
+        Drops the cached results of queries reading any of the given tables. Writes
+        call it before they start and again once they committed: a query that ran
+        during the write may have read the rows from before the commit, and as its
+        entry records the time the query started, the second call makes it stale.
+        """
+        if self.query_cache is not None:
+            try:
+                self.query_cache.invalidate(tables)
+            except OSError as e:
+                logging.error(f"Error invalidating the query cache: {e}")
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """
+        Returns connection pool statistics (checked out, waits, wait time, ...).
+        """
+        return self.db_connection.pool_stats()
+
+    def close(self) -> None:
+        """
+        Closes the pooled connections and disposes of the SQLAlchemy engine, if any.
+        """
+        self.db_connection.close()
+        if self._engine is not None:
+            self._engine.dispose()
+
+
+def _copy_rows(conn, cursor, table: sql.Identifier, dataframe: pd.DataFrame) -> None:
+    """
+    Streams the rows of a DataFrame into an existing table through COPY FROM STDIN,
+    one in-memory CSV chunk at a time.
+    """
+    columns = [sql.Identifier(str(column)) for column in dataframe.columns]
+    statement = (
+        sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv, NULL {})")
+        .format(table, sql.SQL(", ").join(columns), sql.Literal(COPY_NULL))
+        .as_string(conn)
+    )
+    for chunk in iter_chunks(dataframe):
+        buffer = io.StringIO()
+        chunk.to_csv(buffer, index=False, header=False, na_rep=COPY_NULL)
+        buffer.seek(0)
+        cursor.copy_expert(statement, buffer)
+
+
+def _delete_missing_statement(table_name: str, key: List[str]) -> sql.Composed:
+    """
+    DELETE of the rows of a table whose key is not in its staging table.
+    """
+    return sql.SQL(
+        "DELETE FROM {table} AS t WHERE NOT EXISTS "
+        "(SELECT 1 FROM {stage} AS s WHERE {matches})"
+    ).format(
+        table=sql.Identifier(table_name),
+        stage=sql.Identifier(f"stage_{table_name}"),
+        matches=sql.SQL(" AND ").join(
+            sql.SQL("s.{column} = t.{column}").format(column=sql.Identifier(column))
+            for column in key
+        ),
+    )
+
+
+def _upsert_statement(
+    table_name: str, key: List[str], columns: List[str]
+) -> sql.Composed:
+    """
+    INSERT ... ON CONFLICT of the staged rows into a table, updating existing rows
+    only when a non-key column changed, and counting inserted and updated rows.
+    """
+    table = sql.Identifier(table_name)
+    key_list = sql.SQL(", ").join(map(sql.Identifier, key))
+    column_list = sql.SQL(", ").join(map(sql.Identifier, columns))
+    values = [column for column in columns if column not in key]
+    if values:
+        conflict = sql.SQL(
+            "DO UPDATE SET {assignments} WHERE ({current}) IS DISTINCT FROM ({new})"
+        ).format(
+            assignments=sql.SQL(", ").join(
+                sql.SQL("{column} = EXCLUDED.{column}").format(
+                    column=sql.Identifier(column)
+                )
+                for column in values
+            ),
+            current=sql.SQL(", ").join(
+                sql.SQL("{}.{}").format(table, sql.Identifier(column))
+                for column in values
+            ),
+            new=sql.SQL(", ").join(
+                sql.SQL("EXCLUDED.{}").format(sql.Identifier(column))
+                for column in values
+            ),
+        )
+    else:
+        conflict = sql.SQL("DO NOTHING")
+
+    return sql.SQL(
+        "WITH upserted AS ("
+        "INSERT INTO {table} ({columns}) "
+        "SELECT DISTINCT ON ({key}) {columns} FROM {stage} WHERE {not_null} "
+        "ON CONFLICT ({key}) {conflict} "
+        "RETURNING (xmax = 0) AS inserted) "
+        "SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted) "
+        "FROM upserted"
+    ).format(
+        table=table,
+        columns=column_list,
+        key=key_list,
+        stage=sql.Identifier(f"stage_{table_name}"),
+        not_null=sql.SQL(" AND ").join(
+            sql.SQL("{} IS NOT NULL").format(sql.Identifier(column)) for column in key
+        ),
+        conflict=conflict,
+    )
+
+
+def iter_chunks(
+    dataframe: pd.DataFrame, target_bytes: int = COPY_BUFFER_BYTES
+) -> Iterator[pd.DataFrame]:
+    """
+    Splits a DataFrame into row chunks whose estimated in-memory size is close to
+    target_bytes, sampling the first rows to estimate the size of a row.
+    """
+    if dataframe.empty:
+        return
+    sample = dataframe.head(1000)
+    bytes_per_row = max(1, sample.memory_usage(deep=True, index=False).sum()) / len(
+        sample
+    )
+    chunk_size = max(1, int(target_bytes // bytes_per_row))
+    for start in range(0, len(dataframe), chunk_size):
+        yield dataframe.iloc[start : start + chunk_size]
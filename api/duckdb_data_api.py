@@ -0,0 +1,186 @@
+import logging
+import threading
+import time
+import warnings
+import duckdb
+import pandas as pd
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+from api.backend import DataBackend, instrumented, qmark
+from api.sql_types import sql_type_for
+
+# DuckDB scans Arrow-backed string columns through an attribute pandas deprecated
+warnings.filterwarnings(
+    "ignore", message="ArrowStringArray._data", category=FutureWarning
+)
+
+
+class DuckDBDataAPI(DataBackend):
+    """
+    Embedded DuckDB backend for analytical scans: a columnar, vectorized engine that
+    runs in-process, in memory by default or in a database file. Parquet files, such
+    as the normalized tables exported by DataLoader.export_parquet, can be attached as
+    views and are then queried in place without being loaded. Queries run one at a
+    time on a single connection.
+    """
+
+    name = "duckdb"
+    database_errors = (duckdb.OperationalError, duckdb.DataError)
+
+    def __init__(
+        self,
+        database: str = ":memory:",
+        parquet_dir: Optional[Union[str, Path]] = None,
+    ):
+        """
+        :param database: The DuckDB database file, or ":memory:".
+        :param parquet_dir: Optional directory whose <table>.parquet files are attached
+                            as views named after the files.
+        """
+        self.database = database
+        self.connection = duckdb.connect(database)
+        self._lock = threading.Lock()
+        if parquet_dir is not None:
+            self.attach_parquet(parquet_dir)
+
+    def attach_parquet(self, directory: Union[str, Path]) -> List[str]:
+        """
+        Creates (or replaces) one view per Parquet file of a directory.
+
+        :return: The names of the attached tables.
+        """
+        tables = []
+        with self._lock:
+            for path in sorted(Path(directory).glob("*.parquet")):
+                self.connection.execute(
+                    f'CREATE OR REPLACE VIEW "{path.stem}" AS '
+                    f"SELECT * FROM read_parquet('{path.resolve()}')"
+                )
+                tables.append(path.stem)
+        logging.info(f"Attached {len(tables)} Parquet tables from {directory}")
+        return tables
+
+    @instrumented
+    def select_data(
+        self, query: str, params=None, use_cache: bool = True
+    ) -> pd.DataFrame:
+        """
+        Selects data from the database. Returns a DataFrame. use_cache is accepted for
+        compatibility with DataAPI; results are not cached.
+        """
+        try:
+            with self._lock:
+                cursor = self.connection.execute(qmark(query), params or [])
+                if cursor.description is None:
+                    return pd.DataFrame()
+                return cursor.df()
+        except Exception as e:
+            logging.error(f"Error fetching data: {e}")
+            raise
+
+    @instrumented
+    def update_data(self, query: str, params=None) -> None:
+        """
+        Executes DML queries
+        """
+        try:
+            with self._lock:
+                self.connection.execute(qmark(query), params or [])
+            logging.debug("Query executed successfully: %s", query)
+        except duckdb.Error as e:
+            logging.error(f"Error updating data: {e}")
+            raise
+
+    @instrumented
+    def insert_rows(
+        self, table_name: str, columns: List[str], rows: List[Tuple]
+    ) -> int:
+        """
+        Inserts many rows in one transaction.
+
+        :return: The number of inserted rows.
+        """
+        if not rows:
+            return 0
+        query = 'INSERT INTO "{}" ({}) VALUES ({})'.format(
+            table_name,
+            ", ".join(f'"{column}"' for column in columns),
+            ", ".join("?" for _ in columns),
+        )
+        try:
+            with self._lock:
+                self.connection.executemany(query, rows)
+            logging.debug("Inserted %d rows into %s", len(rows), table_name)
+            return len(rows)
+        except duckdb.Error as e:
+            logging.error(f"Error inserting rows: {e}")
+            raise
+
+    @instrumented
+    def administrative_query(
+        self, query: str, params=None, autocommit: bool = False
+    ) -> None:
+        """
+        Executes administrative queries. autocommit is accepted for compatibility
+        with DataAPI and has no effect.
+        """
+        try:
+            with self._lock:
+                self.connection.execute(qmark(query), params or [])
+            logging.info(f"Admin query executed successfully: {query}")
+        except duckdb.Error as e:
+            logging.error(f"Error executing admin query: {e}")
+            raise
+
+    @instrumented
+    def load_data_to_db(
+        self,
+        dataframe: pd.DataFrame,
+        table_name: str,
+        method: str = "copy",
+        column_types: Optional[Dict[str, str]] = None,
+        if_exists: str = "replace",
+    ) -> None:
+        """
+        Loads a DataFrame into the specified table with a vectorized scan of the
+        DataFrame, replacing the table if it already exists unless if_exists is
+        "append". The column types are the ones the COPY loader of DataAPI uses.
+        method is accepted for compatibility with DataAPI.
+        """
+        if if_exists not in ("replace", "append"):
+            raise ValueError(f"Unsupported if_exists value: {if_exists}")
+        column_types = column_types or {}
+        definitions = ", ".join(
+            f'"{column}" {column_types.get(column) or sql_type_for(dtype)}'
+            for column, dtype in dataframe.dtypes.items()
+        )
+        columns = ", ".join(f'"{column}"' for column in dataframe.columns)
+        try:
+            start = time.perf_counter()
+            with self._lock:
+                if if_exists == "replace":
+                    self.connection.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+                self.connection.execute(
+                    f'CREATE TABLE IF NOT EXISTS "{table_name}" ({definitions})'
+                )
+                self.connection.register("load_frame", dataframe)
+                try:
+                    self.connection.execute(
+                        f'INSERT INTO "{table_name}" ({columns}) '
+                        f"SELECT {columns} FROM load_frame"
+                    )
+                finally:
+                    self.connection.unregister("load_frame")
+            logging.info(
+                f"Data loaded successfully into {table_name}: {len(dataframe)} rows "
+                f"in {time.perf_counter() - start:.2f}s"
+            )
+        except Exception as e:
+            logging.error(f"Error loading data to database: {e}")
+            raise
+
+    def close(self) -> None:
+        """
+        Closes the connection; an in-memory database is discarded.
+        """
+        self.connection.close()
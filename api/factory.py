@@ -0,0 +1,36 @@
+from typing import Any, Dict, Optional
+from api.backend import DataBackend
+
+BACKENDS = ("postgres", "sqlite", "duckdb")
+
+
+def create_data_api(config: Optional[Dict[str, Any]] = None, **kwargs) -> DataBackend:
+    """
+    Creates the storage backend selected by the configuration. Only the selected
+    backend's module is imported, and the environment (.env) is read on first call.
+
+    :param config: Backend settings (backend, path, parquet_dir); defaults to
+                   config.db_setup.backend_config, read from the environment.
+    :param kwargs: Extra keyword arguments of DataAPI, such as query_cache; ignored
+                   by the embedded backends.
+    :raises ValueError: If the backend is unknown.
+    """
+    from config.db_setup import backend_config, db_config, pool_config
+
+    config = {**backend_config, **(config or {})}
+    backend = config["backend"]
+    if backend == "postgres":
+        from api.data_api import DataAPI
+
+        return DataAPI(db_config, pool_config, **kwargs)
+    if backend == "sqlite":
+        from api.sqlite_data_api import SQLiteDataAPI
+
+        return SQLiteDataAPI(config.get("path") or ":memory:")
+    if backend == "duckdb":
+        from api.duckdb_data_api import DuckDBDataAPI
+
+        return DuckDBDataAPI(
+            config.get("path") or ":memory:", parquet_dir=config.get("parquet_dir")
+        )
+    raise ValueError(f"Unknown storage backend {backend!r}, expected one of {BACKENDS}")
@@ -0,0 +1,395 @@
+import atexit
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Union,
+)
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: the index is only guarded within a process
+    fcntl = None
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DEFAULT_QUERY_CACHE_DIR = Path(__file__).parent / "../data/query_cache"
+INDEX_FILE = "index.json"
+# Held while the index is read, modified and written back
+LOCK_FILE = ".lock"
+
+# Tables read by a query: the items of every FROM list and the tables after JOIN
+FROM_OR_JOIN = re.compile(r"\b(from|join)\s+", re.IGNORECASE)
+# The table name starting a FROM item, if it is not a subquery
+FROM_ITEM_TABLE = re.compile(
+    r"\s*(?:(?:lateral|only)\s+)?(?!(?:lateral|only)\b)"
+    r'((?:"[^"]+"|\w+)(?:\."[^"]+"|\.\w+)*)',
+    re.IGNORECASE,
+)
+# Clauses ending a FROM list
+FROM_LIST_END = re.compile(
+    r"\b(?:where|group|order|having|limit|offset|union|intersect|except|window|"
+    r"fetch|for|returning)\b",
+    re.IGNORECASE,
+)
+# Tables written by a statement
+WRITTEN_TABLES = re.compile(
+    r"\b(?:insert\s+into|update|delete\s+from|truncate(?:\s+table)?|"
+    r"alter\s+table|drop\s+table(?:\s+if\s+exists)?|copy)\s+([\"\w.]+)",
+    re.IGNORECASE,
+)
+
+
+def normalize_sql(query: str) -> str:
+    """
+    Collapses whitespace and drops a trailing semicolon, so formatting differences do
+    not lead to different cache entries.
+    """
+    return re.sub(r"\s+", " ", query).strip().rstrip(";").strip()
+
+
+def _unqualified(name: str) -> str:
+    return name.strip('"').split(".")[-1].strip('"').lower()
+
+
+def _table_names(pattern: re.Pattern, query: str) -> Set[str]:
+    return {_unqualified(match) for match in pattern.findall(query)}
+
+
+def _from_items(query: str, position: int) -> List[str]:
+    """
+    Splits the FROM list starting at position into its comma-separated items,
+    ignoring commas inside parentheses.
+    """
+    items, depth, start = [], 0, position
+    for index in range(position, len(query)):
+        char = query[index]
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            if depth == 0:
+                break
+            depth -= 1
+        elif depth == 0 and char == ",":
+            items.append(query[start:index])
+            start = index + 1
+        elif depth == 0 and (char == ";" or FROM_LIST_END.match(query, index)):
+            break
+    else:
+        index = len(query)
+    items.append(query[start:index])
+    return items
+
+
+def read_tables(query: str) -> Set[str]:
+    """
+    Returns the (lower-cased, unqualified) names of the tables a query reads: every
+    item of a comma-separated FROM list and every joined table. Subqueries are
+    skipped, their own FROM and JOIN clauses being found like any other.
+    """
+    tables = set()
+    for match in FROM_OR_JOIN.finditer(query):
+        if match.group(1).lower() == "join":
+            items = [query[match.end() :]]
+        else:
+            items = _from_items(query, match.end())
+        for item in items:
+            name = FROM_ITEM_TABLE.match(item)
+            if name is not None:
+                tables.add(_unqualified(name.group(1)))
+    return tables
+
+
+def written_tables(query: str) -> Set[str]:
+    """
+    Returns the (lower-cased, unqualified) names of the tables a statement writes.
+    """
+    return _table_names(WRITTEN_TABLES, query)
+
+
+class QueryCache:
+    """
+    Disk cache of SELECT results. Entries are keyed on the normalized SQL text and the
+    query parameters and stored as Feather (Arrow IPC) files. The least recently used
+    entries are evicted when the total size exceeds max_bytes, and entries expire after
+    ttl seconds. Writing to a table invalidates every entry whose query reads it,
+    including entries written by other processes, which are checked against the
+    invalidation time of their tables when read. The cache can be shared by several
+    processes: every read-modify-write of the index holds a lock file (on platforms
+    with fcntl). Hits only update counters in memory, which are merged into the index
+    with its next write or at exit, so hit, miss, eviction and invalidation counters
+    add up across runs.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path] = DEFAULT_QUERY_CACHE_DIR,
+        max_bytes: int = 256 * 1024 * 1024,
+        ttl: float = 3600.0,
+    ):
+        """
+        :param directory: The directory holding the cached results and the index.
+        :param max_bytes: Maximum total size of the cached result files.
+        :param ttl: Seconds after which an entry is no longer used.
+        """
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        # Counters and access times not written to the index yet
+        self._pending_stats = {"hits": 0, "misses": 0}
+        self._pending_access: Dict[str, float] = {}
+        atexit.register(self.flush)
+
+    def key(self, query: str, params=None) -> str:
+        """
+        Returns the cache key of a query and its parameters.
+        """
+        text = json.dumps([normalize_sql(query), params], default=str)
+        return hashlib.sha256(text.encode()).hexdigest()[:32]
+
+    def get(self, query: str, params=None) -> Optional["pd.DataFrame"]:
+        """
+        Returns the cached result of a query, or None on a miss. The index is only
+        written when a stale or unreadable entry is dropped.
+        """
+        # Imported on use, so that reading the table helpers stays cheap
+        import pyarrow as pa
+        import pyarrow.feather as feather
+
+        key = self.key(query, params)
+        index = self._read_index()
+        entry = index["entries"].get(key)
+        if entry is not None and not self._is_fresh(entry, index):
+            self._drop(key, entry)
+            entry = None
+        if entry is None:
+            self._count("misses")
+            return None
+        try:
+            result = feather.read_table(
+                self.directory / f"{key}.feather", memory_map=True
+            ).to_pandas()
+        except (OSError, pa.ArrowInvalid) as e:
+            logging.warning(f"Dropping unreadable query cache entry {key}: {e}")
+            self._drop(key, entry)
+            self._count("misses")
+            return None
+        self._count("hits", key)
+        return result
+
+    def put(
+        self,
+        query: str,
+        params,
+        result: "pd.DataFrame",
+        started: Optional[float] = None,
+    ) -> None:
+        """
+        Stores the result of a query and evicts the least recently used entries if
+        the cache grew beyond max_bytes. Results that Arrow cannot represent, or that
+        are larger than the whole cache, are not stored.
+
+        :param started: The time.time() at which the query started, so that a write
+                        committed while it ran still invalidates the entry.
+        """
+        import pyarrow as pa
+        import pyarrow.feather as feather
+
+        key = self.key(query, params)
+        path = self.directory / f"{key}.feather"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(f".{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            feather.write_feather(
+                pa.Table.from_pandas(result), temporary, compression="lz4"
+            )
+        except (pa.ArrowException, TypeError, ValueError) as e:
+            logging.warning(f"Query result not cached: {e}")
+            temporary.unlink(missing_ok=True)
+            return
+        size = temporary.stat().st_size
+        if size > self.max_bytes:
+            temporary.unlink()
+            return
+
+        with self._updating_index() as index:
+            os.replace(temporary, path)
+            now = time.time()
+            index["entries"][key] = {
+                "sql": normalize_sql(query)[:200],
+                "tables": sorted(read_tables(query)),
+                "bytes": size,
+                "created": started or now,
+                "last_access": now,
+            }
+            self._evict(index)
+
+    def invalidate(self, tables: Iterable[str]) -> int:
+        """
+        Drops every entry whose query reads one of the given tables.
+
+        :return: The number of entries dropped.
+        """
+        tables = {table.lower() for table in tables}
+        if not tables or not self.directory.exists():
+            return 0
+        with self._updating_index() as index:
+            now = time.time()
+            for table in tables:
+                index["invalidated"][table] = now
+            stale = [
+                key
+                for key, entry in index["entries"].items()
+                if tables.intersection(entry["tables"])
+            ]
+            for key in stale:
+                self._remove(index, key)
+            index["stats"]["invalidations"] += len(stale)
+        if stale:
+            logging.info(
+                f"Invalidated {len(stale)} cached queries on {', '.join(sorted(tables))}"
+            )
+        return len(stale)
+
+    def clear(self) -> None:
+        """
+        Deletes every entry and resets the counters.
+        """
+        with self._locked():
+            for path in self.directory.glob("*.feather"):
+                path.unlink(missing_ok=True)
+            (self.directory / INDEX_FILE).unlink(missing_ok=True)
+            self._pending_stats = dict.fromkeys(self._pending_stats, 0)
+            self._pending_access.clear()
+
+    def flush(self) -> None:
+        """
+        Writes the counters and access times kept in memory to the index.
+        """
+        with self._lock:
+            pending = any(self._pending_stats.values()) or self._pending_access
+        if pending and self.directory.exists():
+            with self._updating_index():
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the hit, miss, eviction and invalidation counters, the hit ratio, and
+        the number and total size of the entries.
+        """
+        index = self._read_index()
+        stats = dict(index["stats"])
+        with self._lock:
+            for counter, count in self._pending_stats.items():
+                stats[counter] += count
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        stats["entries"] = len(index["entries"])
+        stats["bytes"] = sum(entry["bytes"] for entry in index["entries"].values())
+        stats["max_bytes"] = self.max_bytes
+        return stats
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """
+        Holds the lock of the cache directory, shared with the other threads and
+        processes using it.
+        """
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(self.directory / LOCK_FILE, "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                yield
+
+    @contextmanager
+    def _updating_index(self) -> Iterator[Dict[str, Any]]:
+        """
+        Reads the index under the lock, with the pending counters and access times
+        merged in, and writes it back once the block modified it.
+        """
+        with self._locked():
+            index = self._read_index()
+            for counter, count in self._pending_stats.items():
+                index["stats"][counter] += count
+            for key, last_access in self._pending_access.items():
+                if key in index["entries"]:
+                    entry = index["entries"][key]
+                    entry["last_access"] = max(entry["last_access"], last_access)
+            yield index
+            self._write_index(index)
+            self._pending_stats = dict.fromkeys(self._pending_stats, 0)
+            self._pending_access.clear()
+
+    def _count(self, counter: str, key: Optional[str] = None) -> None:
+        with self._lock:
+            self._pending_stats[counter] += 1
+            if key is not None:
+                self._pending_access[key] = time.time()
+
+    def _drop(self, key: str, entry: Dict[str, Any]) -> None:
+        """
+        Removes an entry, unless another process replaced it since it was read.
+        """
+        with self._updating_index() as index:
+            current = index["entries"].get(key)
+            if current is not None and current["created"] == entry["created"]:
+                self._remove(index, key)
+
+    def _is_fresh(self, entry: Dict[str, Any], index: Dict[str, Any]) -> bool:
+        if time.time() - entry["created"] > self.ttl:
+            return False
+        return all(
+            index["invalidated"].get(table, 0.0) < entry["created"]
+            for table in entry["tables"]
+        )
+
+    def _evict(self, index: Dict[str, Any]) -> None:
+        total = sum(entry["bytes"] for entry in index["entries"].values())
+        by_access: List[str] = sorted(
+            index["entries"], key=lambda key: index["entries"][key]["last_access"]
+        )
+        for key in by_access:
+            if total <= self.max_bytes:
+                break
+            total -= index["entries"][key]["bytes"]
+            self._remove(index, key)
+            index["stats"]["evictions"] += 1
+
+    def _remove(self, index: Dict[str, Any], key: str) -> None:
+        index["entries"].pop(key, None)
+        (self.directory / f"{key}.feather").unlink(missing_ok=True)
+
+    def _read_index(self) -> Dict[str, Any]:
+        try:
+            index = json.loads((self.directory / INDEX_FILE).read_text())
+        except (FileNotFoundError, ValueError):
+            index = {}
+        index.setdefault("entries", {})
+        index.setdefault("invalidated", {})
+        stats = index.setdefault("stats", {})
+        for counter in ("hits", "misses", "evictions", "invalidations"):
+            stats.setdefault(counter, 0)
+        return index
+
+    def _write_index(self, index: Dict[str, Any]) -> None:
+        temporary = self.directory / f".{INDEX_FILE}.{os.getpid()}.tmp"
+        temporary.write_text(json.dumps(index))
+        os.replace(temporary, self.directory / INDEX_FILE)
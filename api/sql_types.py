@@ -0,0 +1,21 @@
+import pandas as pd
+
+
+def sql_type_for(dtype) -> str:
+    """
+    Maps a pandas dtype to the SQL column type of the tables loaded from it, shared
+    by the PostgreSQL and DuckDB loaders.
+    """
+    if pd.api.types.is_bool_dtype(dtype):
+        return "BOOLEAN"
+    if pd.api.types.is_integer_dtype(dtype):
+        return {1: "SMALLINT", 2: "SMALLINT", 4: "INTEGER"}.get(
+            dtype.itemsize, "BIGINT"
+        )
+    if pd.api.types.is_float_dtype(dtype):
+        return "REAL" if dtype.itemsize == 4 else "DOUBLE PRECISION"
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        if getattr(dtype, "tz", None) is not None:
+            return "TIMESTAMP WITH TIME ZONE"
+        return "TIMESTAMP WITHOUT TIME ZONE"
+    return "TEXT"
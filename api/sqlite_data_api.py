@@ -0,0 +1,151 @@
+import logging
+import sqlite3
+import threading
+import time
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+from api.backend import DataBackend, instrumented, qmark
+
+
+class SQLiteDataAPI(DataBackend):
+    """
+    Embedded SQLite backend, in memory by default or in a database file. It needs no
+    database server, so the recommender, the analyzer, the service and the tests can
+    run in-process. Queries run one at a time on a single connection.
+    """
+
+    name = "sqlite"
+    database_errors = (sqlite3.OperationalError, sqlite3.DataError)
+
+    def __init__(
+        self,
+        database: str = ":memory:",
+        dataframes: Optional[Dict[str, pd.DataFrame]] = None,
+    ):
+        """
+        :param database: The SQLite database file, or ":memory:".
+        :param dataframes: Optional tables to load right away, keyed by table name.
+        """
+        self.database = database
+        self.connection = sqlite3.connect(database, check_same_thread=False)
+        self._lock = threading.Lock()
+        for table_name, dataframe in (dataframes or {}).items():
+            self.load_data_to_db(dataframe, table_name)
+
+    @instrumented
+    def select_data(
+        self, query: str, params=None, use_cache: bool = True
+    ) -> pd.DataFrame:
+        """
+        Selects data from the database. Returns a DataFrame. use_cache is accepted for
+        compatibility with DataAPI; results are not cached.
+        """
+        try:
+            with self._lock:
+                cursor = self.connection.execute(qmark(query), params or ())
+                if cursor.description is None:
+                    self.connection.commit()
+                    return pd.DataFrame()
+                columns = [column[0] for column in cursor.description]
+                rows = cursor.fetchall()
+            return pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+        except Exception as e:
+            logging.error(f"Error fetching data: {e}")
+            raise
+
+    @instrumented
+    def update_data(self, query: str, params=None) -> None:
+        """
+        Executes DML queries
+        """
+        try:
+            with self._lock:
+                cursor = self.connection.execute(qmark(query), params or ())
+                self.connection.commit()
+            logging.debug(
+                "Query executed successfully: %s - Rows affected: %s",
+                query,
+                cursor.rowcount,
+            )
+        except sqlite3.Error as e:
+            logging.error(f"Error updating data: {e}")
+            raise
+
+    @instrumented
+    def insert_rows(
+        self, table_name: str, columns: List[str], rows: List[Tuple]
+    ) -> int:
+        """
+        Inserts many rows in one transaction.
+
+        :return: The number of inserted rows.
+        """
+        if not rows:
+            return 0
+        query = 'INSERT INTO "{}" ({}) VALUES ({})'.format(
+            table_name,
+            ", ".join(f'"{column}"' for column in columns),
+            ", ".join("?" for _ in columns),
+        )
+        try:
+            with self._lock:
+                self.connection.executemany(query, rows)
+                self.connection.commit()
+            logging.debug("Inserted %d rows into %s", len(rows), table_name)
+            return len(rows)
+        except sqlite3.Error as e:
+            logging.error(f"Error inserting rows: {e}")
+            raise
+
+    @instrumented
+    def administrative_query(
+        self, query: str, params=None, autocommit: bool = False
+    ) -> None:
+        """
+        Executes administrative queries. autocommit is accepted for compatibility
+        with DataAPI and has no effect.
+        """
+        try:
+            with self._lock:
+                self.connection.execute(qmark(query), params or ())
+                self.connection.commit()
+            logging.info(f"Admin query executed successfully: {query}")
+        except sqlite3.Error as e:
+            logging.error(f"Error executing admin query: {e}")
+            raise
+
+    @instrumented
+    def load_data_to_db(
+        self,
+        dataframe: pd.DataFrame,
+        table_name: str,
+        method: str = "to_sql",
+        column_types: Optional[Dict[str, str]] = None,
+        if_exists: str = "replace",
+    ) -> None:
+        """
+        Loads a DataFrame into the specified table, replacing the table if it already
+        exists unless if_exists is "append". method and column_types are accepted for
+        compatibility with DataAPI; the column types follow the dtypes.
+        """
+        if if_exists not in ("replace", "append"):
+            raise ValueError(f"Unsupported if_exists value: {if_exists}")
+        try:
+            start = time.perf_counter()
+            with self._lock:
+                dataframe.to_sql(
+                    table_name, self.connection, if_exists=if_exists, index=False
+                )
+            logging.info(
+                f"Data loaded successfully into {table_name}: {len(dataframe)} rows "
+                f"in {time.perf_counter() - start:.2f}s"
+            )
+        except Exception as e:
+            logging.error(f"Error loading data to database: {e}")
+            raise
+
+    def close(self) -> None:
+        """
+        Closes the connection; an in-memory database is discarded.
+        """
+        self.connection.close()
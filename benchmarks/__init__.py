@@ -0,0 +1 @@
+# COMMENT
@@ -0,0 +1,51 @@
+"""
+Times the vectorized DataNormalizer.normalize_credits against the original
+implementation on a scaled-up credits file and checks both outputs are identical.
+
+    python -m benchmarks.normalize_credits --scale 20
+"""
+
+import argparse
+import time
+import pandas as pd
+from benchmarks.reference import legacy_normalize_credits
+from benchmarks.synthetic import CREDITS_ROWS, make_credits, scale_frame
+from scripts.clean_normalize import DataNormalizer
+
+
+def scaled_credits(normalizer: DataNormalizer, scale: int) -> pd.DataFrame:
+    """
+    Repeats raw_credits.csv `scale` times with distinct title ids per copy, or
+    generates a synthetic file of the same size when the CSV is not available.
+    """
+    try:
+        return scale_frame(pd.read_csv(normalizer.credits_path), scale)
+    except FileNotFoundError:
+        return make_credits(CREDITS_ROWS * scale)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=int, default=10)
+    args = parser.parse_args()
+
+    normalizer = DataNormalizer("raw_titles.csv", "raw_credits.csv")
+    credits_df = scaled_credits(normalizer, args.scale)
+    print(f"{len(credits_df)} credit rows")
+
+    start = time.perf_counter()
+    expected = legacy_normalize_credits(normalizer, credits_df)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = normalizer.normalize_credits(credits_df)
+    vectorized_time = time.perf_counter() - start
+
+    for expected_df, actual_df in zip(expected, actual):
+        pd.testing.assert_frame_equal(expected_df, actual_df)
+    print(f"legacy:     {legacy_time:.2f}s")
+    print(f"vectorized: {vectorized_time:.2f}s ({legacy_time / vectorized_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
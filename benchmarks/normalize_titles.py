@@ -0,0 +1,51 @@
+"""
+Times the factorize-based DataNormalizer.normalize_titles against the original
+implementation on a scaled-up titles file and checks both outputs are identical.
+
+    python -m benchmarks.normalize_titles --scale 100
+"""
+
+import argparse
+import time
+import pandas as pd
+from benchmarks.reference import legacy_normalize_titles
+from benchmarks.synthetic import TITLES_ROWS, make_titles, scale_frame
+from scripts.clean_normalize import DataNormalizer
+
+
+def scaled_titles(normalizer: DataNormalizer, scale: int) -> pd.DataFrame:
+    """
+    Repeats raw_titles.csv `scale` times with distinct title ids per copy, or
+    generates a synthetic file of the same size when the CSV is not available.
+    """
+    try:
+        return scale_frame(pd.read_csv(normalizer.titles_path), scale)
+    except FileNotFoundError:
+        return make_titles(TITLES_ROWS * scale)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=int, default=100)
+    args = parser.parse_args()
+
+    normalizer = DataNormalizer("raw_titles.csv", "raw_credits.csv")
+    titles_df = scaled_titles(normalizer, args.scale)
+    print(f"{len(titles_df)} title rows")
+
+    start = time.perf_counter()
+    expected = legacy_normalize_titles(normalizer, titles_df)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = normalizer.normalize_titles(titles_df)
+    factorized_time = time.perf_counter() - start
+
+    for expected_df, actual_df in zip(expected, actual):
+        pd.testing.assert_frame_equal(expected_df, actual_df)
+    print(f"legacy:     {legacy_time:.2f}s")
+    print(f"factorized: {factorized_time:.2f}s ({legacy_time / factorized_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
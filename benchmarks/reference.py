@@ -0,0 +1,91 @@
+"""
+Reference copies of the original row-by-row DataNormalizer implementations. The
+vectorized versions in scripts.clean_normalize must produce identical output; the
+tests and the normalizer benchmarks compare against these.
+"""
+
+import pandas as pd
+from typing import Tuple
+from scripts.clean_normalize import DataNormalizer
+
+
+def legacy_normalize_credits(
+    normalizer: DataNormalizer, credits_df: pd.DataFrame
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    The original normalize_credits: apply(clean_characters) twice and a string merge.
+    """
+    characters_list = (
+        credits_df["character"].apply(normalizer.clean_characters).explode().unique()
+    )
+    characters_df = pd.DataFrame(characters_list, columns=["character_name"]).dropna()
+    characters_df.reset_index(drop=True, inplace=True)
+    characters_df.index += 1
+    characters_df["character_id"] = characters_df.index
+
+    credits_exploded = credits_df.assign(
+        character=credits_df["character"].apply(normalizer.clean_characters)
+    ).explode("character")
+    credits_df = pd.merge(
+        credits_exploded,
+        characters_df,
+        left_on="character",
+        right_on="character_name",
+        how="left",
+    )
+    credits_df = credits_df.dropna(subset=["character_id"])
+    credits_df["character_id"] = credits_df["character_id"].astype(int)
+    credits_df.drop(["index", "character", "character_name"], axis=1, inplace=True)
+    credits_df = credits_df.drop_duplicates()
+
+    return credits_df, characters_df
+
+
+def legacy_normalize_titles(
+    normalizer: DataNormalizer, titles_df: pd.DataFrame
+) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    The original normalize_titles: chained .str list parsing, explode().unique() id
+    tables and string-keyed merges for the link tables.
+    """
+    titles_df = titles_df.copy()
+    for column in ["genres", "production_countries"]:
+        titles_df[column] = (
+            titles_df[column].str.strip("[]").str.replace("'", "").str.split(", ")
+        )
+
+    genres_df = (
+        pd.DataFrame(titles_df["genres"].explode().unique(), columns=["genre"])
+        .dropna()
+        .reset_index(drop=True)
+    )
+    genres_df.index += 1
+    genres_df["genre_id"] = genres_df.index
+
+    countries_df = (
+        pd.DataFrame(
+            titles_df["production_countries"].explode().unique(),
+            columns=["country"],
+        )
+        .dropna()
+        .reset_index(drop=True)
+    )
+    countries_df.index += 1
+    countries_df["country_id"] = countries_df.index
+
+    movie_genres_df = titles_df.explode("genres")[["id", "genres"]]
+    movie_genres_df = movie_genres_df.merge(
+        genres_df, left_on="genres", right_on="genre", how="left"
+    )[["id", "genre_id"]]
+
+    movie_countries_df = titles_df.explode("production_countries")[
+        ["id", "production_countries"]
+    ]
+    movie_countries_df = movie_countries_df.merge(
+        countries_df, left_on="production_countries", right_on="country", how="left"
+    )[["id", "country_id"]]
+
+    movies_df = titles_df.drop(["index", "genres", "production_countries"], axis=1)
+    movies_df = movies_df.drop_duplicates()
+
+    return movies_df, genres_df, countries_df, movie_genres_df, movie_countries_df
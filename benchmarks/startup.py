@@ -0,0 +1,101 @@
+"""
+Measures how long the entry point modules take to import, with python -X importtime
+in fresh interpreters, and lists their slowest imports.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup analyzer.analyzer --top 20
+
+tests/test_startup.py enforces STARTUP_BUDGET_MS and keeps HEAVY_MODULES out of
+the entry points, so short CLI runs and forked workers do not pay for them.
+"""
+
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).parent.parent
+# Upper bound of the import time of each entry point, in milliseconds
+STARTUP_BUDGET_MS = {
+    "recommender.recommender": 400,
+    "analyzer.analyzer": 400,
+}
+# Imported on first use only: data frames, the SQL toolkit, sparse algebra, Arrow,
+# the .env loader and the PostgreSQL driver
+HEAVY_MODULES = ("pandas", "sqlalchemy", "scipy", "pyarrow", "dotenv", "psycopg2")
+
+
+def import_times(module: str) -> Dict[str, Tuple[int, int]]:
+    """
+    Imports a module in a fresh interpreter.
+
+    :return: The self and cumulative microseconds of every module imported, keyed by
+             module name.
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=ROOT,
+    )
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def startup_time(
+    module: str, repeat: int = 3
+) -> Tuple[float, Dict[str, Tuple[int, int]]]:
+    """
+    Imports a module repeat times and keeps the fastest run, which is the least
+    disturbed by other processes.
+
+    :return: The import time in milliseconds and the import times of that run.
+    """
+    runs = [import_times(module) for _ in range(repeat)]
+    best = min(runs, key=lambda times: times[module][1])
+    return best[module][1] / 1000, best
+
+
+def heavy_imports(times: Dict[str, Tuple[int, int]]) -> List[str]:
+    """
+    The HEAVY_MODULES found among the imported modules.
+    """
+    return [module for module in HEAVY_MODULES if module in times]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=list(STARTUP_BUDGET_MS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--top", type=int, default=10, help="Number of slowest imports listed"
+    )
+    args = parser.parse_args()
+
+    over_budget = False
+    for module in args.modules:
+        milliseconds, times = startup_time(module, args.repeat)
+        budget = STARTUP_BUDGET_MS.get(module)
+        heavy = heavy_imports(times)
+        status = "" if budget is None else f" (budget {budget} ms)"
+        print(f"{module}: {milliseconds:.1f} ms{status}")
+        if heavy:
+            print(f"  imports heavy modules: {', '.join(heavy)}")
+        slowest = sorted(times.items(), key=lambda item: item[1][0], reverse=True)
+        for name, (self_us, cumulative_us) in slowest[: args.top]:
+            print(
+                f"  {self_us / 1000:>8.1f} ms self {cumulative_us / 1000:>8.1f} ms  {name}"
+            )
+        over_budget |= bool(heavy) or (budget is not None and milliseconds > budget)
+    sys.exit(over_budget)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+"""
+Times the normalize, load, query and recommend hot paths on raw data scaled 10x to
+1000x and saves the timings as JSON, so runs on different commits can be compared.
+
+    python -m benchmarks.suite --scale 10 --backend duckdb
+    python -m benchmarks.suite --scale 10 --baseline benchmarks/results/<old>.json
+    python -m benchmarks.suite --compare <old>.json <new>.json
+
+The suite replaces the movies, credits, best_movies and recommendations tables of
+the backend. It runs on an in-memory SQLite database by default; PostgreSQL is only
+used with --scratch, against a database that may be overwritten.
+"""
+
+import argparse
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+from api.backend import DataBackend
+from api.factory import BACKENDS, create_data_api
+from benchmarks.synthetic import scaled_inputs
+from recommender.recommender import MoviesRecommender
+from scripts.clean_normalize import DataNormalizer
+
+DEFAULT_RESULTS_DIR = Path(__file__).parent / "results"
+# A benchmark whose median grew by more than this factor is reported as a regression
+DEFAULT_THRESHOLD = 1.2
+
+
+class Benchmark(NamedTuple):
+    """
+    A timed operation. setup builds the callable from the shared context and is not
+    timed; every sample times `number` calls of it.
+    """
+
+    name: str
+    setup: Callable[[Dict[str, Any]], Callable[[], Any]]
+    number: int = 1
+
+
+def _normalize_titles(context: Dict[str, Any]) -> Callable[[], Any]:
+    return lambda: context["normalizer"].normalize_titles(context["titles"])
+
+
+def _normalize_credits(context: Dict[str, Any]) -> Callable[[], Any]:
+    return lambda: context["normalizer"].normalize_credits(context["credits"])
+
+
+def _load(table_name: str) -> Callable[[Dict[str, Any]], Callable[[], Any]]:
+    def setup(context: Dict[str, Any]) -> Callable[[], Any]:
+        dataframe = context["tables"][table_name]
+        return lambda: context["api"].load_data_to_db(dataframe, table_name)
+
+    return setup
+
+
+def _select(query: str) -> Callable[[Dict[str, Any]], Callable[[], Any]]:
+    def setup(context: Dict[str, Any]) -> Callable[[], Any]:
+        return lambda: context["api"].select_data(query)
+
+    return setup
+
+
+def _select_by_id(context: Dict[str, Any]) -> Callable[[], Any]:
+    ids = iter(
+        np.random.default_rng(0).choice(context["tables"]["movies"]["id"], 10**6)
+    )
+    return lambda: context["api"].select_data(
+        "SELECT title FROM movies WHERE id = %s", (next(ids),)
+    )
+
+
+def _random_recommendation(context: Dict[str, Any]) -> Callable[[], Any]:
+    recommender = context["recommender"]
+    recommender.get_candidates()
+    return recommender.get_random_recommendation
+
+
+def _random_recommendation_cold(context: Dict[str, Any]) -> Callable[[], Any]:
+    recommender = context["recommender"]
+
+    def run():
+        recommender.invalidate_candidates()
+        return recommender.get_random_recommendation()
+
+    return run
+
+
+def _record_recommendation(context: Dict[str, Any]) -> Callable[[], Any]:
+    recommender = context["recommender"]
+    return lambda: recommender.record_recommendation("Benchmark title")
+
+
+BENCHMARKS = [
+    Benchmark("normalize_titles", _normalize_titles),
+    Benchmark("normalize_credits", _normalize_credits),
+    Benchmark("load_data_to_db.movies", _load("movies")),
+    Benchmark("load_data_to_db.credits", _load("credits")),
+    Benchmark("select_data.scan", _select("SELECT * FROM movies")),
+    Benchmark(
+        "select_data.aggregate",
+        _select(
+            "SELECT type, release_year, count(*) AS titles, avg(imdb_score) AS score "
+            "FROM movies GROUP BY type, release_year"
+        ),
+    ),
+    Benchmark("select_data.by_id", _select_by_id, number=100),
+    Benchmark("get_random_recommendation", _random_recommendation, number=1000),
+    Benchmark("get_random_recommendation.cold", _random_recommendation_cold, number=10),
+    Benchmark("record_recommendation", _record_recommendation, number=100),
+]
+
+
+def prepare(api: DataBackend, scale: int) -> Dict[str, Any]:
+    """
+    Builds the benchmark context: the scaled raw data, its normalized tables, and
+    the best_movies and recommendations tables the recommender reads and writes.
+    """
+    normalizer = DataNormalizer("raw_titles.csv", "raw_credits.csv")
+    titles_df, credits_df = scaled_inputs(normalizer, scale)
+    movies_df, *_ = normalizer.normalize_titles(titles_df)
+    normalized_credits, _ = normalizer.normalize_credits(credits_df)
+    tables = {"movies": movies_df, "credits": normalized_credits}
+    api.load_data_to_db(movies_df, "movies")
+    api.load_data_to_db(
+        pd.DataFrame({"TITLE": titles_df["title"].head(1_000)}), "best_movies"
+    )
+    api.load_data_to_db(
+        pd.DataFrame({"title": pd.Series([], dtype=str)}), "recommendations"
+    )
+    return {
+        "api": api,
+        "normalizer": normalizer,
+        "titles": titles_df,
+        "credits": credits_df,
+        "tables": tables,
+        "recommender": MoviesRecommender(api, neighbor_index_dir=None),
+    }
+
+
+def run_benchmarks(
+    context: Dict[str, Any],
+    benchmarks: List[Benchmark] = BENCHMARKS,
+    repeat: int = 5,
+    select: Optional[str] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Runs every benchmark (or those whose name contains select) `repeat` times after
+    one untimed warm-up sample.
+
+    :return: Per benchmark, the min, median, mean and standard deviation of the
+             seconds per call, and the repeat and number used.
+    """
+    results = {}
+    for benchmark in benchmarks:
+        if select and select not in benchmark.name:
+            continue
+        run = benchmark.setup(context)
+        samples = []
+        for sample in range(repeat + 1):
+            start = time.perf_counter()
+            for _ in range(benchmark.number):
+                run()
+            if sample:
+                samples.append((time.perf_counter() - start) / benchmark.number)
+        results[benchmark.name] = {
+            "min": min(samples),
+            "median": statistics.median(samples),
+            "mean": statistics.mean(samples),
+            "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+            "repeat": repeat,
+            "number": benchmark.number,
+        }
+        logging.info(
+            f"{benchmark.name}: median {results[benchmark.name]['median'] * 1000:.3f} ms"
+        )
+    return results
+
+
+def compare(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    threshold: float = DEFAULT_THRESHOLD,
+) -> List[Dict[str, Any]]:
+    """
+    Compares the medians of two result files.
+
+    :return: One row per benchmark present in both, with the baseline and current
+             medians, their ratio, and whether it is a regression (ratio above
+             threshold) or an improvement (ratio below 1 / threshold).
+    """
+    rows = []
+    for name, result in current["results"].items():
+        if name not in baseline["results"]:
+            continue
+        before = baseline["results"][name]["median"]
+        ratio = result["median"] / before if before else float("inf")
+        status = "ok"
+        if ratio > threshold:
+            status = "regression"
+        elif ratio < 1 / threshold:
+            status = "improvement"
+        rows.append(
+            {
+                "name": name,
+                "baseline": before,
+                "current": result["median"],
+                "ratio": ratio,
+                "status": status,
+            }
+        )
+    return rows
+
+
+def print_comparison(
+    rows: List[Dict[str, Any]], baseline: Dict[str, Any], current: Dict[str, Any]
+) -> None:
+    """
+    Prints the comparison table, warning when the runs used different settings.
+    """
+    for setting in ("backend", "scale"):
+        if baseline.get(setting) != current.get(setting):
+            print(
+                f"Warning: {setting} differs ({baseline.get(setting)} vs "
+                f"{current.get(setting)}), timings are not comparable"
+            )
+    print(f"{'benchmark':<34} {'baseline':>12} {'current':>12} {'ratio':>7}")
+    for row in rows:
+        print(
+            f"{row['name']:<34} {row['baseline'] * 1000:>10.3f}ms "
+            f"{row['current'] * 1000:>10.3f}ms {row['ratio']:>6.2f}x  {row['status']}"
+        )
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=int, default=10, help="Copies of the raw data")
+    parser.add_argument("--backend", choices=BACKENDS, default="sqlite")
+    parser.add_argument("--db-path", help="Database file of an embedded backend")
+    parser.add_argument(
+        "--scratch",
+        action="store_true",
+        help="Allow the postgres backend, whose tables the suite overwrites",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="Timed samples per benchmark"
+    )
+    parser.add_argument("--select", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--output", help="Result file (benchmarks/results/ by default)")
+    parser.add_argument("--baseline", help="Result file to compare this run against")
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        metavar=("BASELINE", "CURRENT"),
+        help="Compare two result files without running anything",
+    )
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.compare:
+        baseline, current = (
+            json.loads(Path(path).read_text()) for path in args.compare
+        )
+        rows = compare(baseline, current, args.threshold)
+        print_comparison(rows, baseline, current)
+        sys.exit(any(row["status"] == "regression" for row in rows))
+
+    if args.backend == "postgres" and not args.scratch:
+        parser.error("the suite overwrites tables; pass --scratch to run on postgres")
+    config = {"backend": args.backend, "path": args.db_path or ":memory:"}
+    api = create_data_api(config)
+    context = prepare(api, args.scale)
+    report = {
+        "commit": _commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "backend": args.backend,
+        "scale": args.scale,
+        "rows": {"titles": len(context["titles"]), "credits": len(context["credits"])},
+        "results": run_benchmarks(context, repeat=args.repeat, select=args.select),
+    }
+    api.close()
+
+    output = Path(
+        args.output
+        or DEFAULT_RESULTS_DIR / f"{report['commit']}_{args.backend}_x{args.scale}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    for name, result in report["results"].items():
+        print(f"{name:<34} {result['median'] * 1000:>10.3f}ms")
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        rows = compare(baseline, report, args.threshold)
+        print_comparison(rows, baseline, report)
+        sys.exit(any(row["status"] == "regression" for row in rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Synthetic stand-ins for the Kaggle raw_titles.csv / raw_credits.csv files, with the
+same columns and value formats, for benchmarking at arbitrary sizes.
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Tuple
+
+GENRES = [
+    "drama", "comedy", "thriller", "action", "romance", "documentation",
+    "crime", "family", "fantasy", "scifi", "animation", "horror",
+    "reality", "music", "history", "sport", "war", "western", "european",
+]  # fmt: skip
+COUNTRIES = ["US", "IN", "GB", "JP", "KR", "ES", "FR", "CA", "DE", "MX", "BR", "NG"]
+
+# Row counts of the Kaggle files, generated when the files are not available
+TITLES_ROWS = 5_806
+CREDITS_ROWS = 77_801
+
+
+def _list_literals(rng: np.random.Generator, values: list, rows: int) -> np.ndarray:
+    """
+    Builds "['a', 'b']"-style list literals with 0-3 values each.
+    """
+    counts = rng.integers(0, 4, rows)
+    picks = rng.choice(values, (rows, 3))
+    return np.array(
+        [
+            "[" + ", ".join(f"'{v}'" for v in row[:n]) + "]"
+            for row, n in zip(picks, counts)
+        ]
+    )
+
+
+def make_titles(rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Generates a raw_titles-like DataFrame with the given number of rows.
+    """
+    rng = np.random.default_rng(seed)
+    ids = np.array([f"tm{i}" for i in range(rows)])
+    return pd.DataFrame(
+        {
+            "index": np.arange(rows),
+            "id": ids,
+            "title": np.char.add("Title ", np.arange(rows).astype(str)),
+            "type": rng.choice(["MOVIE", "SHOW"], rows, p=[0.65, 0.35]),
+            "release_year": rng.integers(1950, 2023, rows),
+            "age_certification": rng.choice(["PG", "R", "TV-MA", None], rows),
+            "runtime": rng.integers(5, 220, rows),
+            "genres": _list_literals(rng, GENRES, rows),
+            "production_countries": _list_literals(rng, COUNTRIES, rows),
+            "seasons": np.where(
+                rng.random(rows) < 0.35, rng.integers(1, 10, rows), np.nan
+            ),
+            "imdb_id": np.char.add("tt", rng.integers(1e6, 9e6, rows).astype(str)),
+            "imdb_score": rng.uniform(1.5, 9.5, rows).round(1),
+            "imdb_votes": rng.integers(5, 2_000_000, rows).astype(float),
+        }
+    )
+
+
+def make_credits(rows: int, titles: int = None, seed: int = 0) -> pd.DataFrame:
+    """
+    Generates a raw_credits-like DataFrame with the given number of rows, spread over
+    `titles` title ids (rows / 15 by default, as in the Kaggle data), with character
+    strings using the " / " and ";" separators and missing characters for crew.
+    """
+    rng = np.random.default_rng(seed)
+    titles = titles or max(1, rows // 15)
+    character_pool = np.char.add(
+        "Character ", np.arange(max(10, rows // 2)).astype(str)
+    )
+    first = rng.choice(character_pool, rows)
+    second = rng.choice(character_pool, rows)
+    kind = rng.random(rows)
+    characters = np.where(
+        kind < 0.7,
+        first,
+        np.where(
+            kind < 0.8,
+            np.char.add(np.char.add(first, " / "), second),
+            np.where(kind < 0.85, np.char.add(np.char.add(first, ";"), second), ""),
+        ),
+    ).astype(object)
+    roles = np.where(kind < 0.95, "ACTOR", "DIRECTOR")
+    characters[(characters == "") | (roles == "DIRECTOR")] = np.nan
+    return pd.DataFrame(
+        {
+            "index": np.arange(rows),
+            "person_id": rng.integers(1, max(2, rows // 3), rows),
+            "id": np.char.add("tm", np.sort(rng.integers(0, titles, rows)).astype(str)),
+            "name": np.char.add("Person ", rng.integers(0, rows, rows).astype(str)),
+            "character": characters,
+            "role": roles,
+        }
+    )
+
+
+def scale_frame(df: pd.DataFrame, scale: int) -> pd.DataFrame:
+    """
+    Repeats a raw_titles or raw_credits DataFrame `scale` times, suffixing the title
+    ids with the copy number so every copy describes different titles.
+    """
+    copies = [df.assign(id=df["id"] + f"_{copy}") for copy in range(scale)]
+    scaled = pd.concat(copies, ignore_index=True)
+    scaled["index"] = np.arange(len(scaled))
+    return scaled
+
+
+def scaled_inputs(normalizer, scale: int) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Returns the raw titles and credits of a normalizer scaled `scale` times, or
+    synthetic files of the same size when the CSV files are not available.
+    """
+    try:
+        titles_df = pd.read_csv(normalizer.titles_path)
+        credits_df = pd.read_csv(normalizer.credits_path)
+    except FileNotFoundError:
+        titles = TITLES_ROWS * scale
+        return make_titles(titles), make_credits(CREDITS_ROWS * scale, titles)
+    return scale_frame(titles_df, scale), scale_frame(credits_df, scale)
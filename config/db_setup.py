@@ -10,3 +10,19 @@ db_config = {
     "user": os.getenv("NETFLIX_DB_USER"),
     "password": os.getenv("NETFLIX_DB_PASSWORD"),
 }
+
+# Connection pool settings used by DataAPI
+pool_config = {
+    "min_size": int(os.getenv("NETFLIX_DB_POOL_MIN_SIZE", "1")),
+    "max_size": int(os.getenv("NETFLIX_DB_POOL_MAX_SIZE", "10")),
+    "idle_timeout": float(os.getenv("NETFLIX_DB_POOL_IDLE_TIMEOUT", "300")),
+    "checkout_timeout": float(os.getenv("NETFLIX_DB_POOL_CHECKOUT_TIMEOUT", "30")),
+}
+
+# Storage backend used by create_data_api: "postgres", "sqlite" or "duckdb". The
+# embedded backends keep their tables in the given file, or in memory without one.
+backend_config = {
+    "backend": os.getenv("NETFLIX_DB_BACKEND", "postgres"),
+    "path": os.getenv("NETFLIX_DB_PATH", ":memory:"),
+    "parquet_dir": os.getenv("NETFLIX_PARQUET_DIR"),
+}
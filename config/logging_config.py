@@ -1,26 +1,128 @@
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 import os
+from typing import Dict, Optional, Tuple
 
+# The listener writing the queued records to the log file, once logging is set up
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+_setup_lock = threading.Lock()
 
-def setup_logging():
-    # Path relative to the current script
-    script_dir = os.path.dirname(os.path.realpath(__file__))
-    log_dir = os.path.join(script_dir, "..", "logging")
-    log_file = "netflix_data.log"
 
-    # Create the directory if it doesn't exist
-    os.makedirs(log_dir, exist_ok=True)
+def setup_logging(level: Optional[int] = None, log_file: Optional[str] = None) -> None:
+    """
+    Sends the records of the root logger to the rotating log file through a queue.
+    The calling thread formats the message (QueueHandler.prepare) and enqueues the
+    record; a background thread applies the file format and writes it to disk, so
+    file I/O never blocks a request or a load. Calling it again attaches no other
+    handler and only changes the level when one is given, so a level set earlier is
+    kept. The queue is flushed at interpreter exit.
 
-    log_formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+    :param level: The level of the root logger; INFO on first setup by default.
+    :param log_file: The log file, logging/netflix_data.log by default.
+    """
+    global _listener, _queue_handler
+    root_logger = logging.getLogger()
+    with _setup_lock:
+        if level is not None:
+            root_logger.setLevel(level)
+        if _listener is not None:
+            return
+        if level is None:
+            root_logger.setLevel(logging.INFO)
 
-    # maximum log file size of 5 MB and up to 1 backup log data.
-    handler = RotatingFileHandler(
-        os.path.join(log_dir, log_file), maxBytes=5 * 1024 * 1024, backupCount=1
-    )
-    handler.setFormatter(log_formatter)
+        if log_file is None:
+            # Path relative to the current script
+            script_dir = os.path.dirname(os.path.realpath(__file__))
+            log_file = os.path.join(script_dir, "..", "logging", "netflix_data.log")
 
-    # Get the root logger and set the handler
-    root_logger = logging.getLogger()
-    root_logger.setLevel(logging.INFO)
-    root_logger.addHandler(handler)
+        # Create the directory if it doesn't exist
+        os.makedirs(os.path.dirname(os.path.abspath(log_file)), exist_ok=True)
+
+        log_formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+
+        # maximum log file size of 5 MB and up to 1 backup log data.
+        handler = RotatingFileHandler(log_file, maxBytes=5 * 1024 * 1024, backupCount=1)
+        handler.setFormatter(log_formatter)
+
+        # Unbounded, so logging never blocks; records are small and drained quickly
+        log_queue = queue.SimpleQueue()
+        _queue_handler = QueueHandler(log_queue)
+        _listener = QueueListener(log_queue, handler, respect_handler_level=True)
+        _listener.start()
+        root_logger.addHandler(_queue_handler)
+
+
+def stop_logging() -> None:
+    """
+    Writes the queued records, stops the background thread and detaches the queue
+    handler. setup_logging can be called again afterwards.
+    """
+    global _listener, _queue_handler
+    with _setup_lock:
+        if _listener is None:
+            return
+        logging.getLogger().removeHandler(_queue_handler)
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener, _queue_handler = None, None
+
+
+# Write the records still queued when the interpreter exits
+atexit.register(stop_logging)
+
+
+class RateLimitedLog:
+    """
+    Logs messages that may repeat on every request at most once per interval
+    seconds per key. The next message logged for a key reports how many were
+    suppressed since the previous one. Arguments are only formatted when a record
+    is emitted.
+    """
+
+    def __init__(self, interval: float = 10.0):
+        """
+        :param interval: Minimum seconds between two records with the same key.
+        """
+        self.interval = interval
+        self._lock = threading.Lock()
+        # Per key: when the last record was emitted and how many were suppressed since
+        self._state: Dict[str, Tuple[float, int]] = {}
+
+    def log(self, level: int, msg: str, *args, key: Optional[str] = None) -> bool:
+        """
+        Logs msg % args unless a record with the same key (msg by default) was
+        emitted less than interval seconds ago.
+
+        :return: Whether the record was emitted.
+        """
+        root_logger = logging.getLogger()
+        if not root_logger.isEnabledFor(level):
+            return False
+        key = key or msg
+        now = time.monotonic()
+        with self._lock:
+            last, suppressed = self._state.get(key, (None, 0))
+            if last is not None and now - last < self.interval:
+                self._state[key] = (last, suppressed + 1)
+                return False
+            self._state[key] = (now, 0)
+        if suppressed:
+            msg += " (%d similar messages suppressed)"
+            args += (suppressed,)
+        root_logger.log(level, msg, *args)
+        return True
+
+    def info(self, msg: str, *args, key: Optional[str] = None) -> bool:
+        return self.log(logging.INFO, msg, *args, key=key)
+
+    def warning(self, msg: str, *args, key: Optional[str] = None) -> bool:
+        return self.log(logging.WARNING, msg, *args, key=key)
+
+    def error(self, msg: str, *args, key: Optional[str] = None) -> bool:
+        return self.log(logging.ERROR, msg, *args, key=key)
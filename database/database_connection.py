@@ -1,40 +1,307 @@
+import os
+import threading
+import time
 import psycopg2
 import logging
+from collections import deque
 from contextlib import contextmanager
-from typing import Dict, Iterator, Any
+from typing import Deque, Dict, Iterator, Any, Optional, Tuple
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """
+    Raised when no pooled connection becomes available within the checkout timeout.
+    """
+
+
+class ConnectionPool:
+    """
+    A thread-safe pool of psycopg2 connections. Connections are created lazily up to
+    ``max_size``, health-checked when they are checked out, rolled back to a clean state
+    when they are returned, and closed after sitting idle for longer than ``idle_timeout``
+    (never going below ``min_size`` open connections).
+    """
+
+    def __init__(
+        self,
+        db_config: Dict[str, Any],
+        min_size: int = 1,
+        max_size: int = 10,
+        idle_timeout: float = 300.0,
+        checkout_timeout: float = 30.0,
+        health_check: bool = True,
+        health_check_interval: float = 30.0,
+    ):
+        """
+        :param db_config: A dictionary containing the database connection parameters.
+        :param min_size: Number of open connections kept even when they sit idle.
+        :param max_size: Maximum number of connections open at the same time.
+        :param idle_timeout: Seconds after which an idle connection above min_size is closed.
+        :param checkout_timeout: Seconds to wait for a free connection before raising PoolTimeout.
+        :param health_check: Whether to verify connections when they are checked out.
+        :param health_check_interval: Only connections idle for longer than this many seconds
+                                      are pinged with ``SELECT 1``; closed connections are
+                                      always replaced.
+        """
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError(
+                "Pool sizes must satisfy 0 <= min_size <= max_size, max_size >= 1"
+            )
+        self.db_config = db_config
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.health_check = health_check
+        self.health_check_interval = health_check_interval
+
+        # Condition defaults to an RLock, so helpers may re-acquire it while it is held.
+        self._condition = threading.Condition()
+        self._idle: Deque[Tuple[psycopg2.extensions.connection, float]] = deque()
+        self._size = 0
+        self._checked_out = 0
+        self._pid = os.getpid()
+        self._counters = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "timeouts": 0,
+            "created": 0,
+            "closed": 0,
+            "health_check_failures": 0,
+        }
+
+    def getconn(self) -> psycopg2.extensions.connection:
+        """
+        Checks a connection out of the pool, opening a new one if none is idle and the
+        pool is not full, or waiting for one to be returned otherwise.
+
+        :return: An open psycopg2 connection with no transaction in progress.
+        """
+        start = time.monotonic()
+        deadline = start + self.checkout_timeout
+        waited = False
+        connection = None
+        idle_since = 0.0
+
+        with self._condition:
+            self._reset_after_fork()
+            while True:
+                self._close_expired()
+                if self._idle:
+                    connection, idle_since = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                waited = True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._counters["timeouts"] += 1
+                    raise PoolTimeout(
+                        f"No database connection available after {self.checkout_timeout}s "
+                        f"(max_size={self.max_size})"
+                    )
+                self._condition.wait(remaining)
+
+            self._checked_out += 1
+            self._counters["checkouts"] += 1
+            if waited:
+                wait_time = time.monotonic() - start
+                self._counters["waits"] += 1
+                self._counters["wait_time_total"] += wait_time
+                self._counters["wait_time_max"] = max(
+                    self._counters["wait_time_max"], wait_time
+                )
+
+        try:
+            if connection is not None and not self._is_healthy(connection, idle_since):
+                self._close(connection)
+                connection = None
+            if connection is None:
+                connection = psycopg2.connect(**self.db_config)
+                with self._condition:
+                    self._counters["created"] += 1
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._checked_out -= 1
+                self._condition.notify()
+            raise
+        return connection
+
+    def putconn(self, connection: psycopg2.extensions.connection) -> None:
+        """
+        Returns a connection to the pool. Any open transaction is rolled back; broken
+        connections are closed and their slot is freed.
+
+        :param connection: A connection previously obtained from getconn.
+        """
+        if os.getpid() != self._pid:
+            return
+
+        reusable = not connection.closed
+        if reusable:
+            try:
+                status = connection.info.transaction_status
+                if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+                    reusable = (
+                        connection.info.transaction_status
+                        == psycopg2.extensions.TRANSACTION_STATUS_IDLE
+                    )
+            except psycopg2.Error as e:
+                logging.warning(
+                    f"Discarding pooled connection that failed to reset: {e}"
+                )
+                reusable = False
+
+        with self._condition:
+            self._checked_out -= 1
+            if reusable:
+                self._idle.append((connection, time.monotonic()))
+            else:
+                self._size -= 1
+            self._condition.notify()
+
+        if not reusable:
+            self._close(connection)
+
+    def closeall(self) -> None:
+        """
+        Closes every idle connection. Checked-out connections are unaffected.
+        """
+        with self._condition:
+            idle = [connection for connection, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._condition.notify_all()
+        for connection in idle:
+            self._close(connection)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns a snapshot of the pool usage counters, useful for sizing the pool.
+        """
+        with self._condition:
+            snapshot = dict(self._counters)
+            snapshot.update(
+                {
+                    "size": self._size,
+                    "idle": len(self._idle),
+                    "checked_out": self._checked_out,
+                    "min_size": self.min_size,
+                    "max_size": self.max_size,
+                }
+            )
+        return snapshot
+
+    def _is_healthy(
+        self, connection: psycopg2.extensions.connection, idle_since: float
+    ) -> bool:
+        if connection.closed:
+            with self._condition:
+                self._counters["health_check_failures"] += 1
+            return False
+        if not self.health_check:
+            return True
+        if time.monotonic() - idle_since < self.health_check_interval:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connection.rollback()
+            return True
+        except psycopg2.Error as e:
+            logging.warning(f"Pooled connection failed health check: {e}")
+            with self._condition:
+                self._counters["health_check_failures"] += 1
+            return False
+
+    def _close_expired(self) -> None:
+        # Must be called with the condition held. Oldest idle connections sit on the left.
+        now = time.monotonic()
+        while (
+            self._idle
+            and self._size > self.min_size
+            and now - self._idle[0][1] > self.idle_timeout
+        ):
+            connection, _ = self._idle.popleft()
+            self._size -= 1
+            self._close(connection)
+
+    def _reset_after_fork(self) -> None:
+        # Must be called with the condition held. Sockets inherited from the parent
+        # process are dropped without closing them, so the parent's sessions survive.
+        pid = os.getpid()
+        if pid != self._pid:
+            self._pid = pid
+            self._idle.clear()
+            self._size = 0
+            self._checked_out = 0
+
+    def _close(self, connection: psycopg2.extensions.connection) -> None:
+        try:
+            connection.close()
+        except psycopg2.Error as e:
+            logging.warning(f"Error closing pooled connection: {e}")
+        with self._condition:
+            self._counters["closed"] += 1
 
 
 class DatabaseConnection:
     """
-    Manages the database connections. It ensures that connections are properly opened and
-    closed, and transactions are correctly managed with commits or rollbacks as needed.
+    Manages the database connections. Connections are borrowed from a shared pool and
+    returned to it afterwards, and transactions are rolled back if an exception occurs.
     """
 
-    def __init__(self, db_config: Dict[str, Any]):
+    def __init__(
+        self, db_config: Dict[str, Any], pool_config: Optional[Dict[str, Any]] = None
+    ):
         """
         Initializes the DatabaseConnection with the provided database configuration.
 
         :param db_config: A dictionary containing the database connection parameters.
+        :param pool_config: Optional keyword arguments for the ConnectionPool
+                            (min_size, max_size, idle_timeout, checkout_timeout, ...).
         """
         self.db_config = db_config
+        self.pool = ConnectionPool(db_config, **(pool_config or {}))
 
     @contextmanager
     def connect(self) -> Iterator[psycopg2.extensions.connection]:
         """
-        A context manager that manages a database connection. It automatically commits
-        the transaction on successful block execution or rolls back if an exception occurs.
+        A context manager that checks a connection out of the pool. It rolls back the
+        transaction if an exception occurs and always returns the connection to the pool,
+        where any transaction left open is rolled back.
 
         :yield: The database connection object to be used within a `with`-statement block.
         """
         connection: psycopg2.extensions.connection = None
         try:
-            connection = psycopg2.connect(**self.db_config)
+            connection = self.pool.getconn()
             yield connection
         except psycopg2.DatabaseError as e:
             logging.error(f"Database error: {e}")
-            if connection is not None:
-                connection.rollback()
+            if connection is not None and not connection.closed:
+                try:
+                    connection.rollback()
+                except psycopg2.Error as rollback_error:
+                    logging.error(f"Rollback failed: {rollback_error}")
             raise
         finally:
             if connection is not None:
-                connection.close()
+                self.pool.putconn(connection)
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """
+        Returns the usage counters of the underlying connection pool.
+        """
+        return self.pool.stats()
+
+    def close(self) -> None:
+        """
+        Closes all idle pooled connections.
+        """
+        self.pool.closeall()
@@ -1,9 +1,18 @@
-from api.data_api import DataAPI
-from config.db_setup import db_config
+import argparse
+import logging
+from typing import Dict, Optional
+import pandas as pd
+from api.backend import DataBackend
+from api.factory import BACKENDS, create_data_api
+from api.query_cache import QueryCache
 from config.logging_config import setup_logging
+from monitoring.metrics import metrics
 from scripts.data_loader import DataLoader
+from scripts.normalized_cache import NormalizedCache
 from scripts.constraints import DatabaseConstraints
 from scripts.permissions import DatabasePermissions
+from recommender.similarity import SimilarityEngine
+from recommender.neighbor_index import NeighborIndex
 
 
 class DataPipeline:
@@ -12,24 +21,99 @@ class DataPipeline:
     loading data, and configuring database constraints and permissions.
     """
 
-    def __init__(self, api: DataAPI):
+    def __init__(
+        self,
+        api: DataBackend,
+        chunk_size: Optional[int] = None,
+        cache: Optional[NormalizedCache] = None,
+        rebuild_cache: bool = False,
+        load_workers: int = 4,
+        incremental: bool = False,
+        parquet_dir: Optional[str] = None,
+        normalize_workers: int = 1,
+        compact: bool = True,
+    ):
         """
         Initialize the DataPipeline with an instance of the DataAPI.
 
-        :param api: An instance of DataAPI to interact with the database.
+        :param api: The storage backend (DataAPI, SQLiteDataAPI or DuckDBDataAPI).
+        :param chunk_size: When given, the CSV files are streamed into the database
+                           this many rows at a time instead of being read in one go.
+        :param cache: Optional cache of the normalized tables.
+        :param rebuild_cache: Normalize the CSV files even if the cache is up to date.
+        :param load_workers: Maximum number of tables loaded concurrently.
+        :param incremental: Upsert changed rows into the existing tables instead of
+                            replacing them.
+        :param parquet_dir: Optional directory the loaded tables are also exported
+                            to as Parquet files.
+        :param normalize_workers: Number of processes normalizing the CSV files.
+        :param compact: Convert the tables in memory to compact dtypes before loading
+                        them and building the neighbor index.
         """
         self.api = api
+        self.chunk_size = chunk_size
+        self.cache = cache
+        self.rebuild_cache = rebuild_cache
+        self.load_workers = load_workers
+        self.incremental = incremental
+        self.parquet_dir = parquet_dir
+        self.normalize_workers = normalize_workers
+        self.compact = compact
+        # The loaded tables, kept until the neighbor index is built from them
+        self.tables: Optional[Dict[str, pd.DataFrame]] = None
 
     def setup_logging(self) -> None:
         """Set up logging for the application."""
         setup_logging()
 
-    def load_data(self) -> None:
+    def load_data(self) -> bool:
         """
         Load data into the database using DataLoader.
+
+        :return: Whether every table loaded; a table that failed may be missing or,
+                 when streamed, hold only its first chunks.
+        """
+        loader = DataLoader(
+            self.api,
+            chunk_size=self.chunk_size,
+            cache=self.cache,
+            rebuild_cache=self.rebuild_cache,
+            max_workers=self.load_workers,
+            incremental=self.incremental,
+            normalize_workers=self.normalize_workers,
+            compact=self.compact,
+        )
+        results = loader.load_csv_to_db()
+        loaded = all(result["error"] is None for result in results.values())
+        # Streamed tables are not in memory, and incremental loads can leave the
+        # database different from them
+        if loaded and self.chunk_size is None and not self.incremental:
+            self.tables = loader.dataframes
+        if self.parquet_dir:
+            loader.export_parquet(self.parquet_dir)
+        return loaded
+
+    def build_neighbor_index(self) -> None:
+        """
+        Precompute the top-k similar movies for every movie from the freshly loaded
+        tables and save them where MoviesRecommender memory-maps them from. The
+        tables still in memory are used when available, instead of reading them back
+        from the database.
         """
-        loader = DataLoader(self.api)
-        loader.load_csv_to_db()
+        tables, self.tables = self.tables, None
+        try:
+            if tables is None:
+                engine = SimilarityEngine.from_api(self.api)
+            else:
+                engine = SimilarityEngine.from_frames(
+                    tables["movies"],
+                    tables["movie_genres"],
+                    tables["movie_countries"],
+                    tables["credits"],
+                )
+            NeighborIndex.build(engine).save()
+        except Exception as e:
+            logging.error(f"Failed to build the neighbor index: {e}")
 
     def setup_database_constraints(self) -> None:
         """
@@ -47,25 +131,146 @@ class DataPipeline:
 
     def run_pipeline(self) -> None:
         """
-        Run the full data pipeline: setup logging, load data, set up constraints,
-        and permissions in sequence.
+        Run the full data pipeline: setup logging, load data, build the neighbor
+        index, set up constraints, and permissions in sequence. The later stages are
+        skipped when a table failed to load, as they would run on partial tables.
+        With metrics enabled, every stage is timed and, if configured, profiled.
         """
         self.setup_logging()
-        self.load_data()
-        self.setup_database_constraints()
-        self.setup_database_permissions()
+        with metrics.profile("load_data"):
+            loaded = self.load_data()
+        if not loaded:
+            logging.error(
+                "Some tables failed to load; skipping the neighbor index, "
+                "constraints and permissions."
+            )
+            return
+        with metrics.profile("build_neighbor_index"):
+            self.build_neighbor_index()
+        if not self.api.supports_constraints:
+            logging.info(
+                f"Skipping constraints and permissions on the {self.api.name} backend."
+            )
+            return
+        with metrics.profile("setup_database_constraints"):
+            self.setup_database_constraints()
+        with metrics.profile("setup_database_permissions"):
+            self.setup_database_permissions()
 
 
 def main() -> None:
     """
     The main function that creates an instance of the data pipeline and runs it.
     """
+    parser = argparse.ArgumentParser(description="Netflix data pipeline")
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        help="Stream the CSV files into the database this many rows at a time",
+    )
+    parser.add_argument(
+        "--load-workers",
+        type=int,
+        default=4,
+        help="Maximum number of tables loaded into the database concurrently",
+    )
+    parser.add_argument(
+        "--normalize-workers",
+        type=int,
+        default=1,
+        help="Normalize the titles and credits on this many processes",
+    )
+    parser.add_argument(
+        "--no-compact",
+        action="store_true",
+        help="Keep the default pandas dtypes instead of converting the tables to "
+        "compact ones",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Upsert changed rows into the existing tables instead of replacing them",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Normalize the CSV files without reading or writing the cache",
+    )
+    parser.add_argument(
+        "--rebuild-cache",
+        action="store_true",
+        help="Normalize the CSV files again and overwrite the cached tables",
+    )
+    parser.add_argument(
+        "--clear-cache",
+        action="store_true",
+        help="Delete the cached normalized tables and exit",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        help="Storage backend; defaults to NETFLIX_DB_BACKEND or postgres",
+    )
+    parser.add_argument(
+        "--db-path",
+        help="Database file of the sqlite and duckdb backends (in memory by default)",
+    )
+    parser.add_argument(
+        "--export-parquet",
+        metavar="DIR",
+        help="Also write the loaded tables to DIR as Parquet files",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        help="Record metrics and write them to this file (Prometheus text for a "
+        ".prom file, JSON otherwise)",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="DIR",
+        help="Record metrics and write the cProfile stats of every stage to DIR",
+    )
+    parser.add_argument(
+        "--tracemalloc",
+        action="store_true",
+        help="Record metrics and the peak traced memory of every stage",
+    )
+    args = parser.parse_args()
+
+    if args.metrics_file or args.profile or args.tracemalloc:
+        metrics.enable(profile_dir=args.profile, trace_memory=args.tracemalloc)
+
+    if args.clear_cache:
+        setup_logging()
+        NormalizedCache().clear()
+        return
+    cache = None if args.no_cache else NormalizedCache()
+
     # Initialize the Data API
-    api = DataAPI(db_config)
+    # Writes invalidate the results cached by the analyzer
+    config = {"backend": args.backend, "path": args.db_path}
+    api = create_data_api(
+        {key: value for key, value in config.items() if value},
+        query_cache=QueryCache(),
+    )
 
     # Create an instance of the data pipeline and run it
-    data_pipeline = DataPipeline(api)
-    data_pipeline.run_pipeline()
+    data_pipeline = DataPipeline(
+        api,
+        chunk_size=args.chunk_size,
+        cache=cache,
+        rebuild_cache=args.rebuild_cache,
+        load_workers=args.load_workers,
+        incremental=args.incremental,
+        parquet_dir=args.export_parquet,
+        normalize_workers=args.normalize_workers,
+        compact=not args.no_compact,
+    )
+    try:
+        data_pipeline.run_pipeline()
+    finally:
+        if args.metrics_file:
+            metrics.dump(args.metrics_file)
 
 
 if __name__ == "__main__":
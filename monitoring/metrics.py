@@ -0,0 +1,326 @@
+import bisect
+import cProfile
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple, Union
+
+PREFIX = "netflix_"
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)  # fmt: skip
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class _Histogram:
+    """
+    Cumulative latency histogram with fixed buckets, as exposed by Prometheus.
+    """
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> Iterator[Tuple[str, int]]:
+        total = 0
+        for bound, count in zip((*LATENCY_BUCKETS, "+Inf"), self.counts):
+            total += count
+            yield str(bound), total
+
+
+class Timer:
+    """
+    Returned by MetricsRegistry.timed. Setting rows records the number of rows the
+    timed call processed.
+    """
+
+    __slots__ = ("rows",)
+
+    def __init__(self):
+        self.rows: Optional[int] = None
+
+
+class _NullTimer:
+    """
+    Shared no-op stand-in for Timer while metrics are disabled.
+    """
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        return None
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class MetricsRegistry:
+    """
+    In-process counters, gauges and latency histograms, keyed by name and labels,
+    exported in the Prometheus text format or as JSON. The registry is disabled
+    unless enable() is called or NETFLIX_METRICS=1 is set; while disabled every
+    recording call returns after a single attribute check, and label callables
+    are not evaluated.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.profile_dir: Optional[Path] = None
+        self.trace_memory = False
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._gauges: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, _Histogram]] = {}
+
+    def enable(
+        self,
+        profile_dir: Optional[Union[str, Path]] = None,
+        trace_memory: bool = False,
+    ) -> None:
+        """
+        Starts recording.
+
+        :param profile_dir: Directory the cProfile stats of every profiled stage are
+                            written to, as <stage>.prof; None disables profiling.
+        :param trace_memory: Record the peak traced memory of every profiled stage
+                             with tracemalloc, which slows allocations down.
+        """
+        self.enabled = True
+        self.profile_dir = Path(profile_dir) if profile_dir else None
+        self.trace_memory = trace_memory
+
+    def disable(self) -> None:
+        """
+        Stops recording; recorded values are kept.
+        """
+        self.enabled = False
+
+    def reset(self) -> None:
+        """
+        Drops every recorded value.
+        """
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """
+        Adds value to a counter.
+        """
+        if not self.enabled:
+            return
+        key = _key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        """
+        Sets a gauge to value.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges.setdefault(name, {})[_key(labels)] = value
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        """
+        Records a latency in a histogram.
+        """
+        if not self.enabled:
+            return
+        key = _key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram()
+            histogram.observe(seconds)
+
+    def timed(
+        self,
+        name: str,
+        labels: Optional[Callable[[], Dict[str, Any]]] = None,
+        **static_labels,
+    ):
+        """
+        Context manager timing a block into the <name>_seconds histogram. Failures
+        are counted in <name>_errors_total, and rows set on the yielded Timer are
+        added to <name>_rows_total.
+
+        :param labels: Optional callable returning extra labels, only evaluated when
+                       metrics are enabled, for labels that are costly to compute.
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        if labels is not None:
+            static_labels.update(labels())
+        return self._timed(name, static_labels)
+
+    @contextmanager
+    def _timed(self, name: str, labels: Dict[str, Any]) -> Iterator[Timer]:
+        timer = Timer()
+        start = time.perf_counter()
+        try:
+            yield timer
+        except BaseException:
+            self.inc(f"{name}_errors_total", **labels)
+            raise
+        finally:
+            self.observe(f"{name}_seconds", time.perf_counter() - start, **labels)
+            if timer.rows is not None:
+                self.inc(f"{name}_rows_total", timer.rows, **labels)
+
+    def instrumented(self, name: str, **labels) -> Callable:
+        """
+        Decorator timing every call of a function with timed(name, **labels).
+        """
+
+        def decorator(function: Callable) -> Callable:
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with self.timed(name, **labels):
+                    return function(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    @contextmanager
+    def profile(self, stage: str) -> Iterator[None]:
+        """
+        Times a pipeline stage into pipeline_stage_seconds and, when configured,
+        captures its cProfile stats and its peak traced memory
+        (pipeline_stage_peak_memory_bytes).
+        """
+        if not self.enabled:
+            yield
+            return
+        profiler = cProfile.Profile() if self.profile_dir else None
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        with self.timed("pipeline_stage", stage=stage):
+            if profiler is not None:
+                profiler.enable()
+            try:
+                yield
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+                    self.profile_dir.mkdir(parents=True, exist_ok=True)
+                    profiler.dump_stats(self.profile_dir / f"{stage}.prof")
+                if self.trace_memory:
+                    _, peak = tracemalloc.get_traced_memory()
+                    self.set_gauge(
+                        "pipeline_stage_peak_memory_bytes", peak, stage=stage
+                    )
+
+    def to_json(self) -> Dict[str, Any]:
+        """
+        Returns every recorded value as a JSON-serializable dictionary.
+        """
+        with self._lock:
+            return {
+                "counters": _json_series(self._counters),
+                "gauges": _json_series(self._gauges),
+                "histograms": {
+                    name: [
+                        {
+                            "labels": dict(key),
+                            "count": histogram.count,
+                            "sum": histogram.sum,
+                            "buckets": dict(histogram.cumulative()),
+                        }
+                        for key, histogram in series.items()
+                    ]
+                    for name, series in self._histograms.items()
+                },
+            }
+
+    def to_prometheus(self) -> str:
+        """
+        Returns every recorded value in the Prometheus text exposition format.
+        """
+        lines = []
+        with self._lock:
+            for kind, metrics in (("counter", self._counters), ("gauge", self._gauges)):
+                for name, series in sorted(metrics.items()):
+                    lines.append(f"# TYPE {PREFIX}{name} {kind}")
+                    for key, value in series.items():
+                        lines.append(f"{PREFIX}{name}{_format_labels(key)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {PREFIX}{name} histogram")
+                for key, histogram in series.items():
+                    for bound, count in histogram.cumulative():
+                        labels = _format_labels(key + (("le", bound),))
+                        lines.append(f"{PREFIX}{name}_bucket{labels} {count}")
+                    labels = _format_labels(key)
+                    lines.append(f"{PREFIX}{name}_sum{labels} {histogram.sum:g}")
+                    lines.append(f"{PREFIX}{name}_count{labels} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: Union[str, Path]) -> None:
+        """
+        Writes the metrics to a file: the Prometheus text format for a .prom file,
+        JSON otherwise.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.suffix == ".prom":
+            path.write_text(self.to_prometheus())
+        else:
+            path.write_text(json.dumps(self.to_json(), indent=2))
+        logging.info(f"Metrics written to {path}")
+
+
+def _key(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: Labels) -> str:
+    if not key:
+        return ""
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in key
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _json_series(metrics: Dict[str, Dict[Labels, float]]) -> Dict[str, Any]:
+    return {
+        name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+        for name, series in metrics.items()
+    }
+
+
+# The registry shared by DataAPI, the pipeline, DataNormalizer and the recommender
+metrics = MetricsRegistry(enabled=os.getenv("NETFLIX_METRICS", "0") == "1")
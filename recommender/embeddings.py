@@ -0,0 +1,346 @@
+import logging
+import time
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.linalg import svds
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+TOKEN_PATTERN = r"[a-z0-9]+"
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Returns the positions of the k highest scores, best first.
+    """
+    if len(scores) > k:
+        best = np.argpartition(-scores, k)[:k]
+    else:
+        best = np.arange(len(scores))
+    return best[np.argsort(-scores[best], kind="stable")]
+
+
+class DescriptionEmbedder:
+    """
+    Turns movie descriptions into dense embeddings: a TF-IDF matrix over the
+    description vocabulary, reduced with a truncated SVD and L2-normalized so the
+    dot product of two embeddings is their cosine similarity.
+    """
+
+    def __init__(self, dimensions: int = 64, min_df: int = 2, max_df: float = 0.5):
+        """
+        :param dimensions: The size of the embeddings.
+        :param min_df: Terms found in fewer descriptions than this are ignored.
+        :param max_df: Terms found in a larger share of descriptions are ignored.
+        """
+        self.dimensions = dimensions
+        self.min_df = min_df
+        self.max_df = max_df
+        self.vocabulary: Optional[pd.Index] = None
+        self.idf: Optional[np.ndarray] = None
+        self.components: Optional[np.ndarray] = None
+
+    def _term_counts(self, descriptions: pd.Series) -> Tuple[pd.Series, np.ndarray]:
+        """
+        Tokenizes the descriptions and returns every token with the position of the
+        description it came from.
+        """
+        token_lists = (
+            descriptions.fillna("").astype(str).str.lower().str.findall(TOKEN_PATTERN)
+        )
+        documents = np.repeat(np.arange(len(descriptions)), token_lists.str.len())
+        return token_lists.explode().dropna(), documents
+
+    def _tfidf(self, descriptions: pd.Series) -> sp.csr_matrix:
+        tokens, documents = self._term_counts(descriptions)
+        columns = self.vocabulary.get_indexer(tokens.to_numpy())
+        known = columns >= 0
+        counts = sp.csr_matrix(
+            (
+                np.ones(known.sum(), dtype=np.float32),
+                (documents[known], columns[known]),
+            ),
+            shape=(len(descriptions), len(self.vocabulary)),
+        )
+        tfidf = counts.multiply(self.idf).tocsr()
+        norms = np.sqrt(np.asarray(tfidf.multiply(tfidf).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        return sp.diags(1.0 / norms).dot(tfidf).tocsr()
+
+    def fit_transform(self, descriptions: pd.Series) -> np.ndarray:
+        """
+        Learns the vocabulary, IDF weights and SVD projection from the descriptions
+        and returns their embeddings.
+        """
+        descriptions = descriptions.reset_index(drop=True)
+        tokens, documents = self._term_counts(descriptions)
+        pairs = pd.DataFrame({"term": tokens.to_numpy(), "document": documents})
+        document_frequency = pairs.drop_duplicates()["term"].value_counts()
+        document_count = max(len(descriptions), 1)
+        document_frequency = document_frequency[
+            (document_frequency >= self.min_df)
+            & (document_frequency <= self.max_df * document_count)
+        ]
+        self.vocabulary = pd.Index(document_frequency.index)
+        self.idf = (
+            np.log((1 + document_count) / (1 + document_frequency.to_numpy())) + 1
+        ).astype(np.float32)
+
+        tfidf = self._tfidf(descriptions)
+        dimensions = min(self.dimensions, min(tfidf.shape) - 1)
+        if dimensions < 1:
+            raise ValueError("Not enough descriptions or terms to build embeddings")
+        _, _, components = svds(tfidf, k=dimensions, random_state=0)
+        # svds returns the singular vectors in ascending order of singular value
+        self.components = components[::-1].astype(np.float32)
+        return self.transform(descriptions)
+
+    def transform(self, descriptions: pd.Series) -> np.ndarray:
+        """
+        Embeds descriptions with the fitted vocabulary and projection.
+        """
+        if self.components is None:
+            raise ValueError("The embedder has not been fitted")
+        tfidf = self._tfidf(descriptions.reset_index(drop=True))
+        return _normalize_rows(np.asarray(tfidf @ self.components.T))
+
+
+class IVFIndex:
+    """
+    Approximate nearest-neighbor index over L2-normalized vectors. Vectors are
+    clustered with spherical k-means into nlist inverted lists; a query scores the
+    centroids, then only the vectors of the nprobe closest lists. Raising nprobe
+    trades latency for recall (nprobe == nlist is an exact search).
+    """
+
+    def __init__(self, nlist: Optional[int] = None, nprobe: int = 8, seed: int = 0):
+        """
+        :param nlist: The number of clusters; defaults to sqrt(number of vectors).
+        :param nprobe: The default number of clusters scanned per query.
+        :param seed: Seed of the k-means initialization.
+        """
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None
+        self.vectors = np.empty((0, 0), dtype=np.float32)
+        self.lists: List[np.ndarray] = []
+
+    def train(self, vectors: np.ndarray, iterations: int = 10) -> None:
+        """
+        Runs spherical k-means on the vectors to place the centroids.
+        """
+        rng = np.random.default_rng(self.seed)
+        nlist = self.nlist or max(1, int(np.sqrt(len(vectors))))
+        nlist = min(nlist, len(vectors))
+        centroids = vectors[rng.choice(len(vectors), nlist, replace=False)]
+        for _ in range(iterations):
+            assignment = self._assign(vectors, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, vectors)
+            empty = ~sums.any(axis=1)
+            sums[empty] = vectors[rng.choice(len(vectors), empty.sum())]
+            centroids = _normalize_rows(sums)
+        self.nlist = nlist
+        self.centroids = centroids
+        self.vectors = np.empty((0, vectors.shape[1]), dtype=np.float32)
+        self.lists = [np.empty(0, dtype=np.int64) for _ in range(nlist)]
+
+    def add(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Adds vectors to the nearest inverted lists without retraining the centroids.
+
+        :return: The positions assigned to the new vectors.
+        """
+        if self.centroids is None:
+            raise ValueError("The index has not been trained")
+        start = len(self.vectors)
+        positions = np.arange(start, start + len(vectors))
+        self.vectors = np.vstack([self.vectors, vectors.astype(np.float32)])
+        assignment = self._assign(vectors, self.centroids)
+        order = np.argsort(assignment, kind="stable")
+        lists, boundaries = np.unique(assignment[order], return_index=True)
+        for cluster, members in zip(lists, np.split(positions[order], boundaries[1:])):
+            self.lists[cluster] = np.concatenate([self.lists[cluster], members])
+        return positions
+
+    def search(
+        self, query: np.ndarray, k: int, nprobe: Optional[int] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Finds the approximate k nearest vectors of a query vector.
+
+        :return: The positions and cosine similarities of the neighbors, best first.
+        """
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        probes = _top_k(self.centroids @ query, nprobe)
+        candidates = np.concatenate([self.lists[cluster] for cluster in probes])
+        scores = self.vectors[candidates] @ query
+        best = _top_k(scores, k)
+        return candidates[best], scores[best]
+
+    def search_exact(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Brute-force search over every vector, the reference for measuring recall.
+        """
+        scores = self.vectors @ query
+        best = _top_k(scores, k)
+        return best, scores[best]
+
+    def benchmark(
+        self,
+        queries: np.ndarray,
+        k: int = 10,
+        nprobes: Sequence[int] = (1, 2, 4, 8, 16, 32),
+    ) -> List[Dict[str, float]]:
+        """
+        Measures recall@k against brute force and mean query latency for each nprobe.
+
+        :param queries: The query vectors.
+        :param k: The number of neighbors per query.
+        :param nprobes: The nprobe settings to measure.
+        :return: One {"nprobe", "recall", "latency_ms"} row per setting, with the exact
+                 search reported as nprobe 0.
+        """
+        start = time.perf_counter()
+        exact = [self.search_exact(query, k)[1] for query in queries]
+        results = [
+            {
+                "nprobe": 0,
+                "recall": 1.0,
+                "latency_ms": (time.perf_counter() - start) * 1000 / len(queries),
+            }
+        ]
+        for nprobe in nprobes:
+            start = time.perf_counter()
+            found = [self.search(query, k, nprobe)[1] for query in queries]
+            latency = (time.perf_counter() - start) * 1000 / len(queries)
+            # A neighbor counts as correct if it scores at least as high as the k-th
+            # exact neighbor, so ties between equally similar vectors are not misses
+            recall = np.mean(
+                [
+                    np.sum(f >= e[-1] - 1e-6) / len(e)
+                    for f, e in zip(found, exact)
+                    if len(e)
+                ]
+            )
+            results.append(
+                {"nprobe": nprobe, "recall": float(recall), "latency_ms": latency}
+            )
+        return results
+
+    @staticmethod
+    def _assign(
+        vectors: np.ndarray, centroids: np.ndarray, block_size: int = 8192
+    ) -> np.ndarray:
+        assignment = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), block_size):
+            block = vectors[start : start + block_size]
+            assignment[start : start + block_size] = np.argmax(
+                block @ centroids.T, axis=1
+            )
+        return assignment
+
+
+class EmbeddingRecommender:
+    """
+    Recommends movies with similar descriptions through an IVFIndex over
+    DescriptionEmbedder embeddings.
+    """
+
+    def __init__(
+        self,
+        embedder: Optional[DescriptionEmbedder] = None,
+        index: Optional[IVFIndex] = None,
+    ):
+        self.embedder = embedder or DescriptionEmbedder()
+        self.index = index or IVFIndex()
+        self.ids: List[str] = []
+        self.titles: List[str] = []
+        self.positions: Dict[str, int] = {}
+
+    @classmethod
+    def from_frame(cls, movies: pd.DataFrame, **kwargs) -> "EmbeddingRecommender":
+        """
+        Fits the embedder and trains the index on a movies DataFrame with id, title
+        and description columns.
+        """
+        recommender = cls(**kwargs)
+        movies = movies.drop_duplicates(subset="id")
+        vectors = recommender.embedder.fit_transform(movies["description"])
+        recommender.index.train(vectors)
+        recommender._add(movies, vectors)
+        logging.info(
+            f"Built description index: {len(movies)} movies, "
+            f"{vectors.shape[1]} dimensions, {recommender.index.nlist} lists"
+        )
+        return recommender
+
+    @classmethod
+    def from_api(cls, api, **kwargs) -> "EmbeddingRecommender":
+        """
+        Builds the recommender from the movies table in the database.
+        """
+        return cls.from_frame(
+            api.select_data("SELECT id, title, description FROM movies"), **kwargs
+        )
+
+    def add_titles(self, movies: pd.DataFrame) -> None:
+        """
+        Embeds and inserts new titles into the existing index without a rebuild.
+        Titles whose id is already indexed are skipped.
+        """
+        movies = movies.drop_duplicates(subset="id")
+        movies = movies[~movies["id"].isin(self.positions.keys())]
+        if not movies.empty:
+            self._add(movies, self.embedder.transform(movies["description"]))
+
+    def _add(self, movies: pd.DataFrame, vectors: np.ndarray) -> None:
+        positions = self.index.add(vectors)
+        titles = movies["title"] if "title" in movies.columns else movies["id"]
+        for position, title_id, title in zip(positions, movies["id"], titles):
+            self.positions[str(title_id)] = int(position)
+            self.ids.append(str(title_id))
+            self.titles.append(str(title))
+
+    def recommend(
+        self, title_id: str, k: int = 10, nprobe: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Returns the k movies whose descriptions are most similar to the given movie's.
+
+        :param title_id: The id of the movie to base the recommendations on.
+        :param k: The number of recommendations.
+        :param nprobe: Optional number of inverted lists to scan (recall/latency knob).
+        :return: A list of {"id", "title", "score"} dictionaries; empty for unknown ids.
+        """
+        position = self.positions.get(title_id)
+        if position is None:
+            return []
+        neighbors, scores = self.index.search(
+            self.index.vectors[position], k + 1, nprobe
+        )
+        return [
+            {"id": self.ids[n], "title": self.titles[n], "score": float(s)}
+            for n, s in zip(neighbors, scores)
+            if n != position
+        ][:k]
+
+
+if __name__ == "__main__":
+    from api.factory import create_data_api
+
+    recommender = EmbeddingRecommender.from_api(create_data_api())
+    rng = np.random.default_rng(0)
+    sample = rng.choice(len(recommender.ids), min(200, len(recommender.ids)), False)
+    for row in recommender.index.benchmark(recommender.index.vectors[sample]):
+        print(
+            f"nprobe={row['nprobe']:>3}  recall@10={row['recall']:.3f}  "
+            f"latency={row['latency_ms']:.3f} ms"
+        )
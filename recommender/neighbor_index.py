@@ -0,0 +1,210 @@
+import json
+import logging
+import os
+import time
+import uuid
+import numpy as np
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
+
+if TYPE_CHECKING:
+    from recommender.similarity import SimilarityEngine
+
+# Bumped whenever the on-disk layout changes; older indexes are rejected on load
+INDEX_FORMAT_VERSION = 3
+DEFAULT_INDEX_DIR = Path(__file__).parent / "../data/neighbor_index"
+
+HEADER_FILE = "header.json"
+# Every array is saved as <name>-<build id>.npy, the build id being in the header
+ARRAY_NAMES = ["neighbors", "scores", "ids", "titles", "order"]
+
+
+class NeighborIndex:
+    """
+    Precomputed top-k similar movies for every movie in the catalog. The index is
+    stored as plain .npy arrays (int32 neighbor positions, float32 scores, fixed-width
+    ids and titles, and the int32 permutation sorting the ids) plus a JSON header,
+    and is loaded with np.load(mmap_mode="r") so processes start instantly and share
+    the pages through the OS page cache. Ids are looked up by binary search on the
+    memory-mapped arrays, so no per-process lookup table is built.
+    """
+
+    def __init__(
+        self,
+        neighbors: np.ndarray,
+        scores: np.ndarray,
+        ids: np.ndarray,
+        titles: np.ndarray,
+        header: Optional[Dict[str, Any]] = None,
+        order: Optional[np.ndarray] = None,
+    ):
+        """
+        :param neighbors: (movies x k) int32 positions of the neighbors, -1 for padding.
+        :param scores: (movies x k) float32 cosine similarities, best first.
+        :param ids: The movie ids, one per row.
+        :param titles: The movie titles, one per row.
+        :param header: The metadata stored alongside the arrays.
+        :param order: The positions of the ids in sorted order; computed when omitted.
+        """
+        self.neighbors = neighbors
+        self.scores = scores
+        self.ids = ids
+        self.titles = titles
+        self.header = header or {}
+        if order is None:
+            order = np.argsort(ids, kind="stable").astype(np.int32)
+        self.order = order
+
+    @property
+    def k(self) -> int:
+        """
+        The number of neighbors stored per movie.
+        """
+        return self.neighbors.shape[1]
+
+    @classmethod
+    def build(
+        cls, engine: "SimilarityEngine", k: int = 50, block_size: int = 1024
+    ) -> "NeighborIndex":
+        """
+        Computes the top-k neighbors of every movie. Rows are processed in blocks of
+        block_size, so memory is bounded by one (block_size x movies) score block.
+
+        :param engine: The similarity engine holding the feature matrix.
+        :param k: The number of neighbors kept per movie.
+        :param block_size: The number of query rows per matrix product.
+        """
+        start_time = time.perf_counter()
+        count = engine.features.shape[0]
+        neighbors = np.full((count, k), -1, dtype=np.int32)
+        scores = np.zeros((count, k), dtype=np.float32)
+        for start in range(0, count, block_size):
+            rows = np.arange(start, min(start + block_size, count))
+            for row, (row_neighbors, row_scores) in zip(rows, engine.top_k(rows, k)):
+                neighbors[row, : len(row_neighbors)] = row_neighbors
+                scores[row, : len(row_scores)] = row_scores
+
+        header = {
+            "format_version": INDEX_FORMAT_VERSION,
+            "count": int(count),
+            "k": int(k),
+            "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        logging.info(
+            f"Built neighbor index for {count} movies (k={k}) in "
+            f"{time.perf_counter() - start_time:.2f}s"
+        )
+        return cls(
+            neighbors,
+            scores,
+            np.asarray(engine.ids, dtype=str),
+            np.asarray(engine.titles, dtype=str),
+            header,
+        )
+
+    def save(self, directory: Union[str, Path] = DEFAULT_INDEX_DIR) -> None:
+        """
+        Writes the index to a directory. The arrays are written under names carrying
+        a new build id, and the header naming that build id is moved into place last,
+        so a concurrent load() reads either the previous index or this one, never a
+        mix of both. The arrays of previous builds are removed afterwards; processes
+        that already mapped them keep their pages.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        build_id = uuid.uuid4().hex
+        for name in ARRAY_NAMES:
+            path = directory / _array_file(name, build_id)
+            temporary = directory / f".{path.name}.tmp"
+            with open(temporary, "wb") as file:
+                np.save(file, getattr(self, name))
+            os.replace(temporary, path)
+
+        header = {**self.header, "count": len(self.ids), "build_id": build_id}
+        temporary = directory / f".{HEADER_FILE}.{build_id}.tmp"
+        temporary.write_text(json.dumps(header, indent=2))
+        os.replace(temporary, directory / HEADER_FILE)
+        self.header = header
+        for path in directory.glob("*.npy"):
+            if not path.name.endswith(f"-{build_id}.npy"):
+                path.unlink(missing_ok=True)
+        logging.info(f"Neighbor index saved to {directory}")
+
+    @classmethod
+    def load(
+        cls, directory: Union[str, Path] = DEFAULT_INDEX_DIR, mmap: bool = True
+    ) -> "NeighborIndex":
+        """
+        Loads an index written by save(), memory-mapping the arrays by default. If a
+        rebuild removes the arrays named by the header before they are opened, the
+        new header is read once more.
+
+        :raises FileNotFoundError: If no index was saved in the directory.
+        :raises ValueError: If the index was written in another format version, or
+                            its arrays do not all have a row per movie.
+        """
+        directory = Path(directory)
+        for attempt in range(2):
+            header = json.loads((directory / HEADER_FILE).read_text())
+            if header.get("format_version") != INDEX_FORMAT_VERSION:
+                raise ValueError(
+                    f"Unsupported neighbor index version "
+                    f"{header.get('format_version')}, expected {INDEX_FORMAT_VERSION}"
+                )
+            try:
+                arrays = {
+                    name: np.load(
+                        directory / _array_file(name, header["build_id"]),
+                        mmap_mode="r" if mmap else None,
+                    )
+                    for name in ARRAY_NAMES
+                }
+                break
+            except FileNotFoundError:
+                if attempt:
+                    raise
+        lengths = {name: len(array) for name, array in arrays.items()}
+        if set(lengths.values()) != {header["count"]}:
+            raise ValueError(
+                f"Neighbor index arrays do not match its {header['count']} movies: "
+                f"{lengths}"
+            )
+        return cls(header=header, **arrays)
+
+    def position(self, title_id: str) -> Optional[int]:
+        """
+        The row of the given movie id, or None for unknown ids.
+        """
+        rank = int(np.searchsorted(self.ids, title_id, sorter=self.order))
+        if rank == len(self.order):
+            return None
+        position = int(self.order[rank])
+        return position if self.ids[position] == title_id else None
+
+    def recommend_similar(self, title_id: str, k: int = 10) -> List[Dict[str, Any]]:
+        """
+        Returns up to k precomputed neighbors of the given movie, best match first.
+
+        :return: A list of {"id", "title", "score"} dictionaries; empty for unknown ids.
+        """
+        position = self.position(title_id)
+        if position is None:
+            return []
+        neighbors = self.neighbors[position, :k]
+        scores = self.scores[position, :k]
+        return [
+            {
+                "id": str(self.ids[n]),
+                "title": str(self.titles[n]),
+                "score": float(s),
+            }
+            for n, s in zip(neighbors, scores)
+            if n >= 0
+        ]
+
+
+def _array_file(name: str, build_id: str) -> str:
+    """
+    The file name of an array of the index written by the given build.
+    """
+    return f"{name}-{build_id}.npy"
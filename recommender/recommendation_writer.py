@@ -0,0 +1,163 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+_STOP = object()
+
+
+class RecommendationWriter:
+    """
+    Records served recommendations in the background. Titles are put on a bounded
+    queue and a worker thread writes them to the recommendations table in batches,
+    flushing when a batch is full or when its oldest title has waited flush_interval
+    seconds. Pending titles are flushed when the writer is closed or the process exits.
+    """
+
+    def __init__(
+        self,
+        api,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_queue_size: int = 10_000,
+        put_timeout: float = 0.1,
+    ):
+        """
+        :param api: The DataAPI used to insert the batches.
+        :param batch_size: Maximum number of titles written per INSERT.
+        :param flush_interval: Maximum seconds a title waits before its batch is written.
+        :param max_queue_size: Maximum number of titles waiting to be written.
+        :param put_timeout: Seconds record() blocks on a full queue before dropping the title.
+        """
+        self.api = api
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._counters = {"queued": 0, "flushed": 0, "dropped": 0, "failed": 0}
+        self._counters_lock = threading.Lock()
+        # Guards _closed and the number of record() calls putting a title right now
+        self._state = threading.Condition()
+        self._closed = False
+        self._putting = 0
+        self._thread = threading.Thread(
+            target=self._run, name="recommendation-writer", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, title: str, block: bool = True) -> bool:
+        """
+        Queues a title to be recorded. Blocks for up to put_timeout seconds when the
+        queue is full, then drops the title.
+
+        :param block: Drop the title right away if the queue is full, e.g. when called
+                      from an event loop.
+        :return: True if the title was queued, False if it was dropped.
+        """
+        with self._state:
+            accepting = not self._closed
+            if accepting:
+                self._putting += 1
+        if accepting:
+            try:
+                self._queue.put(title, block=block, timeout=self.put_timeout)
+                self._count("queued")
+                return True
+            except queue.Full:
+                pass
+            finally:
+                with self._state:
+                    self._putting -= 1
+                    self._state.notify_all()
+        self._count("dropped")
+        return False
+
+    def flush(self) -> None:
+        """
+        Blocks until every queued title has been written (or has failed to be written).
+        """
+        self._queue.join()
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Stops accepting titles, writes everything still queued and stops the worker.
+        Titles accepted by record() calls running concurrently are queued before the
+        worker is told to stop, so they are written too.
+        """
+        with self._state:
+            if self._closed:
+                return
+            self._closed = True
+            self._state.wait_for(lambda: self._putting == 0)
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        atexit.unregister(self.close)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the queued, flushed, dropped and failed counters and the queue depth.
+        """
+        with self._counters_lock:
+            snapshot = dict(self._counters)
+        snapshot["pending"] = self._queue.qsize()
+        return snapshot
+
+    def _count(self, counter: str, amount: int = 1) -> None:
+        with self._counters_lock:
+            self._counters[counter] += amount
+
+    def _run(self) -> None:
+        batch: List[str] = []
+        deadline = 0.0
+        while True:
+            timeout = max(0.0, deadline - time.monotonic()) if batch else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                # Every accepted title was queued before the stop marker
+                batch.extend(self._drain())
+                self._write(batch)
+                self._queue.task_done()
+                return
+            if item is not None:
+                if not batch:
+                    deadline = time.monotonic() + self.flush_interval
+                batch.append(item)
+            if batch and (
+                len(batch) >= self.batch_size or time.monotonic() >= deadline
+            ):
+                self._write(batch)
+                batch = []
+
+    def _drain(self) -> List[str]:
+        items = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return items
+            if item is _STOP:
+                self._queue.task_done()
+            else:
+                items.append(item)
+
+    def _write(self, batch: List[str]) -> None:
+        if not batch:
+            return
+        try:
+            self.api.insert_rows(
+                "recommendations", ["title"], [(title,) for title in batch]
+            )
+            self._count("flushed", len(batch))
+        except Exception as e:
+            logging.error(f"Error recording {len(batch)} recommendations: {e}")
+            self._count("failed", len(batch))
+        finally:
+            for _ in batch:
+                self._queue.task_done()
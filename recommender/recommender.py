@@ -1,51 +1,363 @@
-from api.data_api import DataAPI
-from config.db_setup import db_config
+import asyncio
 import random
-from config.logging_config import setup_logging
+import threading
+import time
+import numpy as np
+from config.logging_config import RateLimitedLog, setup_logging
+from monitoring.metrics import metrics
+from recommender.recommendation_writer import RecommendationWriter
+from recommender.neighbor_index import DEFAULT_INDEX_DIR, NeighborIndex
 import logging
-from typing import Optional
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
 
+if TYPE_CHECKING:
+    # Imported on first use, as they pull in pandas and scipy
+    from recommender.embeddings import EmbeddingRecommender
+    from recommender.similarity import SimilarityEngine
 
-setup_logging()
+# Messages that can repeat on every request
+rate_limited_log = RateLimitedLog()
 
 
 class MoviesRecommender:
-    def __init__(self, api):
+    def __init__(
+        self,
+        api,
+        cache_ttl: Optional[float] = 300.0,
+        writer: Optional[RecommendationWriter] = None,
+        neighbor_index_dir: Optional[Union[str, Path]] = DEFAULT_INDEX_DIR,
+        async_api=None,
+    ):
+        """
+        :param api: The DataAPI used to read candidates and record recommendations.
+        :param cache_ttl: Seconds the in-memory candidate titles stay valid before they
+                          are reloaded from the database; None keeps them until
+                          invalidate_candidates() is called.
+        :param writer: Optional RecommendationWriter that records recommendations in
+                       background batches instead of one INSERT per call.
+        :param neighbor_index_dir: Directory of the precomputed NeighborIndex used by
+                                   recommend_similar; None always computes on the fly.
+        :param async_api: Optional AsyncDataAPI used by the async methods; without it
+                          they run the DataAPI queries in worker threads.
+        """
         self.api = api
+        self.async_api = async_api
+        self.writer = writer
+        self.neighbor_index_dir = neighbor_index_dir
+        self.cache_ttl = cache_ttl
+        self._candidates: Optional[np.ndarray] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._async_lock: Optional[asyncio.Lock] = None
+        self._similarity: Optional["SimilarityEngine"] = None
+        self._neighbor_index: Optional[NeighborIndex] = None
+        self._neighbor_index_checked = False
+        self._embeddings: Optional["EmbeddingRecommender"] = None
+
+    def _is_fresh(self) -> bool:
+        if self._candidates is None:
+            return False
+        return (
+            self.cache_ttl is None
+            or time.monotonic() - self._loaded_at < self.cache_ttl
+        )
+
+    def get_candidates(self) -> np.ndarray:
+        """
+        Returns the candidate movie titles as a numpy array, loading them from the
+        database only when the cache is empty or expired.
+        """
+        if not self._is_fresh():
+            with self._lock:
+                if not self._is_fresh():
+                    # Use double quotes for the column name
+                    result = self.api.select_data('SELECT "TITLE" FROM best_movies')
+                    self._candidates = np.asarray(
+                        result["TITLE"].dropna().astype(str), dtype=str
+                    )
+                    self._loaded_at = time.monotonic()
+        return self._candidates
+
+    async def aget_candidates(self) -> np.ndarray:
+        """
+        Async counterpart of get_candidates. Concurrent callers wait for a single
+        reload instead of each querying the database.
+        """
+        if not self._is_fresh():
+            if self._async_lock is None:
+                self._async_lock = asyncio.Lock()
+            async with self._async_lock:
+                if not self._is_fresh():
+                    query = 'SELECT "TITLE" FROM best_movies'
+                    if self.async_api is not None:
+                        result = await self.async_api.select_data(query)
+                    else:
+                        result = await asyncio.to_thread(self.api.select_data, query)
+                    self._candidates = np.asarray(
+                        result["TITLE"].dropna().astype(str), dtype=str
+                    )
+                    self._loaded_at = time.monotonic()
+        return self._candidates
+
+    def invalidate_candidates(self) -> None:
+        """
+        Drops the cached candidate titles, e.g. after best_movies was reloaded.
+        """
+        with self._lock:
+            self._candidates = None
 
+    @metrics.instrumented("recommender_call", method="get_random_recommendation")
     def get_random_recommendation(self) -> Optional[str]:
         """
-        Fetches a list of movie titles and returns one at random.
+        Returns one movie title at random from the cached candidates.
         """
         try:
-            # Use double quotes for the column name
-            result = self.api.select_data('SELECT "TITLE" FROM best_movies')
-            if not result.empty:
-                return random.choice(result["TITLE"].tolist())
+            candidates = self.get_candidates()
+            if len(candidates):
+                return str(random.choice(candidates))
             else:
-                logging.info("No movies found for recommendation.")
+                rate_limited_log.info("No movies found for recommendation.")
                 return None
         except Exception as e:
-            logging.error(f"Error fetching recommendations: {e}")
+            rate_limited_log.error("Error fetching recommendations: %s", e)
             return None
 
+    @metrics.instrumented("recommender_call", method="get_random_recommendations")
+    def get_random_recommendations(self, n: int) -> List[str]:
+        """
+        Returns up to n distinct movie titles sampled without replacement from the
+        cached candidates.
+        """
+        try:
+            candidates = self.get_candidates()
+            indices = random.sample(range(len(candidates)), min(n, len(candidates)))
+            if not indices:
+                rate_limited_log.info("No movies found for recommendation.")
+            return [str(candidates[i]) for i in indices]
+        except Exception as e:
+            rate_limited_log.error("Error fetching recommendations: %s", e)
+            return []
+
+    async def aget_random_recommendation(self) -> Optional[str]:
+        """
+        Async counterpart of get_random_recommendation.
+        """
+        try:
+            candidates = await self.aget_candidates()
+            if len(candidates):
+                return str(random.choice(candidates))
+            else:
+                rate_limited_log.info("No movies found for recommendation.")
+                return None
+        except Exception as e:
+            rate_limited_log.error("Error fetching recommendations: %s", e)
+            return None
+
+    async def aget_random_recommendations(self, n: int) -> List[str]:
+        """
+        Async counterpart of get_random_recommendations.
+        """
+        try:
+            candidates = await self.aget_candidates()
+            indices = random.sample(range(len(candidates)), min(n, len(candidates)))
+            if not indices:
+                rate_limited_log.info("No movies found for recommendation.")
+            return [str(candidates[i]) for i in indices]
+        except Exception as e:
+            rate_limited_log.error("Error fetching recommendations: %s", e)
+            return []
+
+    def get_similarity_engine(self) -> "SimilarityEngine":
+        """
+        Returns the content-based similarity engine, building it from the normalized
+        tables on first use.
+        """
+        if self._similarity is None:
+            with self._lock:
+                if self._similarity is None:
+                    from recommender.similarity import SimilarityEngine
+
+                    self._similarity = SimilarityEngine.from_api(self.api)
+        return self._similarity
+
+    def get_neighbor_index(self) -> Optional[NeighborIndex]:
+        """
+        Returns the precomputed neighbor index, memory-mapping it on first use, or
+        None if no index has been built.
+        """
+        if not self._neighbor_index_checked and self.neighbor_index_dir is not None:
+            with self._lock:
+                if not self._neighbor_index_checked:
+                    try:
+                        self._neighbor_index = NeighborIndex.load(
+                            self.neighbor_index_dir
+                        )
+                    except (FileNotFoundError, ValueError) as e:
+                        logging.info(f"Neighbor index unavailable ({e}).")
+                    self._neighbor_index_checked = True
+        return self._neighbor_index
+
+    def invalidate_similarity(self) -> None:
+        """
+        Drops the similarity engine and neighbor index so they are rebuilt or
+        reloaded on next use.
+        """
+        with self._lock:
+            self._similarity = None
+            self._neighbor_index = None
+            self._neighbor_index_checked = False
+            self._embeddings = None
+
+    @metrics.instrumented("recommender_call", method="recommend_similar")
+    def recommend_similar(self, title_id: str, k: int = 10) -> List[Dict[str, Any]]:
+        """
+        Returns the k movies most similar to the given movie by genres, production
+        countries, shared cast and crew and year/runtime/score.
+
+        :param title_id: The id of the movie (movies.id) to base the recommendations on.
+        :param k: The number of recommendations.
+        :return: A list of {"id", "title", "score"} dictionaries, best match first.
+        """
+        try:
+            index = self.get_neighbor_index()
+            if index is not None and k <= index.k:
+                recommendations = index.recommend_similar(title_id, k)
+            else:
+                recommendations = self.get_similarity_engine().recommend_similar(
+                    title_id, k
+                )
+            if not recommendations:
+                logging.debug("No similar movies found for %s.", title_id)
+            return recommendations
+        except Exception as e:
+            rate_limited_log.error("Error fetching similar recommendations: %s", e)
+            return []
+
+    @metrics.instrumented("recommender_call", method="recommend_similar_batch")
+    def recommend_similar_batch(
+        self, title_ids: List[str], k: int = 10
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Answers several recommend_similar queries at once: from the neighbor index
+        when it holds k neighbors, otherwise with one matrix product for the batch.
+
+        :return: One list of recommendations per id; empty for unknown ids.
+        """
+        try:
+            index = self.get_neighbor_index()
+            if index is not None and k <= index.k:
+                return [index.recommend_similar(title_id, k) for title_id in title_ids]
+            return self.get_similarity_engine().recommend_similar_batch(title_ids, k)
+        except Exception as e:
+            rate_limited_log.error("Error fetching similar recommendations: %s", e)
+            return [[] for _ in title_ids]
+
+    async def arecommend_similar(
+        self, title_id: str, k: int = 10
+    ) -> List[Dict[str, Any]]:
+        """
+        Async counterpart of recommend_similar. The scoring is CPU-bound and the
+        engine is built through the DataAPI, so it runs in a worker thread.
+        """
+        return await asyncio.to_thread(self.recommend_similar, title_id, k)
+
+    def get_embedding_recommender(self) -> "EmbeddingRecommender":
+        """
+        Returns the description embedding index, building it from the movies table
+        on first use.
+        """
+        if self._embeddings is None:
+            with self._lock:
+                if self._embeddings is None:
+                    from recommender.embeddings import EmbeddingRecommender
+
+                    self._embeddings = EmbeddingRecommender.from_api(self.api)
+        return self._embeddings
+
+    @metrics.instrumented("recommender_call", method="recommend_by_description")
+    def recommend_by_description(
+        self, title_id: str, k: int = 10, nprobe: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Returns the k movies whose descriptions are closest to the given movie's,
+        using an approximate nearest-neighbor search over description embeddings.
+
+        :param title_id: The id of the movie (movies.id) to base the recommendations on.
+        :param k: The number of recommendations.
+        :param nprobe: Optional number of index clusters to scan; higher values
+                       improve recall at the cost of latency.
+        :return: A list of {"id", "title", "score"} dictionaries, best match first.
+        """
+        try:
+            return self.get_embedding_recommender().recommend(title_id, k, nprobe)
+        except Exception as e:
+            rate_limited_log.error("Error fetching description recommendations: %s", e)
+            return []
+
+    async def arecommend_by_description(
+        self, title_id: str, k: int = 10, nprobe: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Async counterpart of recommend_by_description, run in a worker thread.
+        """
+        return await asyncio.to_thread(
+            self.recommend_by_description, title_id, k, nprobe
+        )
+
+    @metrics.instrumented("recommender_call", method="record_recommendation")
     def record_recommendation(self, title: Optional[str]) -> None:
         """
-        Records a movie title as a recommendation.
+        Records a movie title as a recommendation, through the background writer
+        if one was given.
         """
         try:
-            if title:
+            if title and self.writer is not None:
+                if not self.writer.record(title):
+                    rate_limited_log.warning(
+                        "Recommendation dropped, writer is full: %s", title
+                    )
+            elif title:
                 insert_query = "INSERT INTO recommendations (title) VALUES (%s)"
                 self.api.update_data(insert_query, (title,))
-                logging.info(f"Recorded recommendation: {title}")
+                logging.debug("Recorded recommendation: %s", title)
             else:
-                logging.warning("No title provided for recording.")
+                rate_limited_log.warning("No title provided for recording.")
         except Exception as e:
-            logging.error(f"Error recording recommendation: {e}")
+            rate_limited_log.error("Error recording recommendation: %s", e)
+
+    async def arecord_recommendation(self, title: Optional[str]) -> None:
+        """
+        Async counterpart of record_recommendation. The background writer is called
+        without blocking, so a full queue drops the title instead of stalling the
+        event loop.
+        """
+        try:
+            if title and self.writer is not None:
+                if not self.writer.record(title, block=False):
+                    rate_limited_log.warning(
+                        "Recommendation dropped, writer is full: %s", title
+                    )
+            elif title:
+                insert_query = "INSERT INTO recommendations (title) VALUES (%s)"
+                if self.async_api is not None:
+                    await self.async_api.update_data(insert_query, (title,))
+                else:
+                    await asyncio.to_thread(
+                        self.api.update_data, insert_query, (title,)
+                    )
+                logging.debug("Recorded recommendation: %s", title)
+            else:
+                rate_limited_log.warning("No title provided for recording.")
+        except Exception as e:
+            rate_limited_log.error("Error recording recommendation: %s", e)
 
 
 if __name__ == "__main__":
-    api = DataAPI(db_config)
+    from api.factory import create_data_api
+
+    setup_logging()
+    api = create_data_api()
     recommender = MoviesRecommender(api)
 
     recommended_title = recommender.get_random_recommendation()
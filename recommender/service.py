@@ -0,0 +1,472 @@
+import argparse
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+from api.backend import DataBackend
+from api.factory import BACKENDS, create_data_api
+from api.sqlite_data_api import SQLiteDataAPI
+from config.logging_config import RateLimitedLog, setup_logging
+from monitoring.metrics import metrics
+from recommender.recommender import MoviesRecommender
+from recommender.recommendation_writer import RecommendationWriter
+from scripts.data_loader import DataLoader
+from scripts.normalized_cache import NormalizedCache
+
+# Errors that can repeat on every request
+rate_limited_log = RateLimitedLog()
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent calls into batches. Items submitted from any thread are
+    collected by a worker thread until max_batch_size items are waiting or max_wait
+    seconds passed since the first one, then handed to the handler in a single call.
+    The handler returns one result per item, in order.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 64,
+        max_wait: float = 0.005,
+        name: str = "micro-batcher",
+    ):
+        """
+        :param handler: Called with a list of items; returns a list of results.
+        :param max_batch_size: Maximum number of items per handler call.
+        :param max_wait: Seconds the first item of a batch waits for more items.
+        :param name: The name of the worker thread.
+        """
+        self.handler = handler
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue: queue.Queue = queue.Queue()
+        self._counters = {"batches": 0, "items": 0, "max_batch": 0}
+        self._counters_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, item: Any) -> Future:
+        """
+        Queues an item and returns a Future resolved with its result.
+        """
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the number of batches and items handled and the mean and largest
+        batch size.
+        """
+        with self._counters_lock:
+            stats = dict(self._counters)
+        stats["mean_batch"] = (
+            stats["items"] / stats["batches"] if stats["batches"] else 0
+        )
+        return stats
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(
+                        self._queue.get(timeout=remaining)
+                        if remaining > 0
+                        else self._queue.get_nowait()
+                    )
+                except queue.Empty:
+                    break
+            self._handle(batch)
+
+    def _handle(self, batch: List[Tuple[Any, Future]]) -> None:
+        items = [item for item, _ in batch]
+        try:
+            results = self.handler(items)
+        except Exception as e:
+            rate_limited_log.error("Batch of %d failed: %s", len(items), e)
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+        with self._counters_lock:
+            self._counters["batches"] += 1
+            self._counters["items"] += len(batch)
+            self._counters["max_batch"] = max(self._counters["max_batch"], len(batch))
+
+
+class LatencyStats:
+    """
+    Per-endpoint request counters and latency percentiles over the most recent
+    window_size requests.
+    """
+
+    def __init__(self, window_size: int = 10_000):
+        self.window_size = window_size
+        self.started = time.monotonic()
+        self._latencies: Dict[str, Deque[float]] = defaultdict(
+            lambda: deque(maxlen=self.window_size)
+        )
+        self._counts: Dict[str, int] = defaultdict(int)
+        self._errors: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, seconds: float, error: bool = False) -> None:
+        """
+        Records one request and its latency.
+        """
+        with self._lock:
+            self._latencies[endpoint].append(seconds)
+            self._counts[endpoint] += 1
+            if error:
+                self._errors[endpoint] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns the request and error counts, the throughput since startup and the
+        p50/p99 latency in milliseconds of every endpoint.
+        """
+        with self._lock:
+            latencies = {name: list(values) for name, values in self._latencies.items()}
+            counts = dict(self._counts)
+            errors = dict(self._errors)
+        uptime = time.monotonic() - self.started
+        endpoints = {}
+        for name, values in latencies.items():
+            p50, p99 = np.percentile(values, [50, 99]) * 1000
+            endpoints[name] = {
+                "requests": counts[name],
+                "errors": errors.get(name, 0),
+                "requests_per_second": counts[name] / uptime,
+                "p50_ms": float(p50),
+                "p99_ms": float(p99),
+            }
+        return {
+            "uptime_seconds": uptime,
+            "requests": sum(counts.values()),
+            "requests_per_second": sum(counts.values()) / uptime,
+            "endpoints": endpoints,
+        }
+
+
+class RecommendationService:
+    """
+    Keeps a MoviesRecommender and its data warm in memory and answers requests
+    through micro-batches: the random picks of a batch share one candidate lookup
+    (one database fetch when the candidates expired), and the similar-movie queries
+    of a batch share one matrix product.
+    """
+
+    def __init__(
+        self,
+        recommender: MoviesRecommender,
+        max_batch_size: int = 64,
+        max_wait: float = 0.005,
+        record: bool = False,
+    ):
+        """
+        :param recommender: The recommender answering the requests.
+        :param max_batch_size: Maximum number of requests per batch.
+        :param max_wait: Seconds a request waits for others to join its batch.
+        :param record: Record the random picks through the recommender.
+        """
+        self.recommender = recommender
+        self.record = record
+        self.latency = LatencyStats()
+        self.random_batcher = MicroBatcher(
+            self._random_batch, max_batch_size, max_wait, "random-batcher"
+        )
+        self.similar_batcher = MicroBatcher(
+            self._similar_batch, max_batch_size, max_wait, "similar-batcher"
+        )
+
+    def warm_up(self) -> None:
+        """
+        Loads the candidates and the neighbor index or similarity engine up front,
+        so the first requests do not pay for it.
+        """
+        start = time.perf_counter()
+        self.recommender.get_candidates()
+        if self.recommender.get_neighbor_index() is None:
+            self.recommender.get_similarity_engine()
+        logging.info(
+            f"Recommendation service warmed up in {time.perf_counter() - start:.2f}s"
+        )
+
+    def random(self, n: int = 1) -> List[str]:
+        """
+        Returns up to n distinct random titles.
+        """
+        return self.random_batcher.submit(n).result()
+
+    def similar(self, title_id: str, k: int = 10) -> List[Dict[str, Any]]:
+        """
+        Returns the k movies most similar to the given movie.
+        """
+        return self.similar_batcher.submit((title_id, k)).result()
+
+    def batch(
+        self, title_ids: List[str], k: int = 10
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Returns the k most similar movies of every given movie. The ids join the
+        current batch window like individual requests.
+        """
+        futures = [self.similar_batcher.submit((title_id, k)) for title_id in title_ids]
+        return {
+            title_id: future.result() for title_id, future in zip(title_ids, futures)
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the latency and throughput counters and the batch sizes.
+        """
+        stats = self.latency.snapshot()
+        stats["batches"] = {
+            "random": self.random_batcher.stats(),
+            "similar": self.similar_batcher.stats(),
+        }
+        return stats
+
+    def _random_batch(self, counts: List[int]) -> List[List[str]]:
+        candidates = self.recommender.get_candidates()
+        results = []
+        for n in counts:
+            indices = random.sample(range(len(candidates)), min(n, len(candidates)))
+            results.append([str(candidates[i]) for i in indices])
+        if self.record:
+            for titles in results:
+                for title in titles:
+                    self.recommender.record_recommendation(title)
+        return results
+
+    def _similar_batch(
+        self, queries: List[Tuple[str, int]]
+    ) -> List[List[Dict[str, Any]]]:
+        # One matrix product per distinct k in the batch
+        results: List[Optional[List[Dict[str, Any]]]] = [None] * len(queries)
+        positions_by_k: Dict[int, List[int]] = defaultdict(list)
+        for position, (_, k) in enumerate(queries):
+            positions_by_k[k].append(position)
+        for k, positions in positions_by_k.items():
+            answers = self.recommender.recommend_similar_batch(
+                [queries[position][0] for position in positions], k
+            )
+            for position, answer in zip(positions, answers):
+                results[position] = answer
+        return results
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """
+    Routes the HTTP requests to the RecommendationService of the server.
+
+    GET  /recommend/random?n=1
+    GET  /recommend/similar/{id}?k=10
+    POST /recommend/batch  with a JSON body {"ids": [...], "k": 10}
+    GET  /metrics
+    GET  /metrics/prometheus
+    GET  /health
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def service(self) -> RecommendationService:
+        return self.server.service
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path == "/recommend/random":
+            self._timed(
+                "random",
+                lambda: {"titles": self.service.random(_int(query, "n", 1))},
+            )
+        elif url.path.startswith("/recommend/similar/"):
+            title_id = url.path[len("/recommend/similar/") :]
+            self._timed(
+                "similar",
+                lambda: {
+                    "id": title_id,
+                    "recommendations": self.service.similar(
+                        title_id, _int(query, "k", 10)
+                    ),
+                },
+            )
+        elif url.path == "/metrics":
+            self._send(200, self.service.stats())
+        elif url.path == "/metrics/prometheus":
+            self._send_text(200, metrics.to_prometheus())
+        elif url.path == "/health":
+            self._send(200, {"status": "ok"})
+        else:
+            self._send(404, {"error": f"Unknown path {url.path}"})
+
+    def do_POST(self) -> None:
+        url = urlparse(self.path)
+        if url.path != "/recommend/batch":
+            self._send(404, {"error": f"Unknown path {url.path}"})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+            title_ids = [str(title_id) for title_id in body["ids"]]
+            k = int(body.get("k", 10))
+        except (ValueError, KeyError, TypeError) as e:
+            self._send(400, {"error": f"Expected a JSON body with ids: {e}"})
+            return
+        self._timed("batch", lambda: {"results": self.service.batch(title_ids, k)})
+
+    def _timed(self, endpoint: str, answer: Callable[[], Dict[str, Any]]) -> None:
+        start = time.perf_counter()
+        try:
+            status, body = 200, answer()
+        except ValueError as e:
+            status, body = 400, {"error": str(e)}
+        except Exception as e:
+            rate_limited_log.error("Error answering %s: %s", self.path, e, key="answer")
+            status, body = 500, {"error": "Internal error"}
+        self.service.latency.record(
+            endpoint, time.perf_counter() - start, error=status >= 500
+        )
+        self._send(status, body)
+
+    def _send(self, status: int, body: Dict[str, Any]) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_text(self, status: int, text: str) -> None:
+        payload = text.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format: str, *args) -> None:
+        # Access logs would dominate the log file at serving rates
+        pass
+
+
+def _int(query: Dict[str, List[str]], name: str, default: int) -> int:
+    """
+    Reads a positive integer query parameter.
+
+    :raises ValueError: If the parameter is not a positive integer.
+    """
+    value = int(query.get(name, [default])[0])
+    if value < 1:
+        raise ValueError(f"{name} must be a positive integer")
+    return value
+
+
+def make_server(
+    service: RecommendationService, host: str = "127.0.0.1", port: int = 8000
+) -> ThreadingHTTPServer:
+    """
+    Creates the HTTP server; every connection is handled on its own thread, and
+    concurrent requests meet in the service's micro-batches.
+    """
+    server = ThreadingHTTPServer((host, port), RequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def memory_api() -> DataBackend:
+    """
+    Builds an in-memory SQLite backend holding the normalized tables and
+    best_movies, read from the CSV files in data/ (or the normalized data cache).
+    """
+    api = SQLiteDataAPI()
+    DataLoader(api, cache=NormalizedCache(), max_workers=1).load_csv_to_db()
+    return api
+
+
+def main() -> None:
+    """
+    Starts the recommendation service.
+    """
+    parser = argparse.ArgumentParser(description="Movie recommendation HTTP service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--backend",
+        choices=[*BACKENDS, "memory"],
+        help="Storage backend (defaults to NETFLIX_DB_BACKEND or postgres); memory "
+        "loads the CSV files in data/ into an in-process database",
+    )
+    parser.add_argument(
+        "--batch-window",
+        type=float,
+        default=5.0,
+        help="Milliseconds a request waits for others to join its batch",
+    )
+    parser.add_argument(
+        "--max-batch-size",
+        type=int,
+        default=64,
+        help="Maximum number of requests answered per batch",
+    )
+    parser.add_argument(
+        "--record",
+        action="store_true",
+        help="Record the random recommendations in the recommendations table",
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help="Record backend and recommender metrics, served on /metrics/prometheus",
+    )
+    args = parser.parse_args()
+
+    setup_logging()
+    if args.metrics:
+        metrics.enable()
+    if args.backend == "memory":
+        api = memory_api()
+    else:
+        api = create_data_api({"backend": args.backend} if args.backend else None)
+    writer = RecommendationWriter(api) if args.record else None
+    recommender = MoviesRecommender(api, writer=writer)
+    service = RecommendationService(
+        recommender,
+        max_batch_size=args.max_batch_size,
+        max_wait=args.batch_window / 1000,
+        record=args.record,
+    )
+    service.warm_up()
+
+    server = make_server(service, args.host, args.port)
+    logging.info(f"Recommendation service listening on {args.host}:{args.port}")
+    print(f"Serving recommendations on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if writer is not None:
+            writer.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+import logging
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from typing import Any, Dict, List, Optional, Tuple
+
+# Relative weight of each feature block in the cosine similarity
+DEFAULT_WEIGHTS = {
+    "genre": 1.0,
+    "country": 0.5,
+    "cast": 1.0,
+    "type": 0.25,
+    "year": 0.5,
+    "runtime": 0.25,
+    "score": 0.5,
+}
+
+# Movie columns one-hot encoded as (column, weight block, bucket width or None)
+MOVIE_FEATURES = [
+    ("type", "type", None),
+    ("release_year", "year", 10),
+    ("runtime", "runtime", 30),
+    ("imdb_score", "score", 1.0),
+]
+
+
+class SimilarityEngine:
+    """
+    Content-based recommender over the normalized movie tables. Every movie is
+    described by a sparse, L2-normalized feature vector (genres, production countries,
+    shared cast and crew, type and year/runtime/score buckets), so the cosine
+    similarity between movies is a single sparse matrix product.
+    """
+
+    def __init__(self, ids: np.ndarray, titles: np.ndarray, features: sp.csr_matrix):
+        """
+        :param ids: The movie ids, one per feature matrix row.
+        :param titles: The movie titles, one per feature matrix row.
+        :param features: The L2-normalized (movies x features) CSR matrix.
+        """
+        self.ids = ids
+        self.titles = titles
+        self.features = features
+        # Transposed copy in CSR form, so row-times-matrix products stay fast
+        self.features_t = features.T.tocsr()
+        self.positions = pd.Index(ids)
+
+    @classmethod
+    def from_frames(
+        cls,
+        movies: pd.DataFrame,
+        movie_genres: pd.DataFrame,
+        movie_countries: pd.DataFrame,
+        credits: pd.DataFrame,
+        weights: Optional[Dict[str, float]] = None,
+    ) -> "SimilarityEngine":
+        """
+        Builds the feature matrix from the DataFrames produced by DataNormalizer.
+
+        :param movies: The movies table (id, title, type, release_year, runtime, imdb_score).
+        :param movie_genres: The movie_genres link table (id, genre_id).
+        :param movie_countries: The movie_countries link table (id, country_id).
+        :param credits: The credits table (person_id, id, ...).
+        :param weights: Optional per-block weights overriding DEFAULT_WEIGHTS.
+        """
+        weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        movies = movies.drop_duplicates(subset="id")
+        ids = movies["id"].to_numpy()
+        positions = pd.Index(ids)
+
+        blocks = [
+            _link_block(positions, movie_genres["id"], movie_genres["genre_id"]),
+            _link_block(
+                positions, movie_countries["id"], movie_countries["country_id"]
+            ),
+            _cast_block(positions, credits),
+        ]
+        block_names = ["genre", "country", "cast"]
+        for column, name, bucket_width in MOVIE_FEATURES:
+            if column not in movies.columns:
+                continue
+            values = movies[column]
+            if bucket_width is not None:
+                values = np.floor(pd.to_numeric(values, errors="coerce") / bucket_width)
+            blocks.append(_link_block(positions, movies["id"], values))
+            block_names.append(name)
+
+        features = sp.hstack(
+            [block * weights[name] for block, name in zip(blocks, block_names)],
+            format="csr",
+            dtype=np.float32,
+        )
+        norms = np.sqrt(np.asarray(features.multiply(features).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        features = sp.diags(1.0 / norms).dot(features).astype(np.float32).tocsr()
+
+        titles = movies["title"].to_numpy() if "title" in movies.columns else ids.copy()
+        logging.info(
+            f"Built similarity features: {features.shape[0]} movies x "
+            f"{features.shape[1]} features, {features.nnz} non-zeros"
+        )
+        return cls(ids, titles, features)
+
+    @classmethod
+    def from_api(cls, api, **kwargs) -> "SimilarityEngine":
+        """
+        Builds the engine from the normalized tables in the database.
+        """
+        return cls.from_frames(
+            api.select_data("SELECT * FROM movies"),
+            api.select_data("SELECT id, genre_id FROM movie_genres"),
+            api.select_data("SELECT id, country_id FROM movie_countries"),
+            api.select_data("SELECT person_id, id FROM credits"),
+            **kwargs,
+        )
+
+    def top_k(self, rows: np.ndarray, k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Finds the k most similar movies for each of the given matrix rows with a
+        single sparse matrix product.
+
+        :param rows: Positions of the query movies in the feature matrix.
+        :param k: The number of neighbors per query.
+        :return: One (positions, scores) pair per query, best match first; movies
+                 with no overlapping feature are never returned.
+        """
+        scores = (self.features[rows] @ self.features_t).tocsr()
+        results = []
+        for i, row in enumerate(rows):
+            start, end = scores.indptr[i], scores.indptr[i + 1]
+            neighbors = scores.indices[start:end]
+            values = scores.data[start:end]
+            keep = neighbors != row
+            neighbors, values = neighbors[keep], values[keep]
+            if len(values) > k:
+                best = np.argpartition(-values, k)[:k]
+                neighbors, values = neighbors[best], values[best]
+            order = np.argsort(-values, kind="stable")
+            results.append((neighbors[order], values[order]))
+        return results
+
+    def recommend_similar(self, title_id: str, k: int = 10) -> List[Dict[str, Any]]:
+        """
+        Returns the k movies most similar to the given movie.
+
+        :param title_id: The id of the movie to find similar movies for.
+        :param k: The number of recommendations.
+        :return: A list of {"id", "title", "score"} dictionaries, best match first.
+        """
+        return self.recommend_similar_batch([title_id], k)[0]
+
+    def recommend_similar_batch(
+        self, title_ids: List[str], k: int = 10
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Answers several recommend_similar queries with one matrix product. Unknown
+        ids get an empty list.
+        """
+        rows = self.positions.get_indexer(title_ids)
+        known = rows >= 0
+        answers = iter(self.top_k(rows[known], k)) if known.any() else iter(())
+        results = []
+        for is_known in known:
+            if not is_known:
+                results.append([])
+                continue
+            neighbors, scores = next(answers)
+            results.append(
+                [
+                    {
+                        "id": str(self.ids[n]),
+                        "title": str(self.titles[n]),
+                        "score": float(s),
+                    }
+                    for n, s in zip(neighbors, scores)
+                ]
+            )
+        return results
+
+
+def _link_block(
+    positions: pd.Index, movie_ids: pd.Series, values: pd.Series
+) -> sp.csr_matrix:
+    """
+    One-hot encodes (movie id, value) pairs into a (movies x distinct values) matrix.
+    Pairs with an unknown movie id or a missing value are ignored.
+    """
+    rows = positions.get_indexer(movie_ids)
+    values = pd.Series(np.asarray(values))
+    keep = (rows >= 0) & values.notna().to_numpy()
+    columns, uniques = pd.factorize(values[keep])
+    matrix = sp.csr_matrix(
+        (np.ones(len(columns), dtype=np.float32), (rows[keep], columns)),
+        shape=(len(positions), max(len(uniques), 1)),
+    )
+    # Duplicate pairs are summed by the constructor; keep the encoding binary
+    matrix.data[:] = 1.0
+    return matrix
+
+
+def _cast_block(positions: pd.Index, credits: pd.DataFrame) -> sp.csr_matrix:
+    """
+    One-hot encodes the people credited on each movie, keeping only people credited
+    on at least two movies since nobody else can link two movies together.
+    """
+    pairs = credits[["id", "person_id"]].drop_duplicates()
+    counts = pairs["person_id"].map(pairs["person_id"].value_counts())
+    pairs = pairs[counts.to_numpy() >= 2]
+    return _link_block(positions, pairs["id"], pairs["person_id"])
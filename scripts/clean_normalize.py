@@ -1,8 +1,115 @@
+import numpy as np
 import pandas as pd
 from pathlib import Path
 import logging
 from config.logging_config import setup_logging
-from typing import Dict, Any, Tuple
+from monitoring.metrics import metrics
+from scripts.normalized_cache import CACHED_TABLES, NormalizedCache
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+# Bump whenever the normalized output changes, so cached tables are rebuilt
+NORMALIZER_VERSION = 1
+
+# Columns and dtypes of the raw files when they are read in chunks, so that every
+# chunk has the same schema whatever values it happens to contain
+TITLES_DTYPES = {
+    "index": "int64",
+    "id": "object",
+    "title": "object",
+    "type": "object",
+    "description": "object",
+    "release_year": "Int64",
+    "age_certification": "object",
+    "runtime": "Int64",
+    "genres": "object",
+    "production_countries": "object",
+    "seasons": "float64",
+    "imdb_id": "object",
+    "imdb_score": "float64",
+    "imdb_votes": "float64",
+}
+CREDITS_DTYPES = {
+    "index": "int64",
+    "person_id": "int64",
+    "id": "object",
+    "name": "object",
+    "character": "object",
+    "role": "object",
+}
+DEFAULT_CHUNK_SIZE = 100_000
+# Separators between the characters of a credit, longest first
+CHARACTER_SEPARATORS = r" / |;|/"
+
+# Lookup tables with generated ids: (value column, id column, table referencing the id)
+LOOKUP_TABLES = {
+    "genres": ("genre", "genre_id", "movie_genres"),
+    "countries": ("country", "country_id", "movie_countries"),
+    "characters": ("character_name", "character_id", "credits"),
+}
+
+
+class IdDictionary:
+    """
+    Assigns dense ids, starting at 1, to values in order of first appearance and keeps
+    them across calls, so chunks normalized one after another share the same ids.
+    """
+
+    def __init__(self):
+        # Updated in place, so every call costs the size of its values, not of all
+        # the values seen so far
+        self.ids: Dict[Any, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def encode(self, values: pd.Index) -> Tuple[np.ndarray, np.ndarray, pd.Index]:
+        """
+        Looks up the ids of distinct values, assigning new ids to unseen ones.
+
+        :param values: Distinct values in order of first appearance.
+        :return: A tuple of the ids of the values, the ids assigned to unseen values
+                 and the unseen values themselves.
+        """
+        first_new_id = len(self.ids) + 1
+        ids = np.fromiter(
+            (self.ids.setdefault(value, len(self.ids) + 1) for value in values),
+            dtype=np.int64,
+            count=len(values),
+        )
+        unseen = ids >= first_new_id
+        return ids, ids[unseen], values[unseen]
+
+
+class SeenRows:
+    """
+    Remembers 64-bit hashes of the rows already emitted, so that duplicates spread
+    over several chunks are dropped as drop_duplicates() would drop them.
+    """
+
+    def __init__(self):
+        # Sorted blocks of hashes, each at least as large as the next one: a chunk is
+        # checked with one binary search per block, and a block is only merged into
+        # a larger one, so every hash is re-sorted O(log rows) times and costs 8 bytes
+        self.blocks: List[np.ndarray] = []
+
+    def __len__(self) -> int:
+        return sum(len(block) for block in self.blocks)
+
+    def drop_seen(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Returns the rows of df that were not passed to a previous call.
+        """
+        hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        unseen = np.ones(len(hashes), dtype=bool)
+        for block in self.blocks:
+            positions = np.minimum(np.searchsorted(block, hashes), len(block) - 1)
+            unseen &= block[positions] != hashes
+        block = np.unique(hashes[unseen])
+        while self.blocks and len(self.blocks[-1]) <= len(block):
+            block = np.union1d(self.blocks.pop(), block)
+        if len(block):
+            self.blocks.append(block)
+        return df[unseen]
 
 
 class DataNormalizer:
@@ -20,6 +127,7 @@ class DataNormalizer:
         self.titles_path = self.script_directory / f"../data/{titles_filename}"
         self.credits_path = self.script_directory / f"../data/{credits_filename}"
 
+    @metrics.instrumented("normalize", step="load_csv")
     def load_csv(self, file_path: Path) -> pd.DataFrame:
         """
         Loads a CSV file into a pandas DataFrame.
@@ -33,6 +141,32 @@ class DataNormalizer:
             logging.error(f"Error loading file: {e}")
             raise
 
+    def iter_csv(
+        self,
+        file_path: Path,
+        dtypes: Dict[str, str],
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Reads a CSV file chunk by chunk, keeping only the columns listed in dtypes.
+
+        :param file_path: The path of the CSV file.
+        :param dtypes: The dtype of every column to read.
+        :param chunk_size: The number of rows per chunk.
+        """
+        try:
+            reader = pd.read_csv(
+                file_path,
+                chunksize=chunk_size,
+                dtype=dtypes,
+                usecols=lambda column: column in dtypes,
+            )
+        except FileNotFoundError as e:
+            logging.error(f"File not found: {e}")
+            raise
+        with reader:
+            yield from reader
+
     def clean_characters(self, characters: str) -> list:
         """
         Cleans a string of characters by replacing certain separators and returns a list of characters.
@@ -53,98 +187,227 @@ class DataNormalizer:
         :param column_name: The name of the column to extract.
         :return: A pandas Series with the cleaned list-like data.
         """
-        return df[column_name].str.strip("[]").str.replace("'", "").str.split(", ")
+        # Same as .str.strip("[]").str.replace("'", "") in a single regex pass
+        return (
+            df[column_name]
+            .str.replace(r"^[\[\]]+|[\[\]]+$|'", "", regex=True)
+            .str.split(", ")
+        )
+
+    def factorize_list_column(
+        self,
+        df: pd.DataFrame,
+        column_name: str,
+        value_name: str,
+        dictionary: Optional[IdDictionary] = None,
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Normalizes a column of list literals into a lookup table and a link table.
+        The literals repeat a lot, so only the distinct ones are parsed and exploded;
+        pd.factorize then assigns dense ids in order of first appearance and the link
+        table is gathered straight from the codes, without string joins.
+
+        :param df: The DataFrame to process; it must have an "id" column.
+        :param column_name: The name of the list-literal column.
+        :param value_name: The name of the value column in the lookup table; the id
+                           column is named "<value_name>_id".
+        :param dictionary: Ids assigned by previous calls, when df is one chunk of a
+                           larger file; the lookup table then only holds new values.
+        :return: A tuple of the lookup DataFrame (value, id) and the link DataFrame (id, value id).
+        """
+        literal_codes, literals = pd.factorize(df[column_name])
+        lists = self.extract_column(
+            pd.DataFrame({column_name: literals.astype(object)}), column_name
+        )
+        # Distinct literals are in order of first appearance, so factorizing their
+        # values gives the same ids as factorizing the fully exploded column
+        value_codes, values = pd.factorize(lists.explode())
+        if dictionary is None:
+            dictionary = IdDictionary()
+        value_ids, new_ids, new_values = dictionary.encode(values)
+        id_column = f"{value_name}_id"
+
+        lookup_df = pd.DataFrame({value_name: new_values}, index=new_ids)
+        lookup_df[id_column] = lookup_df.index
+
+        # Expand every row to the ids of its literal; missing values keep one row,
+        # as with explode()
+        lengths = lists.str.len().to_numpy(dtype=np.int64)
+        starts = np.cumsum(lengths) - lengths
+        present = literal_codes >= 0
+        row_lengths = np.ones(len(literal_codes), dtype=np.int64)
+        row_lengths[present] = lengths[literal_codes[present]]
+        row_starts = np.zeros(len(literal_codes), dtype=np.int64)
+        row_starts[present] = starts[literal_codes[present]]
+
+        offsets = np.arange(row_lengths.sum()) - np.repeat(
+            np.cumsum(row_lengths) - row_lengths, row_lengths
+        )
+        expanded = np.repeat(present, row_lengths)
+        ids = np.zeros(len(expanded), dtype=np.int64)
+        ids[expanded] = value_ids[
+            value_codes[(np.repeat(row_starts, row_lengths) + offsets)[expanded]]
+        ]
+
+        link_ids = pd.Series(ids)
+        if not expanded.all():
+            link_ids = link_ids.where(expanded)
+        link_df = pd.DataFrame(
+            {"id": np.repeat(df["id"].to_numpy(), row_lengths), id_column: link_ids}
+        )
+        return lookup_df, link_df
+
+    def split_characters(
+        self, characters: pd.Series
+    ) -> Tuple[np.ndarray, np.ndarray, pd.Series]:
+        """
+        Vectorized counterpart of clean_characters for a whole column. Only values that
+        contain a separator are split, everything else is just stripped.
+
+        :param characters: A Series of strings containing characters separated by
+                           slashes or semicolons.
+        :return: A tuple of, for every cleaned character: the position of its row in
+                 the column, its position in the column as explode() would lay it out
+                 (missing values take up one position) and the character itself.
+        """
+        characters = characters.astype(object)
+        present = characters.notna().to_numpy()
+        has_separator = characters.str.contains("/|;", regex=True, na=False).to_numpy(
+            dtype=bool
+        )
+        single = present & ~has_separator
+        multiple = present & has_separator
+
+        split = characters[multiple].str.split(CHARACTER_SEPARATORS, regex=True)
+        lengths = split.str.len().to_numpy(dtype=np.int64)
+        counts = np.ones(len(characters), dtype=np.int64)
+        counts[multiple] = lengths
+        starts = np.cumsum(counts) - counts
+        offsets = np.arange(lengths.sum()) - np.repeat(
+            np.cumsum(lengths) - lengths, lengths
+        )
+
+        rows = np.concatenate(
+            [np.flatnonzero(single), np.repeat(np.flatnonzero(multiple), lengths)]
+        )
+        positions = starts[rows] + np.concatenate(
+            [np.zeros(single.sum(), dtype=np.int64), offsets]
+        )
+        names = np.concatenate(
+            [characters[single].to_numpy(), split.explode().to_numpy()]
+        )
+        order = np.argsort(positions)
+        return (
+            rows[order],
+            positions[order],
+            pd.Series(names[order], dtype=object).str.strip(),
+        )
 
+    @metrics.instrumented("normalize", step="normalize_credits")
     def normalize_credits(
-        self, credits_df: pd.DataFrame
+        self, credits_df: pd.DataFrame, characters: Optional[IdDictionary] = None
     ) -> Tuple[pd.DataFrame, pd.DataFrame]:
         """
         Normalizes the credits data by creating a separate DataFrame for characters.
+        The characters are split in a single vectorized pass and their ids are
+        assigned in order of first appearance with pd.factorize.
 
         :param credits_df: The DataFrame containing credits data.
+        :param characters: Character ids assigned to previous chunks of the file; the
+                           characters DataFrame then only holds new characters.
         :return: A tuple containing the normalized credits DataFrame and the characters DataFrame.
         """
-        characters_list = (
-            credits_df["character"].apply(self.clean_characters).explode().unique()
-        )
-        characters_df = pd.DataFrame(
-            characters_list, columns=["character_name"]
-        ).dropna()
-        characters_df.reset_index(drop=True, inplace=True)
-        characters_df.index += 1
+        rows, positions, names = self.split_characters(credits_df["character"])
+        character_codes, character_names = pd.factorize(names)
+        if characters is None:
+            characters = IdDictionary()
+        character_ids, new_ids, new_names = characters.encode(character_names)
+
+        characters_df = pd.DataFrame({"character_name": new_names}, index=new_ids)
         characters_df["character_id"] = characters_df.index
 
-        credits_exploded = credits_df.assign(
-            character=credits_df["character"].apply(self.clean_characters)
-        ).explode("character")
-        credits_df = pd.merge(
-            credits_exploded,
-            characters_df,
-            left_on="character",
-            right_on="character_name",
-            how="left",
-        )
-        credits_df = credits_df.dropna(subset=["character_id"])
-        credits_df["character_id"] = credits_df["character_id"].astype(int)
-        credits_df.drop(["index", "character", "character_name"], axis=1, inplace=True)
+        # One row per character, labelled like the rows of the exploded column
+        has_character = character_codes >= 0
+        credits_df = credits_df.drop(["index", "character"], axis=1).take(
+            rows[has_character]
+        )
+        credits_df.index = positions[has_character]
+        credits_df["character_id"] = character_ids[character_codes[has_character]]
         credits_df = credits_df.drop_duplicates()
 
         return credits_df, characters_df
 
+    @metrics.instrumented("normalize", step="normalize_titles")
     def normalize_titles(
-        self, titles_df: pd.DataFrame
+        self,
+        titles_df: pd.DataFrame,
+        genres: Optional[IdDictionary] = None,
+        countries: Optional[IdDictionary] = None,
     ) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
         """
         Normalizes the titles data by creating separate DataFrames for genres and production countries.
 
         :param titles_df: The DataFrame containing titles data.
+        :param genres: Genre ids assigned to previous chunks of the file.
+        :param countries: Country ids assigned to previous chunks of the file.
         :return: A tuple containing the normalized titles DataFrame, genres DataFrame,
                  countries DataFrame, movie_genres DataFrame, and movie_countries DataFrame.
         """
-        titles_df["genres"] = self.extract_column(titles_df, "genres")
-        titles_df["production_countries"] = self.extract_column(
-            titles_df, "production_countries"
+        # Normalizing genres and countries with genre_id / country_id
+        genres_df, movie_genres_df = self.factorize_list_column(
+            titles_df, "genres", "genre", genres
         )
-
-        # Normalizing genres with genre_id
-        genres_df = (
-            pd.DataFrame(titles_df["genres"].explode().unique(), columns=["genre"])
-            .dropna()
-            .reset_index(drop=True)
+        countries_df, movie_countries_df = self.factorize_list_column(
+            titles_df, "production_countries", "country", countries
         )
-        genres_df.index += 1
-        genres_df["genre_id"] = genres_df.index
-
-        # Normalizing countries with country_id
-        countries_df = (
-            pd.DataFrame(
-                titles_df["production_countries"].explode().unique(),
-                columns=["country"],
-            )
-            .dropna()
-            .reset_index(drop=True)
-        )
-        countries_df.index += 1
-        countries_df["country_id"] = countries_df.index
-
-        # Normalizing relationship tables with new ids
-        movie_genres_df = titles_df.explode("genres")[["id", "genres"]]
-        movie_genres_df = movie_genres_df.merge(
-            genres_df, left_on="genres", right_on="genre", how="left"
-        )[["id", "genre_id"]]
-
-        movie_countries_df = titles_df.explode("production_countries")[
-            ["id", "production_countries"]
-        ]
-        movie_countries_df = movie_countries_df.merge(
-            countries_df, left_on="production_countries", right_on="country", how="left"
-        )[["id", "country_id"]]
 
         movies_df = titles_df.drop(["index", "genres", "production_countries"], axis=1)
         movies_df = movies_df.drop_duplicates()
 
         return movies_df, genres_df, countries_df, movie_genres_df, movie_countries_df
 
+    @metrics.instrumented("normalize", step="reuse_ids")
+    def reuse_ids(
+        self,
+        dataframes: Dict[str, pd.DataFrame],
+        existing: Dict[str, pd.DataFrame],
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        Renumbers the generated genre, country and character ids so values already in
+        the database keep their ids, and new values get ids after the largest existing
+        one. Without this, one title added at the top of a file would shift the ids
+        of every value after it and an incremental load would rewrite most link rows.
+
+        :param dataframes: The normalized DataFrames, as returned by process_and_save_data.
+        :param existing: The current lookup tables (value and id columns) by table name.
+        :return: The lookup and link DataFrames with the renumbered ids.
+        """
+        renumbered = {}
+        for table_name, (value_column, id_column, link_name) in LOOKUP_TABLES.items():
+            if table_name not in existing or table_name not in dataframes:
+                continue
+            current = existing[table_name]
+            lookup_df = dataframes[table_name]
+
+            ids = lookup_df[value_column].map(
+                pd.Series(current[id_column].to_numpy(), index=current[value_column])
+            )
+            unseen = ids.isna().to_numpy()
+            first_id = int(current[id_column].max()) + 1 if len(current) else 1
+            ids[unseen] = np.arange(first_id, first_id + unseen.sum())
+            ids = ids.astype(lookup_df[id_column].dtype).to_numpy()
+
+            renumbered[table_name] = lookup_df.assign(**{id_column: ids}).set_axis(ids)
+            if link_name in dataframes:
+                link_df = dataframes[link_name]
+                new_ids = link_df[id_column].map(
+                    pd.Series(ids, index=lookup_df[id_column].to_numpy())
+                )
+                renumbered[link_name] = link_df.assign(
+                    **{id_column: new_ids.astype(link_df[id_column].dtype)}
+                )
+        return renumbered
+
     def _recommendations_table(self) -> pd.DataFrame:
         """
         Creates an empty DataFrame for recommendations data with predefined columns.
@@ -155,12 +418,56 @@ class DataNormalizer:
         )
         return recommendations_df
 
-    def process_and_save_data(self) -> Dict[str, pd.DataFrame]:
+    def process_and_save_data(
+        self,
+        cache: Optional[NormalizedCache] = None,
+        rebuild: bool = False,
+        workers: int = 1,
+    ) -> Dict[str, pd.DataFrame]:
         """
         Processes and normalizes titles and credits data, then returns it in a dictionary of DataFrames.
+        With a cache, the tables are loaded from it when the CSV files and the normalizer
+        version are unchanged, and saved to it after being normalized otherwise.
+
+        :param cache: Optional cache of the normalized tables.
+        :param rebuild: Normalize the files even if the cache has a matching entry.
+        :param workers: Normalize on this many processes (see
+                        scripts.parallel_normalize) when above 1.
         :return: A dictionary containing DataFrames for movies, genres, countries,
                  movie_genres, movie_countries, credits, characters, and recommendations.
         """
+        key = None
+        if cache is not None:
+            try:
+                key = cache.key(
+                    [self.titles_path, self.credits_path], NORMALIZER_VERSION
+                )
+                cached = None if rebuild else cache.load(key)
+                if cached is not None:
+                    cached["recommendations"] = self._recommendations_table()
+                    return cached
+            except FileNotFoundError:
+                key = None
+            except Exception as e:
+                logging.warning(f"Could not read the normalized data cache: {e}")
+
+        if workers > 1:
+            from scripts.parallel_normalize import normalize_parallel
+
+            dataframes = normalize_parallel(self, workers)
+            dataframes["recommendations"] = self._recommendations_table()
+        else:
+            dataframes = self._normalize_files()
+        for name, df in dataframes.items():
+            metrics.set_gauge("normalized_rows", len(df), table=name)
+        if key is not None:
+            try:
+                cache.save(key, {name: dataframes[name] for name in CACHED_TABLES})
+            except Exception as e:
+                logging.warning(f"Could not save the normalized data cache: {e}")
+        return dataframes
+
+    def _normalize_files(self) -> Dict[str, pd.DataFrame]:
         titles_df = self.load_csv(self.titles_path)
         credits_df = self.load_csv(self.credits_path)
 
@@ -181,6 +488,47 @@ class DataNormalizer:
             "recommendations": recommendations_df,
         }
 
+    def stream_normalized_data(
+        self, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """
+        Streaming counterpart of process_and_save_data for files larger than memory.
+        The titles and credits files are read chunk_size rows at a time and every
+        chunk is normalized on its own. Genre, country and character ids are kept in
+        IdDictionary objects so they stay stable across chunks, and duplicate rows
+        are dropped across chunks. Memory use is the chunk size plus the id
+        dictionaries and the SeenRows hashes, which grow with the file: 8 bytes per
+        distinct movie and credit row, twice that while two blocks are merged.
+
+        :param chunk_size: The number of CSV rows normalized at a time.
+        :return: (table name, DataFrame) pairs; every table is yielded at least once,
+                 and the chunks of a table all have the same columns and dtypes.
+        """
+        genres, countries, characters = IdDictionary(), IdDictionary(), IdDictionary()
+        movies_seen, credits_seen = SeenRows(), SeenRows()
+
+        for titles_df in self.iter_csv(self.titles_path, TITLES_DTYPES, chunk_size):
+            movies_df, genres_df, countries_df, movie_genres_df, movie_countries_df = (
+                self.normalize_titles(titles_df, genres, countries)
+            )
+            yield "movies", movies_seen.drop_seen(movies_df)
+            yield "genres", genres_df
+            yield "countries", countries_df
+            # Nullable ids, so chunks without missing values keep the same dtype
+            yield "movie_genres", movie_genres_df.astype({"genre_id": "Int64"})
+            yield "movie_countries", movie_countries_df.astype({"country_id": "Int64"})
+
+        for credits_df in self.iter_csv(self.credits_path, CREDITS_DTYPES, chunk_size):
+            credits_df, characters_df = self.normalize_credits(credits_df, characters)
+            yield "credits", credits_seen.drop_seen(credits_df)
+            yield "characters", characters_df
+
+        logging.info(
+            f"Normalized {len(genres)} genres, {len(countries)} countries and "
+            f"{len(characters)} characters in chunks of {chunk_size} rows"
+        )
+        yield "recommendations", self._recommendations_table()
+
 
 if __name__ == "__main__":
     setup_logging()
@@ -0,0 +1,88 @@
+import logging
+import numpy as np
+import pandas as pd
+from typing import Dict, Tuple
+from monitoring.metrics import metrics
+
+# String columns with at most this share of distinct values become categoricals;
+# the others are stored as Arrow strings
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+# Integer dtypes tried in order; wider integers are kept
+INTEGER_DTYPES = [np.int16, np.int32]
+
+
+def compact_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts the columns of a DataFrame to dtypes that take less memory without
+    changing any value: repetitive strings (role, type, age certification) to
+    categoricals, other strings to Arrow-backed strings, integers to the smallest of
+    int16 and int32 that holds them, and floats to float32 when every value is
+    exactly representable in it (vote counts, season numbers). Columns mixing
+    strings with other objects, and all-missing columns, are kept.
+
+    :param df: The DataFrame to convert; it is not modified.
+    :return: The converted DataFrame.
+    """
+    columns = {}
+    for name, column in df.items():
+        if pd.api.types.is_object_dtype(column.dtype):
+            if pd.api.types.infer_dtype(column, skipna=True) != "string":
+                continue
+            if column.nunique() <= len(column) * CATEGORY_MAX_UNIQUE_RATIO:
+                columns[name] = column.astype("category")
+            else:
+                columns[name] = column.astype("string[pyarrow]")
+        elif pd.api.types.is_bool_dtype(column.dtype) or column.empty:
+            continue
+        elif pd.api.types.is_signed_integer_dtype(column.dtype):
+            for dtype in INTEGER_DTYPES:
+                if column.dtype.itemsize <= np.dtype(dtype).itemsize:
+                    break
+                info = np.iinfo(dtype)
+                if info.min <= column.min() and column.max() <= info.max:
+                    columns[name] = column.astype(dtype)
+                    break
+        elif column.dtype == np.float64:
+            narrow = column.astype(np.float32)
+            if np.array_equal(narrow.to_numpy(np.float64), column, equal_nan=True):
+                columns[name] = narrow
+    return df.assign(**columns) if columns else df
+
+
+def memory_usage(df: pd.DataFrame) -> int:
+    """
+    The bytes taken by a DataFrame, index and string contents included.
+    """
+    return int(df.memory_usage(deep=True).sum())
+
+
+def compact_dataframes(
+    dataframes: Dict[str, pd.DataFrame],
+) -> Tuple[Dict[str, pd.DataFrame], Dict[str, Dict[str, int]]]:
+    """
+    Applies compact_dtypes to every DataFrame and logs the memory of every table
+    before and after. With metrics enabled, both are also recorded in the
+    table_memory_bytes gauge, labeled dtypes="default" and dtypes="compact".
+
+    :param dataframes: DataFrames keyed by table name.
+    :return: The converted DataFrames, and the bytes of every table "before" and
+             "after" the conversion.
+    """
+    compacted, report = {}, {}
+    for name, df in dataframes.items():
+        compacted[name] = compact_dtypes(df)
+        before, after = memory_usage(df), memory_usage(compacted[name])
+        report[name] = {"before": before, "after": after}
+        metrics.set_gauge("table_memory_bytes", before, table=name, dtypes="default")
+        metrics.set_gauge("table_memory_bytes", after, table=name, dtypes="compact")
+        logging.info(
+            f"{name:<16} {before / 1024 ** 2:>8.2f} MB -> {after / 1024 ** 2:>8.2f} MB "
+            f"({1 - after / max(before, 1):.0%} less)"
+        )
+    before = sum(entry["before"] for entry in report.values())
+    after = sum(entry["after"] for entry in report.values())
+    logging.info(
+        f"Compacted {len(report)} tables from {before / 1024 ** 2:.2f} MB to "
+        f"{after / 1024 ** 2:.2f} MB"
+    )
+    return compacted, report
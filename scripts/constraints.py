@@ -1,54 +1,257 @@
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
 from api.data_api import DataAPI
-from config.db_setup import db_config
+from config.db_setup import db_config, pool_config
+
+# Primary key of every table, referenced tables first. The incremental loader
+# upserts on the same keys.
+PRIMARY_KEYS = {
+    "movies": ["id"],
+    "genres": ["genre_id"],
+    "countries": ["country_id"],
+    "characters": ["character_id"],
+    "best_movies": ["index"],
+    "credits": ["person_id", "character_id", "id"],
+    "movie_genres": ["id", "genre_id"],
+    "movie_countries": ["id", "country_id"],
+}
+
+
+# Foreign keys as (constraint name, table, column, referenced table, referenced column)
+FOREIGN_KEYS = [
+    ("fk_movie_genres_movies", "movie_genres", "id", "movies", "id"),
+    ("fk_movie_genres_genres", "movie_genres", "genre_id", "genres", "genre_id"),
+    ("fk_movie_countries_movies", "movie_countries", "id", "movies", "id"),
+    (
+        "fk_movie_countries_countries",
+        "movie_countries",
+        "country_id",
+        "countries",
+        "country_id",
+    ),
+    (
+        "fk_credits_characters_characters",
+        "credits",
+        "character_id",
+        "characters",
+        "character_id",
+    ),
+    ("fk_credits_movie_movie", "credits", "id", "movies", "id"),
+]
+
+# Secondary indexes for the recommender and analyzer queries, as (name, table, columns)
+SECONDARY_INDEXES = [
+    ("idx_movie_genres_genre_id", "movie_genres", ["genre_id"]),
+    ("idx_movie_countries_country_id", "movie_countries", ["country_id"]),
+    ("idx_credits_id", "credits", ["id"]),
+    ("idx_credits_person_id", "credits", ["person_id"]),
+    ("idx_recommendations_title", "recommendations", ["title"]),
+    ("idx_recommendations_datestamp", "recommendations", ["datestamp"]),
+]
 
 
 class DatabaseConstraints:
     """
     This class is responsible for setting up primary and foreign key constraints
-    in the database to ensure data integrity.
+    in the database to ensure data integrity, followed by the secondary indexes and
+    planner statistics the queries rely on. It runs after a bulk load, in phases:
+
+    1. primary keys, one table per worker;
+    2. foreign keys, added NOT VALID (a brief lock) and then validated with
+       VALIDATE CONSTRAINT, which does not block reads or writes;
+    3. the recommendations table identity and defaults;
+    4. secondary indexes, with CREATE INDEX CONCURRENTLY by default;
+    5. ANALYZE of every table.
+
+    Statements on different tables run in parallel, statements on the same table
+    in order. Constraints and indexes that already exist are skipped, so the phase
+    can be re-run after an incremental load. Every statement is timed and a report
+    is logged at the end.
     """
 
-    def __init__(self, data_api):
+    def __init__(self, data_api, max_workers: int = 4, concurrently: bool = True):
+        """
+        :param data_api: The DataAPI used to run the statements.
+        :param max_workers: Maximum number of tables processed at the same time.
+        :param concurrently: Build the secondary indexes with CREATE INDEX CONCURRENTLY,
+                             so they do not block writes; plain CREATE INDEX is faster
+                             when nothing else uses the database.
+        """
         self.data_api = data_api
+        self.max_workers = max_workers
+        self.concurrently = concurrently
+
+    def setup_constraints(self) -> List[Dict[str, Any]]:
+        """
+        Runs every phase and logs the timing report.
+
+        :return: One {"statement", "seconds", "error"} dictionary per statement run.
+        """
+        start = time.perf_counter()
+        existing = set(
+            self.data_api.select_data(
+                "SELECT conname FROM pg_constraint "
+                "WHERE connamespace = 'public'::regnamespace",
+                use_cache=False,
+            ).get("conname", [])
+        )
+        results = []
+
+        # Adding Primary Key Constraints
+        results += self._run_by_table(
+            [
+                (table, f"ALTER TABLE {table} ADD PRIMARY KEY ({', '.join(key)});")
+                for table, key in PRIMARY_KEYS.items()
+                if not self.data_api.primary_key(table)
+            ]
+        )
+
+        # Adding Foreign Key Constraints without scanning the tables, then validating
+        # them under a lock that does not block reads or writes
+        foreign_keys = [fk for fk in FOREIGN_KEYS if fk[0] not in existing]
+        results += self._run_by_table(
+            [
+                (
+                    table,
+                    f"ALTER TABLE {table} ADD CONSTRAINT {name} FOREIGN KEY ({column}) "
+                    f"REFERENCES {referenced_table} ({referenced_column}) NOT VALID;",
+                )
+                for name, table, column, referenced_table, referenced_column in foreign_keys
+            ],
+            max_workers=1,
+        )
+        results += self._run_by_table(
+            [
+                (table, f"ALTER TABLE {table} VALIDATE CONSTRAINT {name};")
+                for name, table, *_ in foreign_keys
+            ]
+        )
+
+        # Recommendation table modifications
+        if not self.data_api.primary_key("recommendations"):
+            results += self._run_by_table(
+                [
+                    ("recommendations", command)
+                    for command in [
+                        "ALTER TABLE recommendations ALTER COLUMN recommendation_id SET NOT NULL;",
+                        "ALTER TABLE recommendations ALTER COLUMN datestamp SET DEFAULT CURRENT_TIMESTAMP;",
+                        "ALTER TABLE recommendations ALTER COLUMN recommendation_id TYPE INTEGER USING recommendation_id::INTEGER;",
+                        "ALTER TABLE recommendations ALTER COLUMN recommendation_id ADD GENERATED ALWAYS AS IDENTITY;",
+                        "ALTER TABLE recommendations ADD PRIMARY KEY (recommendation_id);",
+                    ]
+                ]
+            )
+
+        # Secondary indexes; a failed concurrent build leaves an invalid index behind,
+        # which is dropped so the next run builds it again
+        concurrently = " CONCURRENTLY" if self.concurrently else ""
+        results += self._run_by_table(
+            [
+                (
+                    table,
+                    f"CREATE INDEX{concurrently} IF NOT EXISTS {name} "
+                    f"ON {table} ({', '.join(columns)});",
+                )
+                for name, table, columns in SECONDARY_INDEXES
+            ],
+            autocommit=True,
+            cleanup={
+                name: f"DROP INDEX{concurrently} IF EXISTS {name};"
+                for name, _, _ in SECONDARY_INDEXES
+            },
+        )
+
+        # Planner statistics for the freshly loaded tables
+        tables = dict.fromkeys([*PRIMARY_KEYS, "recommendations"])
+        results += self._run_by_table(
+            [(table, f"ANALYZE {table};") for table in tables], autocommit=True
+        )
+
+        self.log_report(results, time.perf_counter() - start)
+        return results
+
+    def _run_by_table(
+        self,
+        statements: List[Tuple[str, str]],
+        autocommit: bool = False,
+        max_workers: int = None,
+        cleanup: Dict[str, str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Runs (table, statement) pairs: the statements of a table in order, different
+        tables in parallel.
+
+        :param autocommit: Run the statements outside a transaction block.
+        :param max_workers: Overrides the number of tables processed at a time.
+        :param cleanup: Statements to run after a failure, by the name of the object
+                        created by the failed statement.
+        """
+        by_table: Dict[str, List[str]] = {}
+        for table, statement in statements:
+            by_table.setdefault(table, []).append(statement)
+        if not by_table:
+            return []
+
+        def run_table(table_statements: List[str]) -> List[Dict[str, Any]]:
+            return [
+                self._run(statement, autocommit, cleanup or {})
+                for statement in table_statements
+            ]
+
+        workers = min(max_workers or self.max_workers, len(by_table))
+        with ThreadPoolExecutor(workers, thread_name_prefix="constraints") as pool:
+            return [
+                result
+                for table_results in pool.map(run_table, by_table.values())
+                for result in table_results
+            ]
+
+    def _run(
+        self, statement: str, autocommit: bool, cleanup: Dict[str, str]
+    ) -> Dict[str, Any]:
+        start = time.perf_counter()
+        error = None
+        try:
+            logging.info(f"Executing command: {statement}")
+            self.data_api.administrative_query(statement, autocommit=autocommit)
+            logging.info("Command executed successfully.")
+        except Exception as e:
+            logging.error(f"Error executing command: {e}")
+            error = str(e).strip()
+            for name, cleanup_statement in cleanup.items():
+                if f" {name} " in statement:
+                    try:
+                        self.data_api.administrative_query(
+                            cleanup_statement, autocommit=autocommit
+                        )
+                    except Exception as cleanup_error:
+                        logging.error(f"Error cleaning up {name}: {cleanup_error}")
+        return {
+            "statement": statement,
+            "seconds": time.perf_counter() - start,
+            "error": error,
+        }
 
-    def setup_constraints(self) -> None:
-        commands = [
-            # Adding Primary Key Constraints
-            "ALTER TABLE movies ADD PRIMARY KEY (id);",
-            "ALTER TABLE genres ADD PRIMARY KEY (genre_id);",
-            "ALTER TABLE countries ADD PRIMARY KEY (country_id);",
-            "ALTER TABLE characters ADD PRIMARY KEY (character_id);",
-            "ALTER TABLE best_movies ADD PRIMARY KEY (index);",
-            "ALTER TABLE credits ADD PRIMARY KEY (person_id, character_id, id);",
-            "ALTER TABLE movie_genres ADD PRIMARY KEY (id, genre_id);",
-            "ALTER TABLE movie_countries ADD PRIMARY KEY (id, country_id);",
-            # Adding Foreign Key Constraints
-            "ALTER TABLE movie_genres ADD CONSTRAINT fk_movie_genres_movies FOREIGN KEY (id) REFERENCES movies (id);",
-            "ALTER TABLE movie_genres ADD CONSTRAINT fk_movie_genres_genres FOREIGN KEY (genre_id) REFERENCES genres (genre_id);",
-            "ALTER TABLE movie_countries ADD CONSTRAINT fk_movie_countries_movies FOREIGN KEY (id) REFERENCES movies (id);",
-            "ALTER TABLE movie_countries ADD CONSTRAINT fk_movie_countries_countries FOREIGN KEY (country_id) REFERENCES countries (country_id);",
-            "ALTER TABLE credits ADD CONSTRAINT fk_credits_characters_characters FOREIGN KEY (character_id) REFERENCES characters (character_id);",
-            "ALTER TABLE credits ADD CONSTRAINT fk_credits_movie_movie FOREIGN KEY (id) REFERENCES movies (id);",
-            # Recommendation table modifications
-            "ALTER TABLE recommendations ALTER COLUMN recommendation_id SET NOT NULL;",
-            "ALTER TABLE recommendations ALTER COLUMN datestamp SET DEFAULT CURRENT_TIMESTAMP;",
-            "ALTER TABLE recommendations ALTER COLUMN recommendation_id TYPE INTEGER USING recommendation_id::INTEGER;",
-            "ALTER TABLE recommendations ALTER COLUMN recommendation_id ADD GENERATED ALWAYS AS IDENTITY;",
-            "ALTER TABLE recommendations ADD PRIMARY KEY (recommendation_id);",
-        ]
-
-        for cmd in commands:
-            try:
-                logging.info(f"Executing command: {cmd}")
-                self.data_api.administrative_query(cmd)
-                logging.info("Command executed successfully.")
-            except Exception as e:
-                logging.error(f"Error executing command: {e}")
+    def log_report(self, results: List[Dict[str, Any]], elapsed: float) -> None:
+        """
+        Logs the statements slowest first with their timing and status.
+        """
+        for result in sorted(results, key=lambda r: r["seconds"], reverse=True):
+            status = "ok" if result["error"] is None else "FAILED"
+            logging.info(
+                f"{result['seconds']:>8.3f}s {status:<6} {result['statement']}"
+            )
+        failed = sum(result["error"] is not None for result in results)
+        logging.info(
+            f"Ran {len(results)} constraint and index statements in {elapsed:.2f}s "
+            f"({failed} failed)"
+        )
 
 
 if __name__ == "__main__":
-    data_api = DataAPI(db_config)
+    data_api = DataAPI(db_config, pool_config)
 
     db_constraints = DatabaseConstraints(data_api)
     db_constraints.setup_constraints()
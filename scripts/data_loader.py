@@ -1,9 +1,20 @@
+import argparse
+import itertools
+import time
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 import logging
-from api.data_api import DataAPI
-from config.db_setup import db_config
-from scripts.clean_normalize import DataNormalizer
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+from api.sql_types import sql_type_for
+from api.factory import create_data_api
+from monitoring.metrics import metrics
+from scripts.clean_normalize import LOOKUP_TABLES, DataNormalizer
+from scripts.compact_dtypes import compact_dataframes
+from scripts.constraints import PRIMARY_KEYS
+from scripts.normalized_cache import NormalizedCache
 
 
 class DataLoader:
@@ -12,19 +23,77 @@ class DataLoader:
     It uses a DataNormalizer to process raw data and then uploads the resulting clean data.
     """
 
-    def __init__(self, api):
+    def __init__(
+        self,
+        api,
+        chunk_size: Optional[int] = None,
+        cache: Optional[NormalizedCache] = None,
+        rebuild_cache: bool = False,
+        max_workers: int = 4,
+        incremental: bool = False,
+        normalize_workers: int = 1,
+        compact: bool = True,
+    ):
+        """
+        :param api: The DataAPI used to load the tables.
+        :param chunk_size: When given, the CSV files are streamed and loaded this many
+                           rows at a time instead of being read into memory up front.
+        :param cache: Optional cache of the normalized tables, used when not streaming.
+        :param rebuild_cache: Normalize the CSV files even if the cache is up to date.
+        :param max_workers: Maximum number of tables loaded concurrently, each on its
+                            own pooled connection.
+        :param incremental: Upsert the changed rows into tables that already have
+                            their primary key instead of replacing the tables.
+        :param normalize_workers: Number of processes normalizing the CSV files.
+        :param compact: Convert the tables in memory to compact dtypes before loading
+                        them (see compact_dataframes).
+        """
         self.api = api
-        normalizer = DataNormalizer("raw_titles.csv", "raw_credits.csv")
-        normalized_dataframes = (
-            normalizer.process_and_save_data()
-        )  # Get processed dataframes
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.incremental = incremental
+        self.compact = compact
+        # SQL types of the columns before compaction, by table
+        self.column_types: Dict[str, Dict[str, str]] = {}
+        # Bytes of every table before and after compaction
+        self.memory_report: Dict[str, Dict[str, int]] = {}
+        self.normalizer = DataNormalizer("raw_titles.csv", "raw_credits.csv")
 
         self.dataframes = {
             "best_movies": "Best Movies Netflix.csv",
         }
+        if chunk_size is not None:
+            # Streaming mode reads the files while loading them
+            return
 
+        normalized_dataframes = self.normalizer.process_and_save_data(
+            cache, rebuild_cache, normalize_workers
+        )  # Get processed dataframes
         self.load_additional_data()  # Load additional CSV data
         self.dataframes.update(normalized_dataframes)  # Merge with normalized data
+        if compact and not incremental:
+            # Incremental loads renumber ids first, see upsert_csv_to_db
+            self.compact_dataframes()
+
+    def compact_dataframes(self) -> None:
+        """
+        Converts the tables in memory to compact dtypes (categoricals, Arrow strings,
+        int16/int32 ids and exact float32) and logs the memory of every table before
+        and after. Values are unchanged, and the SQL types of the original dtypes are
+        kept in column_types, so the database tables get the same schema as before.
+        """
+        tables = {
+            key: df
+            for key, df in self.dataframes.items()
+            if isinstance(df, pd.DataFrame)
+        }
+        for key, df in tables.items():
+            self.column_types.setdefault(
+                key,
+                {column: sql_type_for(dtype) for column, dtype in df.dtypes.items()},
+            )
+        compacted, self.memory_report = compact_dataframes(tables)
+        self.dataframes.update(compacted)
 
     def load_additional_data(self) -> None:
         """
@@ -42,21 +111,273 @@ class DataLoader:
             except Exception as e:
                 logging.error(f"Unexpected error loading {filename}: {e}")
 
-    def load_csv_to_db(self) -> None:
+    def stream_additional_data(self) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """
+        Streaming counterpart of load_additional_data: yields (table name, chunk) pairs.
+        The dtypes inferred for the first chunk of a file are applied to the following
+        chunks (with nullable integers and booleans), so every chunk fits the table
+        created for the first one.
+        """
+        for key, filename in self.dataframes.items():
+            path = Path(__file__).parent / f"../data/{filename}"
+            try:
+                reader = pd.read_csv(path, chunksize=self.chunk_size)
+            except FileNotFoundError as e:
+                logging.error(f"Error loading {filename}: {e}")
+                yield key, pd.DataFrame()
+                continue
+
+            dtypes: Dict[str, str] = {}
+            with reader:
+                for chunk in reader:
+                    if not dtypes:
+                        dtypes = {
+                            column: _nullable_dtype(dtype)
+                            for column, dtype in chunk.dtypes.items()
+                        }
+                    yield key, chunk.astype(dtypes)
+            logging.info(f"Streamed {filename} successfully.")
+
+    def load_csv_to_db(self) -> Dict[str, Dict[str, Any]]:
         """
-        Iterates over the dataframes dictionary and loads each DataFrame into the database
-        using the DataAPI's load_data_to_db method.
+        Loads every DataFrame of the dataframes dictionary into the database using the
+        DataAPI's load_data_to_db method. The tables are independent, so they are loaded
+        concurrently on a bounded thread pool, largest first, with one pooled connection
+        per worker; a failing table is logged and does not stop the others. In
+        streaming mode the tables are loaded chunk by chunk instead, and in incremental
+        mode existing tables are upserted (see upsert_csv_to_db).
+
+        :return: The rows, seconds and error (None on success) of every table.
         """
+        if self.chunk_size is not None:
+            return self.stream_csv_to_db()
+        if self.incremental:
+            return self.upsert_csv_to_db()
+
+        tables = {
+            key: df
+            for key, df in self.dataframes.items()
+            if isinstance(df, pd.DataFrame)
+        }
+        start = time.perf_counter()
+        results, workers = self._load_tables(tables)
+        self.log_summary(results, time.perf_counter() - start, workers)
+        return results
+
+    def upsert_csv_to_db(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Incremental counterpart of load_csv_to_db. Tables that already have the primary
+        key listed in PRIMARY_KEYS are updated in place through DataAPI.upsert_dataframes,
+        all in one transaction, so only changed rows are written and constraints and
+        indexes are kept. Other tables (e.g. on the first run) are loaded in full. The
+        recommendations table is only created if missing, never reloaded, so its
+        history survives. Genre, country and character ids already in the database
+        are reused, so unchanged rows stay unchanged.
+        """
+        start = time.perf_counter()
+        existing = {}
+        for key, (value_column, id_column, _) in LOOKUP_TABLES.items():
+            if self.api.primary_key(key):
+                existing[key] = self.api.select_data(
+                    f"SELECT {value_column}, {id_column} FROM {key}", use_cache=False
+                )
+        self.dataframes.update(self.normalizer.reuse_ids(self.dataframes, existing))
+        if self.compact:
+            self.compact_dataframes()
+
+        keyed, full = {}, {}
         for key, df in self.dataframes.items():
-            if isinstance(df, pd.DataFrame):
-                try:
-                    self.api.load_data_to_db(df, key)
-                    logging.info(f"Successfully loaded data into '{key}' table.")
-                except Exception as e:
-                    logging.error(f"Failed to load data into '{key}': {e}")
+            if not isinstance(df, pd.DataFrame):
+                continue
+            primary_key = self.api.primary_key(key)
+            if key in PRIMARY_KEYS and primary_key == PRIMARY_KEYS[key]:
+                keyed[key] = df
+            elif key in PRIMARY_KEYS or primary_key is None:
+                full[key] = df
+
+        results, workers = self._load_tables(full)
+        if keyed:
+            # Referenced tables first, as upsert_dataframes expects
+            keyed = {key: keyed[key] for key in PRIMARY_KEYS if key in keyed}
+            try:
+                stats = self.api.upsert_dataframes(keyed, PRIMARY_KEYS)
+                for key, df in keyed.items():
+                    results[key] = {
+                        "rows": len(df),
+                        "seconds": stats[key].pop("seconds"),
+                        "error": None,
+                        "changes": stats[key],
+                    }
+            except Exception as e:
+                logging.error(f"Failed to upsert {', '.join(keyed)}: {e}")
+                for key, df in keyed.items():
+                    results[key] = {"rows": len(df), "seconds": 0.0, "error": str(e)}
+        self.log_summary(results, time.perf_counter() - start, workers)
+        return results
+
+    def _load_tables(
+        self, tables: Dict[str, pd.DataFrame]
+    ) -> Tuple[Dict[str, Dict[str, Any]], int]:
+        """
+        Loads tables concurrently, largest first.
+
+        :return: The result of every table and the number of workers used.
+        """
+        # Workers beyond the pool size would only wait for a connection
+        workers = max(1, min(self.max_workers, len(tables), self._pool_size()))
+        results = {}
+        with ThreadPoolExecutor(workers, thread_name_prefix="table-loader") as pool:
+            futures = {
+                pool.submit(self._load_table, key, df): key
+                for key, df in sorted(
+                    tables.items(), key=lambda item: len(item[1]), reverse=True
+                )
+            }
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+        return results, workers
+
+    def _load_table(self, key: str, df: pd.DataFrame) -> Dict[str, Any]:
+        start = time.perf_counter()
+        error = None
+        try:
+            with metrics.timed("table_load", table=key) as timer:
+                self.api.load_data_to_db(
+                    df, key, column_types=self.column_types.get(key)
+                )
+                timer.rows = len(df)
+            logging.info(f"Successfully loaded data into '{key}' table.")
+        except Exception as e:
+            logging.error(f"Failed to load data into '{key}': {e}")
+            error = str(e)
+        return {"rows": len(df), "seconds": time.perf_counter() - start, "error": error}
+
+    def _pool_size(self) -> int:
+        try:
+            return int(self.api.pool_stats()["max_size"])
+        except Exception:
+            return self.max_workers
+
+    def log_summary(
+        self, results: Dict[str, Dict[str, Any]], elapsed: float, workers: int
+    ) -> None:
+        """
+        Logs one line per table (rows, seconds, status) and the overall wall-clock time.
+        """
+        for key, result in sorted(
+            results.items(), key=lambda item: item[1]["seconds"], reverse=True
+        ):
+            status = "ok" if result["error"] is None else f"FAILED ({result['error']})"
+            if "changes" in result:
+                changes = result["changes"]
+                status += (
+                    f" (+{changes['inserted']} ~{changes['updated']} "
+                    f"-{changes['deleted']})"
+                )
+            logging.info(
+                f"{key:<16} {result['rows']:>10} rows {result['seconds']:>8.2f}s {status}"
+            )
+        failed = sum(result["error"] is not None for result in results.values())
+        total = sum(result["seconds"] for result in results.values())
+        logging.info(
+            f"Loaded {len(results) - failed}/{len(results)} tables in {elapsed:.2f}s "
+            f"with {workers} workers ({total:.2f}s of table loads)"
+        )
+
+    def export_parquet(self, directory: Union[str, Path]) -> None:
+        """
+        Writes every loaded DataFrame to <directory>/<table>.parquet, e.g. for the
+        DuckDB backend to query in place. Not available in streaming mode, where the
+        tables are never held in memory.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for key, df in self.dataframes.items():
+            if not isinstance(df, pd.DataFrame):
+                logging.warning(f"Skipping Parquet export of '{key}', not in memory.")
+                continue
+            pq.write_table(
+                pa.Table.from_pandas(df, preserve_index=False),
+                directory / f"{key}.parquet",
+            )
+        logging.info(
+            f"Exported {len(self.dataframes)} tables to Parquet in {directory}"
+        )
+
+    def stream_csv_to_db(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Normalizes the CSV files chunk by chunk and loads every chunk as soon as it is
+        ready: the first chunk of a table replaces it, the following ones are appended.
+        If a chunk fails, the rest of that table is skipped, and the chunks already
+        appended stay in the table, so callers must not rely on a table that failed.
+
+        :return: The rows, seconds and error (None on success) of every table, as
+                 returned by load_csv_to_db; rows counts the chunks loaded.
+        """
+        start = time.perf_counter()
+        results: Dict[str, Dict[str, Any]] = {}
+        chunks = itertools.chain(
+            self.stream_additional_data(),
+            self.normalizer.stream_normalized_data(self.chunk_size),
+        )
+        for key, df in chunks:
+            result = results.get(key)
+            if result is not None and result["error"] is not None:
+                continue
+            if result is None:
+                result = results[key] = {"rows": 0, "seconds": 0.0, "error": None}
+            chunk_start = time.perf_counter()
+            try:
+                self.api.load_data_to_db(
+                    df, key, if_exists="replace" if result["rows"] == 0 else "append"
+                )
+                result["rows"] += len(df)
+            except Exception as e:
+                logging.error(f"Failed to load data into '{key}': {e}")
+                result["error"] = str(e)
+            result["seconds"] += time.perf_counter() - chunk_start
+
+        self.log_summary(results, time.perf_counter() - start, 1)
+        return results
+
+
+def _nullable_dtype(dtype) -> str:
+    """
+    Maps integer and boolean dtypes to their nullable counterparts, which later
+    chunks with missing values can still be cast to.
+    """
+    if pd.api.types.is_bool_dtype(dtype):
+        return "boolean"
+    if pd.api.types.is_integer_dtype(dtype):
+        return "Int64"
+    return dtype
 
 
 if __name__ == "__main__":
-    api = DataAPI(db_config)
-    loader = DataLoader(api)
+    parser = argparse.ArgumentParser(description="Load the CSV files into the database")
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        help="Stream the CSV files and load them this many rows at a time",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Maximum number of tables loaded concurrently",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Upsert changed rows into existing tables instead of replacing them",
+    )
+    args = parser.parse_args()
+
+    api = create_data_api()
+    loader = DataLoader(
+        api,
+        chunk_size=args.chunk_size,
+        max_workers=args.workers,
+        incremental=args.incremental,
+    )
     loader.load_csv_to_db()
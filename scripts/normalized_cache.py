@@ -0,0 +1,167 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Union
+
+DEFAULT_CACHE_DIR = Path(__file__).parent / "../data/normalized_cache"
+CACHED_TABLES = [
+    "movies",
+    "genres",
+    "countries",
+    "movie_genres",
+    "movie_countries",
+    "credits",
+    "characters",
+]
+
+MANIFEST_FILE = "manifest.json"
+FILE_HASHES_FILE = "file_hashes.json"
+HASH_BLOCK_BYTES = 1 << 20
+
+
+class NormalizedCache:
+    """
+    On-disk cache of the DataFrames produced by DataNormalizer. Every table is stored
+    as an uncompressed Feather (Arrow IPC) file, index included, and read back through
+    a memory map. An entry is keyed by the content hash of the input CSV files and the
+    normalizer version; the size and mtime of each file are remembered so that
+    unchanged files are not hashed again. Only the latest entry is kept.
+    """
+
+    def __init__(self, directory: Union[str, Path] = DEFAULT_CACHE_DIR):
+        """
+        :param directory: The directory holding the cache entries.
+        """
+        self.directory = Path(directory)
+
+    def key(self, paths: Iterable[Union[str, Path]], version: int) -> str:
+        """
+        Computes the cache key of a set of input files.
+
+        :param paths: The input CSV files, in a fixed order.
+        :param version: The normalizer version; bumping it invalidates every entry.
+        :raises FileNotFoundError: If one of the files does not exist.
+        """
+        digest = hashlib.sha256(f"normalizer-{version}".encode())
+        for path in paths:
+            digest.update(self._file_hash(Path(path)).encode())
+        return digest.hexdigest()[:32]
+
+    def load(self, key: str) -> Optional[Dict[str, pd.DataFrame]]:
+        """
+        Loads the tables cached under the given key.
+
+        :return: A dictionary of DataFrames, or None if there is no complete entry.
+        """
+        entry = self.directory / key
+        if not (entry / MANIFEST_FILE).exists():
+            return None
+        start = time.perf_counter()
+        manifest = json.loads((entry / MANIFEST_FILE).read_text())
+        dataframes = {
+            name: _to_pandas(
+                feather.read_table(entry / f"{name}.feather", memory_map=True)
+            )
+            for name in manifest["tables"]
+        }
+        logging.info(
+            f"Loaded {len(dataframes)} normalized tables from the cache in "
+            f"{time.perf_counter() - start:.3f}s"
+        )
+        return dataframes
+
+    def save(self, key: str, dataframes: Dict[str, pd.DataFrame]) -> None:
+        """
+        Writes the tables under the given key and removes older entries. The entry is
+        written to a temporary directory and renamed into place, so readers never see
+        a partial entry.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        temporary = self.directory / f".{key}.{os.getpid()}.tmp"
+        shutil.rmtree(temporary, ignore_errors=True)
+        temporary.mkdir()
+        for name, df in dataframes.items():
+            feather.write_feather(
+                pa.Table.from_pandas(df, preserve_index=True),
+                temporary / f"{name}.feather",
+                compression="uncompressed",
+            )
+        manifest = {
+            "key": key,
+            "tables": {name: len(df) for name, df in dataframes.items()},
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        (temporary / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2))
+
+        entry = self.directory / key
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(temporary, entry)
+        for path in self.directory.iterdir():
+            if path.is_dir() and path.name != key and not path.name.startswith("."):
+                shutil.rmtree(path, ignore_errors=True)
+        logging.info(f"Saved {len(dataframes)} normalized tables to {entry}")
+
+    def clear(self) -> None:
+        """
+        Deletes every cache entry and the remembered file hashes.
+        """
+        shutil.rmtree(self.directory, ignore_errors=True)
+        logging.info(f"Cleared the normalized data cache in {self.directory}")
+
+    def _file_hash(self, path: Path) -> str:
+        """
+        Returns the SHA-256 of a file, reusing the remembered hash when the file size
+        and mtime have not changed.
+        """
+        stat = path.stat()
+        hashes_path = self.directory / FILE_HASHES_FILE
+        try:
+            hashes = json.loads(hashes_path.read_text())
+        except (FileNotFoundError, ValueError):
+            hashes = {}
+
+        name = str(path.resolve())
+        remembered = hashes.get(name)
+        if (
+            remembered
+            and remembered["size"] == stat.st_size
+            and remembered["mtime_ns"] == stat.st_mtime_ns
+        ):
+            return remembered["sha256"]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            for block in iter(lambda: file.read(HASH_BLOCK_BYTES), b""):
+                digest.update(block)
+        hashes[name] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": digest.hexdigest(),
+        }
+        self.directory.mkdir(parents=True, exist_ok=True)
+        temporary = hashes_path.with_name(f".{FILE_HASHES_FILE}.{os.getpid()}.tmp")
+        temporary.write_text(json.dumps(hashes, indent=2))
+        os.replace(temporary, hashes_path)
+        return hashes[name]["sha256"]
+
+
+def _to_pandas(table: pa.Table) -> pd.DataFrame:
+    """
+    Converts a cached table back to pandas. Arrow turns missing values of string
+    columns into None; the NaN that read_csv uses is put back, so cached tables are
+    identical to freshly normalized ones.
+    """
+    df = table.to_pandas()
+    for name in table.column_names:
+        column = table.column(name)
+        if name in df.columns and pa.types.is_string(column.type) and column.null_count:
+            df.loc[column.is_null().to_numpy(zero_copy_only=False), name] = np.nan
+    return df
@@ -1,6 +1,6 @@
 import logging
 from api.data_api import DataAPI
-from config.db_setup import db_config
+from config.db_setup import db_config, pool_config
 
 
 class DatabasePermissions:
@@ -38,7 +38,7 @@ class DatabasePermissions:
 
 
 if __name__ == "__main__":
-    data_api = DataAPI(db_config)
+    data_api = DataAPI(db_config, pool_config)
 
     db_permissions = DatabasePermissions(data_api)
     db_permissions.setup_permissions()
@@ -0,0 +1,74 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+import pandas as pd
+from analyzer.analyzer import Netflix
+from api.sqlite_data_api import SQLiteDataAPI
+
+
+class TestNetflix(unittest.TestCase):
+    """
+    Unit tests for the analyzer CLI on an in-memory SQLite database.
+    """
+
+    def setUp(self):
+        self.api = SQLiteDataAPI()
+        self.api.load_data_to_db(
+            pd.DataFrame(
+                {
+                    "title": ["Heat", "Forrest Gump", "Up"],
+                    "imdb_score": [8.3, 8.8, 8.2],
+                }
+            ),
+            "movies",
+        )
+        with patch("analyzer.analyzer.create_data_api", return_value=self.api):
+            self.analyzer = Netflix()
+
+    def tearDown(self):
+        self.api.close()
+
+    def test_queries_with_leading_whitespace_or_with_are_streamed(self):
+        """
+        SELECT queries after whitespace or a WITH clause are read, not run as DML.
+        """
+        queries = [
+            "\n  SELECT title FROM movies ORDER BY title",
+            "WITH best AS (SELECT title FROM movies) SELECT title FROM best "
+            "ORDER BY title",
+        ]
+        for query in queries:
+            with self.subTest(query=query), patch.object(
+                self.api, "update_data"
+            ) as update_data:
+                chunks = list(self.analyzer.stream_sql(query, chunk_size=2))
+                result = self.analyzer.execute_sql(query)
+
+                self.assertEqual([len(chunk) for chunk in chunks], [2, 1])
+                self.assertEqual(
+                    result["title"].tolist(), ["Forrest Gump", "Heat", "Up"]
+                )
+                update_data.assert_not_called()
+
+    def test_printed_chunks_line_up(self):
+        """
+        Rows of later chunks use the column widths of the first chunk and its header.
+        """
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.analyzer.print_results(
+                self.analyzer.stream_sql(
+                    "SELECT title, imdb_score FROM movies ORDER BY imdb_score DESC",
+                    chunk_size=1,
+                )
+            )
+
+        lines = output.getvalue().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(len({len(line) for line in lines}), 1)
+        self.assertEqual(lines[3], "          Up         8.2")
+
+
+if __name__ == "__main__":
+    unittest.main()
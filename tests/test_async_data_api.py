@@ -0,0 +1,292 @@
+import asyncio
+import contextlib
+import unittest
+from types import SimpleNamespace
+import pandas as pd
+import psycopg
+from psycopg import sql
+from api.async_data_api import AsyncDataAPI
+from config.db_setup import db_config, pool_config
+
+
+class FakeCursor:
+    """
+    Stand-in for a psycopg AsyncCursor that records the statements and COPY data
+    sent through it and returns the rows of its connection.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.description = None
+        self.rowcount = -1
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    async def execute(self, query, params=None):
+        self.connection.record(query, params)
+        if self.connection.columns is not None:
+            self.description = [
+                SimpleNamespace(name=name) for name in self.connection.columns
+            ]
+        self.rowcount = len(self.connection.rows)
+
+    async def fetchall(self):
+        return self.connection.rows
+
+    @contextlib.asynccontextmanager
+    async def copy(self, statement):
+        self.connection.record(statement, None)
+        yield SimpleNamespace(write=self.connection.write)
+
+
+class FakeConnection:
+    """
+    Stand-in for a psycopg AsyncConnection; the SQL it receives is kept as text in
+    statements, the COPY payload in copied.
+    """
+
+    def __init__(self, rows=(), columns=None):
+        self.rows = list(rows)
+        self.columns = columns
+        self.statements = []
+        self.copied = []
+        self.commits = 0
+        self.autocommit = False
+        self.closed = False
+        self.autocommit_statements = []
+
+    def record(self, query, params):
+        if isinstance(query, sql.Composable):
+            query = query.as_string(None)
+        self.statements.append((query, params))
+        if self.autocommit:
+            self.autocommit_statements.append(query)
+
+    async def write(self, data):
+        self.copied.append(data)
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    async def execute(self, query, params=None, prepare=None):
+        self.record(query, params)
+
+    async def commit(self):
+        self.commits += 1
+
+    async def set_autocommit(self, autocommit):
+        self.autocommit = autocommit
+
+
+class FakePool:
+    """
+    Stand-in for a psycopg_pool AsyncConnectionPool handing out one FakeConnection.
+    """
+
+    def __init__(self, connection):
+        self.conn = connection
+
+    @contextlib.asynccontextmanager
+    async def connection(self):
+        yield self.conn
+
+
+class TestAsyncDataAPIStandIn(unittest.IsolatedAsyncioTestCase):
+    """
+    Unit tests of the statements AsyncDataAPI issues, on a stand-in connection pool,
+    so they run without a PostgreSQL server.
+    """
+
+    def make_api(self, connection, **kwargs):
+        api = AsyncDataAPI(db_config, pool_config, **kwargs)
+        api.pool = FakePool(connection)
+        return api
+
+    async def test_pool_settings(self):
+        """
+        The pool gets the settings of pool_config and the prepared statement options.
+        """
+        api = AsyncDataAPI(
+            db_config,
+            {"min_size": 2, "max_size": 7, "checkout_timeout": 3, "other": 1},
+            prepare_threshold=None,
+            prepared_max=20,
+        )
+
+        self.assertEqual((api.pool.min_size, api.pool.max_size), (2, 7))
+        self.assertEqual(api.pool.timeout, 3)
+        self.assertEqual(api.pool.kwargs, {"prepare_threshold": None})
+        connection = FakeConnection()
+        await api._configure(connection)
+        self.assertEqual(connection.prepared_max, 20)
+
+    async def test_select_data(self):
+        """
+        The rows of the query come back as a DataFrame with the cursor's columns.
+        """
+        connection = FakeConnection(
+            rows=[(1, "Heat"), (2, None)], columns=["id", "title"]
+        )
+        api = self.make_api(connection)
+
+        result = await api.select_data(
+            "SELECT id, title FROM movies WHERE id > %s", (0,)
+        )
+
+        self.assertEqual(result["id"].tolist(), [1, 2])
+        self.assertEqual(result["title"].tolist(), ["Heat", None])
+        self.assertEqual(
+            connection.statements,
+            [("SELECT id, title FROM movies WHERE id > %s", (0,))],
+        )
+
+    async def test_update_data_commits(self):
+        """
+        DML runs with its parameters and is committed.
+        """
+        connection = FakeConnection()
+        api = self.make_api(connection)
+
+        await api.update_data("UPDATE movies SET title = %s WHERE id = %s", ("B", 2))
+
+        self.assertEqual(
+            connection.statements,
+            [("UPDATE movies SET title = %s WHERE id = %s", ("B", 2))],
+        )
+        self.assertEqual(connection.commits, 1)
+
+    async def test_administrative_query_autocommit(self):
+        """
+        With autocommit, the query runs outside a transaction and the connection is
+        handed back in transaction mode.
+        """
+        connection = FakeConnection()
+        api = self.make_api(connection)
+
+        await api.administrative_query("VACUUM recommendations;", autocommit=True)
+
+        self.assertEqual(connection.autocommit_statements, ["VACUUM recommendations;"])
+        self.assertFalse(connection.autocommit)
+
+    async def test_load_data_to_db_copy(self):
+        """
+        The table is recreated with the column types and the rows are sent as CSV
+        through COPY, with missing values as COPY's NULL marker, then committed.
+        """
+        connection = FakeConnection()
+        api = self.make_api(connection)
+        dataframe = pd.DataFrame({"id": [1, 2, 3], "title": ["A", None, "C, D"]})
+
+        await api.load_data_to_db(dataframe, "movies", column_types={"title": "TEXT"})
+
+        statements = [query for query, _ in connection.statements]
+        self.assertEqual(statements[0], 'DROP TABLE IF EXISTS "movies"')
+        self.assertEqual(
+            statements[1],
+            'CREATE TABLE IF NOT EXISTS "movies" ("id" BIGINT, "title" TEXT)',
+        )
+        self.assertTrue(statements[2].startswith('COPY "movies" ("id", "title") FROM'))
+        self.assertEqual("".join(connection.copied), '1,A\n2,\\N\n3,"C, D"\n')
+        self.assertEqual(connection.commits, 1)
+
+    async def test_load_data_to_db_append(self):
+        """
+        Appending keeps the existing table, and unknown modes are rejected.
+        """
+        connection = FakeConnection()
+        api = self.make_api(connection)
+
+        await api.load_data_to_db(
+            pd.DataFrame({"id": [1]}), "movies", if_exists="append"
+        )
+        with self.assertRaises(ValueError):
+            await api.load_data_to_db(
+                pd.DataFrame({"id": [1]}), "movies", if_exists="fail"
+            )
+
+        self.assertNotIn("DROP", connection.statements[0][0])
+
+
+def database_available() -> bool:
+    """
+    Whether the PostgreSQL server of db_config accepts connections, probed with a
+    short timeout instead of the pool's checkout timeout.
+    """
+    try:
+        psycopg.connect(
+            host=db_config.get("host"),
+            dbname=db_config.get("database"),
+            user=db_config.get("user"),
+            password=db_config.get("password") or None,
+            connect_timeout=2,
+        ).close()
+        return True
+    except psycopg.Error:
+        return False
+
+
+@unittest.skipUnless(database_available(), "PostgreSQL is not reachable")
+class TestAsyncDataAPI(unittest.IsolatedAsyncioTestCase):
+    """
+    Integration test suite for the AsyncDataAPI class
+    """
+
+    async def asyncSetUp(self):
+        """
+        Opens an AsyncDataAPI to be used in the tests.
+        """
+        self.api = AsyncDataAPI(db_config, pool_config)
+        await self.api.open()
+
+    async def asyncTearDown(self):
+        await self.api.close()
+
+    async def test_load_select_update(self):
+        """
+        A DataFrame loaded with COPY is read back, updated and dropped.
+        """
+        table = "test_async_movies"
+        await self.api.load_data_to_db(
+            pd.DataFrame({"id": [1, 2, 3], "title": ["A", None, "C"]}), table
+        )
+        try:
+            await self.api.update_data(
+                f"UPDATE {table} SET title = %s WHERE id = %s", ("B", 2)
+            )
+            rows = await self.api.select_data(
+                f"SELECT id, title FROM {table} WHERE id >= %s ORDER BY id", (1,)
+            )
+            self.assertEqual(rows["title"].tolist(), ["A", "B", "C"])
+        finally:
+            await self.api.administrative_query(f"DROP TABLE {table};")
+
+    async def test_concurrent_queries(self):
+        """
+        More concurrent queries than pooled connections all complete, sharing the
+        connections of the pool.
+        """
+        results = await asyncio.gather(
+            *(self.api.select_data("SELECT %s::int AS n", (i,)) for i in range(50))
+        )
+
+        self.assertEqual([result["n"][0] for result in results], list(range(50)))
+        self.assertLessEqual(
+            self.api.pool_stats()["pool_size"], pool_config["max_size"]
+        )
+
+    async def test_autocommit_is_reset(self):
+        """
+        Statements that cannot run in a transaction block work in autocommit mode,
+        and the connection goes back to the pool in transaction mode.
+        """
+        await self.api.administrative_query("VACUUM recommendations;", autocommit=True)
+        async with self.api.pool.connection() as conn:
+            self.assertFalse(conn.autocommit)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+import pandas as pd
+from analyzer.analyzer import Netflix
+from api.duckdb_data_api import DuckDBDataAPI
+from api.factory import create_data_api
+from api.sqlite_data_api import SQLiteDataAPI
+from recommender.recommender import MoviesRecommender
+
+MOVIES = pd.DataFrame(
+    {
+        "id": ["a", "b", "c"],
+        "title": ["Heat", None, "Alien"],
+        "release_year": [1995, 1998, 1979],
+        "imdb_score": [8.3, 7.2, 8.5],
+    }
+)
+
+
+class BackendContract:
+    """
+    Tests every embedded backend must pass; mixed into one TestCase per backend.
+    """
+
+    # A query failing with one of the backend's database_errors
+    failing_query = ""
+
+    def make_api(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.api = self.make_api()
+        self.api.load_data_to_db(MOVIES, "movies")
+
+    def tearDown(self):
+        self.api.close()
+
+    def test_select_with_params(self):
+        """
+        psycopg2-style %s placeholders work and missing values stay missing.
+        """
+        result = self.api.select_data(
+            "SELECT id, title FROM movies WHERE release_year > %s ORDER BY id", (1990,)
+        )
+
+        self.assertEqual(result["id"].tolist(), ["a", "b"])
+        self.assertTrue(pd.isna(result["title"][1]))
+
+    def test_writes(self):
+        """
+        Appends, updates and multi-row inserts are visible to later reads.
+        """
+        self.api.load_data_to_db(MOVIES.head(1), "movies", if_exists="append")
+        self.api.update_data(
+            "UPDATE movies SET title = %s WHERE id = %s", ("Ronin", "b")
+        )
+        self.api.administrative_query("CREATE TABLE recommendations (title TEXT)")
+        self.api.insert_rows("recommendations", ["title"], [("Heat",), ("Alien",)])
+
+        movies = self.api.select_data("SELECT id, title FROM movies ORDER BY id")
+        count = self.api.select_data("SELECT count(*) AS n FROM recommendations")
+
+        self.assertEqual(movies["title"].tolist(), ["Heat", "Heat", "Ronin", "Alien"])
+        self.assertEqual(int(count["n"][0]), 2)
+
+    def test_stream_data(self):
+        """
+        Results are streamed in chunks of chunk_size rows.
+        """
+        chunks = list(self.api.stream_data("SELECT id FROM movies", chunk_size=2))
+
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 1])
+        self.assertIsNone(self.api.primary_key("movies"))
+        self.assertFalse(self.api.supports_constraints)
+
+    def test_recommender(self):
+        """
+        MoviesRecommender runs on the backend without a database server.
+        """
+        self.api.load_data_to_db(pd.DataFrame({"TITLE": ["Heat"]}), "best_movies")
+        recommender = MoviesRecommender(self.api, neighbor_index_dir=None)
+
+        self.assertEqual(recommender.get_random_recommendation(), "Heat")
+
+    def test_analyzer_database_errors(self):
+        """
+        The analyzer reports the driver errors of the backend as database errors.
+        """
+        with patch("analyzer.analyzer.create_data_api", return_value=self.api):
+            analyzer = Netflix()
+
+        self.assertEqual(
+            analyzer.execute_sql(self.failing_query),
+            "A database error occurred. Please check the logs for details.",
+        )
+
+
+class TestSQLiteDataAPI(BackendContract, unittest.TestCase):
+    """
+    The backend contract on an in-memory SQLite database.
+    """
+
+    failing_query = "SELECT * FROM missing_table"
+
+    def make_api(self):
+        return SQLiteDataAPI()
+
+
+class TestDuckDBDataAPI(BackendContract, unittest.TestCase):
+    """
+    The backend contract on an in-memory DuckDB database, plus Parquet views.
+    """
+
+    failing_query = "SELECT CAST('not a number' AS INTEGER)"
+
+    def make_api(self):
+        return DuckDBDataAPI()
+
+    def test_parquet_views(self):
+        """
+        Parquet files are queried in place through views named after the files.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            MOVIES.to_parquet(Path(directory) / "titles.parquet")
+            api = DuckDBDataAPI(parquet_dir=directory)
+            result = api.select_data("SELECT max(imdb_score) AS best FROM titles")
+            api.close()
+
+        self.assertEqual(result["best"][0], 8.5)
+
+
+class TestCreateDataAPI(unittest.TestCase):
+    """
+    Unit tests for the backend factory.
+    """
+
+    def test_backend_selection(self):
+        """
+        The backend follows the configuration and unknown backends are rejected.
+        """
+        self.assertIsInstance(create_data_api({"backend": "sqlite"}), SQLiteDataAPI)
+        self.assertIsInstance(create_data_api({"backend": "duckdb"}), DuckDBDataAPI)
+        with self.assertRaises(ValueError):
+            create_data_api({"backend": "oracle"})
+
+
+if __name__ == "__main__":
+    unittest.main()
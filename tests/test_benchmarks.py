@@ -0,0 +1,52 @@
+import unittest
+from benchmarks.suite import Benchmark, compare, run_benchmarks
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+    """
+    Unit tests for the benchmark runner and the comparison of result files.
+    """
+
+    def test_run_benchmarks(self):
+        """
+        Every sample times `number` calls after one warm-up sample, and only the
+        selected benchmarks run.
+        """
+        calls = []
+        benchmarks = [
+            Benchmark("fast", lambda context: lambda: calls.append(1), number=10),
+            Benchmark("skipped", lambda context: lambda: calls.append(2)),
+        ]
+
+        results = run_benchmarks({}, benchmarks, repeat=3, select="fast")
+
+        self.assertEqual(list(results), ["fast"])
+        self.assertEqual(len(calls), 40)
+        self.assertLessEqual(results["fast"]["min"], results["fast"]["median"])
+        self.assertEqual(results["fast"]["number"], 10)
+
+    def test_compare(self):
+        """
+        Medians slower than the threshold are regressions, faster ones improvements,
+        and benchmarks missing from the baseline are ignored.
+        """
+        baseline = {"results": {name: {"median": 1.0} for name in "abc"}}
+        current = {
+            "results": {
+                "a": {"median": 1.5},
+                "b": {"median": 1.1},
+                "c": {"median": 0.5},
+                "d": {"median": 9.0},
+            }
+        }
+
+        rows = compare(baseline, current, threshold=1.2)
+
+        self.assertEqual(
+            [(row["name"], row["status"]) for row in rows],
+            [("a", "regression"), ("b", "ok"), ("c", "improvement")],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
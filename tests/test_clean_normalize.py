@@ -0,0 +1,215 @@
+import tempfile
+import unittest
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from benchmarks.reference import legacy_normalize_credits, legacy_normalize_titles
+from benchmarks.synthetic import make_credits, make_titles
+from scripts.clean_normalize import DataNormalizer, IdDictionary, SeenRows
+
+
+class TestDataNormalizer(unittest.TestCase):
+    """
+    It verifies that the vectorized normalization matches the original implementation.
+    """
+
+    def setUp(self):
+        self.normalizer = DataNormalizer("raw_titles.csv", "raw_credits.csv")
+
+    def test_normalize_credits_matches_legacy(self):
+        """
+        Separators, whitespace, empty names, missing characters and duplicates are
+        handled exactly as by the apply(clean_characters) implementation.
+        """
+        characters = [
+            "Neo",
+            "Trinity / Neo",
+            "Morpheus;Neo",
+            np.nan,
+            " Agent Smith ",
+            "a  / b",
+            "a / / b",
+            "x /y",
+            " ; ",
+            "Neo/",
+            "",
+            "Neo",
+        ]
+        credits_df = pd.DataFrame(
+            {
+                "index": range(len(characters)),
+                "person_id": [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 1],
+                "id": ["tm1"] * 6 + ["tm2"] * 6,
+                "name": [f"Person {i}" for i in range(len(characters))],
+                "character": characters,
+                "role": ["ACTOR"] * len(characters),
+            }
+        )
+        credits_df.loc[11, "id"] = "tm1"
+
+        expected = legacy_normalize_credits(self.normalizer, credits_df)
+        actual = self.normalizer.normalize_credits(credits_df)
+
+        for expected_df, actual_df in zip(expected, actual):
+            pd.testing.assert_frame_equal(actual_df, expected_df)
+
+    def test_normalize_credits_matches_legacy_on_synthetic_data(self):
+        """
+        The outputs are identical on a larger generated credits file.
+        """
+        credits_df = make_credits(5_000)
+
+        expected = legacy_normalize_credits(self.normalizer, credits_df)
+        actual = self.normalizer.normalize_credits(credits_df)
+
+        for expected_df, actual_df in zip(expected, actual):
+            pd.testing.assert_frame_equal(actual_df, expected_df)
+
+    def test_normalize_titles_matches_legacy(self):
+        """
+        Bracket and quote stripping, empty lists, missing values and repeated ids
+        are handled exactly as by the merge-based implementation.
+        """
+        titles_df = pd.DataFrame(
+            {
+                "index": range(6),
+                "id": ["tm1", "tm2", "tm3", "tm4", "tm5", "tm1"],
+                "title": ["A", "B", "C", "D", "E", "A"],
+                "genres": [
+                    "['drama', 'crime']",
+                    "[]",
+                    np.nan,
+                    "['comedy']",
+                    "[']x['",
+                    "['drama', 'crime']",
+                ],
+                "production_countries": [
+                    "['US']",
+                    "['US', 'GB']",
+                    "[]",
+                    "['IN']",
+                    "[]",
+                    "['US']",
+                ],
+            }
+        )
+
+        expected = legacy_normalize_titles(self.normalizer, titles_df)
+        actual = self.normalizer.normalize_titles(titles_df)
+
+        for expected_df, actual_df in zip(expected, actual):
+            pd.testing.assert_frame_equal(actual_df, expected_df)
+
+    def test_normalize_titles_matches_legacy_on_synthetic_data(self):
+        """
+        The outputs are identical on a larger generated titles file.
+        """
+        titles_df = make_titles(2_000)
+
+        expected = legacy_normalize_titles(self.normalizer, titles_df)
+        actual = self.normalizer.normalize_titles(titles_df)
+
+        for expected_df, actual_df in zip(expected, actual):
+            pd.testing.assert_frame_equal(actual_df, expected_df)
+
+    def test_id_dictionary_keeps_ids_across_calls(self):
+        """
+        Values keep the id they got first, and only unseen values get new ids.
+        """
+        dictionary = IdDictionary()
+        ids, new_ids, new_values = dictionary.encode(pd.Index(["drama", "crime"]))
+        self.assertEqual(ids.tolist(), [1, 2])
+
+        ids, new_ids, new_values = dictionary.encode(pd.Index(["comedy", "drama"]))
+        self.assertEqual(ids.tolist(), [3, 1])
+        self.assertEqual(new_ids.tolist(), [3])
+        self.assertEqual(new_values.tolist(), ["comedy"])
+
+    def test_seen_rows_drops_rows_of_previous_chunks(self):
+        """
+        Rows passed to an earlier call are dropped, and the others are kept in order.
+        """
+        seen = SeenRows()
+        first = pd.DataFrame({"id": ["a", "b"], "score": [1.0, 2.0]})
+        second = pd.DataFrame({"id": ["c", "b", "a"], "score": [3.0, 2.0, 5.0]})
+
+        self.assertEqual(seen.drop_seen(first)["id"].tolist(), ["a", "b"])
+        self.assertEqual(seen.drop_seen(second)["id"].tolist(), ["c", "a"])
+
+    def test_seen_rows_matches_drop_duplicates_over_many_chunks(self):
+        """
+        Over chunks without duplicates of their own, merged into larger and larger
+        blocks, the kept rows are those drop_duplicates() keeps, and every distinct
+        row is stored once.
+        """
+        rows = pd.DataFrame({"id": np.random.default_rng(0).integers(0, 500, 2_000)})
+        seen = SeenRows()
+        kept = pd.concat(
+            [
+                seen.drop_seen(rows.iloc[start : start + 70].drop_duplicates())
+                for start in range(0, 2_000, 70)
+            ]
+        )
+
+        pd.testing.assert_frame_equal(kept, rows.drop_duplicates())
+        self.assertEqual(len(seen), rows["id"].nunique())
+
+    def test_stream_normalized_data_matches_in_memory(self):
+        """
+        Normalizing the files in small chunks gives the same tables, ids included,
+        as normalizing them in one go.
+        """
+        titles_df = make_titles(1_000)
+        credits_df = make_credits(3_000)
+        # Duplicate rows spread over several chunks
+        titles_df = pd.concat([titles_df, titles_df.head(10)], ignore_index=True)
+        titles_df["index"] = np.arange(len(titles_df))
+
+        with tempfile.TemporaryDirectory() as directory:
+            self.normalizer.titles_path = Path(directory) / "titles.csv"
+            self.normalizer.credits_path = Path(directory) / "credits.csv"
+            titles_df.to_csv(self.normalizer.titles_path, index=False)
+            credits_df.to_csv(self.normalizer.credits_path, index=False)
+
+            expected = self.normalizer.process_and_save_data()
+            chunks = {}
+            for table_name, chunk in self.normalizer.stream_normalized_data(128):
+                chunks.setdefault(table_name, []).append(chunk)
+
+        self.assertEqual(set(chunks), set(expected))
+        for table_name, expected_df in expected.items():
+            actual_df = pd.concat(chunks[table_name])
+            self.assertEqual(len(set(str(c.dtypes) for c in chunks[table_name])), 1)
+            pd.testing.assert_frame_equal(
+                actual_df.reset_index(drop=True),
+                expected_df.reset_index(drop=True),
+                check_dtype=False,
+            )
+
+    def test_reuse_ids(self):
+        """
+        Values already in the database keep their ids, new values get ids after the
+        largest existing one, and the link table follows.
+        """
+        dataframes = {
+            "genres": pd.DataFrame(
+                {"genre": ["comedy", "drama"], "genre_id": [1, 2]}, index=[1, 2]
+            ),
+            "movie_genres": pd.DataFrame(
+                {"id": ["tm1", "tm1", "tm2"], "genre_id": [1.0, 2.0, np.nan]}
+            ),
+        }
+        existing = {"genres": pd.DataFrame({"genre": ["drama"], "genre_id": [7]})}
+
+        renumbered = self.normalizer.reuse_ids(dataframes, existing)
+
+        self.assertEqual(renumbered["genres"]["genre_id"].tolist(), [8, 7])
+        self.assertEqual(renumbered["genres"].index.tolist(), [8, 7])
+        pd.testing.assert_series_equal(
+            renumbered["movie_genres"]["genre_id"],
+            pd.Series([8.0, 7.0, np.nan], name="genre_id"),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import unittest
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+from api.sqlite_data_api import SQLiteDataAPI
+from scripts.compact_dtypes import compact_dataframes, compact_dtypes
+from scripts.data_loader import DataLoader
+
+CREDITS = pd.DataFrame(
+    {
+        "person_id": [3748, 14658, 7064, 3748, 2**40],
+        "id": ["tm84618", "tm84618", "tm84618", "tm127384", "tm127384"],
+        "name": ["Robert De Niro", "Jodie Foster", "Albert Brooks", "Al Pacino", None],
+        "role": ["ACTOR", "ACTOR", "ACTOR", "ACTOR", "DIRECTOR"],
+        "character_id": [1, 2, 3, 4, 5],
+        "imdb_votes": [795222.0, 530877.0, np.nan, 12.0, 7.0],
+        "imdb_score": [8.2, 7.8, 6.9, 8.3, np.nan],
+        "mixed": ["a", 1, "b", 2, None],
+    }
+)
+
+
+class TestCompactDtypes(unittest.TestCase):
+    """
+    Unit tests for the conversion of normalized tables to compact dtypes.
+    """
+
+    def test_dtypes(self):
+        """
+        Repetitive strings become categoricals, other strings Arrow strings, ids the
+        smallest integer holding them and floats float32 only when exact.
+        """
+        compacted = compact_dtypes(CREDITS.drop(columns="person_id").head(4))
+        self.assertEqual(
+            compacted.dtypes.astype(str).to_dict(),
+            {
+                "id": "category",
+                "name": "string",
+                "role": "category",
+                "character_id": "int16",
+                "imdb_votes": "float32",
+                "imdb_score": "float64",
+                "mixed": "object",
+            },
+        )
+        self.assertEqual(compact_dtypes(CREDITS)["person_id"].dtype, np.int64)
+        self.assertEqual(compact_dtypes(CREDITS.head(4))["person_id"].dtype, np.int16)
+
+    def test_values_are_unchanged(self):
+        """
+        Every value, missing ones included, survives the conversion.
+        """
+        compacted = compact_dtypes(CREDITS)
+        for column in CREDITS.columns:
+            with self.subTest(column=column):
+                self.assertEqual(
+                    compacted[column].astype(object).isna().tolist(),
+                    CREDITS[column].isna().tolist(),
+                )
+                self.assertEqual(
+                    compacted[column].dropna().astype(object).tolist(),
+                    CREDITS[column].dropna().astype(object).tolist(),
+                )
+
+    def test_empty_table_is_kept(self):
+        """
+        Tables without rows keep their dtypes, so their columns stay text.
+        """
+        empty = pd.DataFrame(columns=["recommendation_id", "title", "datestamp"])
+        self.assertIs(compact_dtypes(empty), empty)
+
+    def test_memory_report(self):
+        """
+        The report has the memory of every table before and after, and shrinks.
+        """
+        compacted, report = compact_dataframes({"credits": CREDITS})
+        self.assertEqual(list(compacted), ["credits"])
+        self.assertEqual(
+            report["credits"]["before"],
+            CREDITS.memory_usage(deep=True).sum(),
+        )
+        self.assertLess(report["credits"]["after"], report["credits"]["before"])
+
+
+class TestDataLoaderCompaction(unittest.TestCase):
+    """
+    Tests that DataLoader loads compacted tables with the schema of the original ones.
+    """
+
+    def test_load_keeps_schema(self):
+        """
+        The loaded tables are compacted in memory, while the database gets the
+        column types and values of the original dtypes.
+        """
+        api = SQLiteDataAPI()
+        with patch("scripts.data_loader.DataNormalizer") as normalizer, patch.object(
+            DataLoader, "load_additional_data"
+        ):
+            normalizer.return_value.process_and_save_data.return_value = {
+                "credits": CREDITS.drop(columns="mixed")
+            }
+            loader = DataLoader(api, max_workers=1)
+        del loader.dataframes["best_movies"]
+
+        self.assertEqual(loader.dataframes["credits"]["role"].dtype, "category")
+        self.assertEqual(loader.column_types["credits"]["character_id"], "BIGINT")
+        self.assertEqual(
+            loader.column_types["credits"]["imdb_votes"], "DOUBLE PRECISION"
+        )
+        self.assertIn("credits", loader.memory_report)
+
+        loader.load_csv_to_db()
+        loaded = api.select_data("SELECT * FROM credits")
+        pd.testing.assert_frame_equal(loaded, CREDITS.drop(columns="mixed"))
+        api.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
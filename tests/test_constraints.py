@@ -0,0 +1,91 @@
+import threading
+import unittest
+import pandas as pd
+from scripts.constraints import FOREIGN_KEYS, PRIMARY_KEYS, DatabaseConstraints
+
+
+class FakeAPI:
+    """
+    Stand-in for DataAPI that records the statements instead of running them.
+    """
+
+    def __init__(self, primary_keys=None, constraints=(), failing=()):
+        self.primary_keys = primary_keys or {}
+        self.constraints = list(constraints)
+        self.failing = failing
+        self.statements = []
+        self.lock = threading.Lock()
+
+    def select_data(self, query, params=None, use_cache=True):
+        return pd.DataFrame({"conname": self.constraints})
+
+    def primary_key(self, table_name):
+        return self.primary_keys.get(table_name, [])
+
+    def administrative_query(self, query, params=None, autocommit=False):
+        with self.lock:
+            self.statements.append((query, autocommit))
+        if any(failing in query for failing in self.failing):
+            raise RuntimeError("deadlock detected")
+
+
+class TestDatabaseConstraints(unittest.TestCase):
+    """
+    Unit tests for the post-load constraint and index phase.
+    """
+
+    def test_phases(self):
+        """
+        Foreign keys are added NOT VALID and validated afterwards, indexes are built
+        concurrently in autocommit mode and every table is analyzed.
+        """
+        api = FakeAPI()
+        results = DatabaseConstraints(api).setup_constraints()
+        statements = [statement for statement, _ in api.statements]
+
+        for name, table, *_ in FOREIGN_KEYS:
+            added = next(i for i, s in enumerate(statements) if f" {name} " in s)
+            validated = statements.index(
+                f"ALTER TABLE {table} VALIDATE CONSTRAINT {name};"
+            )
+            self.assertIn("NOT VALID", statements[added])
+            self.assertLess(added, validated)
+
+        indexes = [(s, a) for s, a in api.statements if "CREATE INDEX" in s]
+        self.assertTrue(indexes)
+        self.assertTrue(all("CONCURRENTLY" in s and a for s, a in indexes))
+        for table in PRIMARY_KEYS:
+            self.assertIn((f"ANALYZE {table};", True), api.statements)
+        self.assertEqual(len(results), len(api.statements))
+        self.assertTrue(all(result["error"] is None for result in results))
+
+    def test_existing_constraints_are_skipped(self):
+        """
+        Primary keys, foreign keys and the recommendations setup already in place are
+        not added again.
+        """
+        api = FakeAPI(
+            primary_keys={**PRIMARY_KEYS, "recommendations": ["recommendation_id"]},
+            constraints=[name for name, *_ in FOREIGN_KEYS],
+        )
+        DatabaseConstraints(api).setup_constraints()
+
+        self.assertFalse(any("ALTER TABLE" in s for s, _ in api.statements))
+
+    def test_failed_index_is_dropped(self):
+        """
+        A failed concurrent index build is reported and its invalid index dropped.
+        """
+        api = FakeAPI(failing=("idx_credits_id ON",))
+        results = DatabaseConstraints(api).setup_constraints()
+
+        failed = [result for result in results if result["error"]]
+        self.assertEqual(len(failed), 1)
+        self.assertIn("idx_credits_id", failed[0]["statement"])
+        self.assertIn(
+            ("DROP INDEX CONCURRENTLY IF EXISTS idx_credits_id;", True), api.statements
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
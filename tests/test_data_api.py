@@ -0,0 +1,95 @@
+import threading
+import time
+import unittest
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+from api.data_api import DataAPI, iter_chunks
+from api.sql_types import sql_type_for
+
+
+class TestCopyLoaderHelpers(unittest.TestCase):
+    """
+    Unit tests for the helpers behind the COPY-based DataAPI.load_data_to_db.
+    """
+
+    def test_sql_type_for(self):
+        """
+        Column types follow the DataFrame dtypes instead of defaulting to TEXT.
+        """
+        df = pd.DataFrame(
+            {
+                "id": np.array([1], dtype="int64"),
+                "genre_id": np.array([1], dtype="int16"),
+                "score": np.array([1.5], dtype="float32"),
+                "runtime": [1.5],
+                "flag": [True],
+                "title": ["Inception"],
+                "datestamp": pd.to_datetime(["2024-01-01"]),
+            }
+        )
+        types = {column: sql_type_for(dtype) for column, dtype in df.dtypes.items()}
+        self.assertEqual(
+            types,
+            {
+                "id": "BIGINT",
+                "genre_id": "SMALLINT",
+                "score": "REAL",
+                "runtime": "DOUBLE PRECISION",
+                "flag": "BOOLEAN",
+                "title": "TEXT",
+                "datestamp": "TIMESTAMP WITHOUT TIME ZONE",
+            },
+        )
+
+    def test_iter_chunks_covers_all_rows(self):
+        """
+        Chunks are sized from the estimated row size and together cover the frame.
+        """
+        df = pd.DataFrame({"id": range(10_000), "title": ["x" * 50] * 10_000})
+        chunks = list(iter_chunks(df, target_bytes=64 * 1024))
+
+        self.assertGreater(len(chunks), 1)
+        pd.testing.assert_frame_equal(pd.concat(chunks), df)
+        self.assertEqual(list(iter_chunks(df.iloc[0:0])), [])
+
+
+class TestDataAPIEngine(unittest.TestCase):
+    """
+    Unit tests for the SQLAlchemy engine DataAPI creates lazily for to_sql.
+    """
+
+    def test_engine_is_created_once_across_threads(self):
+        """
+        Threads asking for the engine at the same time, as concurrent table loads
+        falling back to to_sql do, all get the same single engine.
+        """
+        api = DataAPI(
+            {"host": "localhost", "database": "netflix", "user": "u", "password": "p"}
+        )
+        created = []
+
+        def create_engine(url):
+            time.sleep(0.05)
+            created.append(object())
+            return created[-1]
+
+        engines = []
+        with patch("sqlalchemy.create_engine", create_engine):
+            threads = [
+                threading.Thread(target=lambda: engines.append(api.engine))
+                for _ in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(created), 1)
+        self.assertEqual(engines, created * 4)
+        api._engine = None
+        api.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+import threading
+import time
+import unittest
+from unittest.mock import patch
+import pandas as pd
+from main import DataPipeline
+from scripts.data_loader import DataLoader
+
+
+class FakeAPI:
+    """
+    Stand-in for DataAPI that sleeps instead of loading and tracks concurrency.
+    """
+
+    def __init__(self, delay: float = 0.1, failing: tuple = ()):
+        self.delay = delay
+        self.failing = failing
+        self.loaded = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def load_data_to_db(self, dataframe, table_name, **kwargs):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            if table_name in self.failing:
+                raise RuntimeError("relation is locked")
+            with self.lock:
+                self.loaded.append(table_name)
+        finally:
+            with self.lock:
+                self.active -= 1
+
+    def pool_stats(self):
+        return {"max_size": 10}
+
+
+class TestDataLoader(unittest.TestCase):
+    """
+    Unit tests for the concurrent table loading of DataLoader.
+    """
+
+    def make_loader(self, api, max_workers=4):
+        tables = {f"table_{i}": pd.DataFrame({"id": range(i + 1)}) for i in range(6)}
+        with patch("scripts.data_loader.DataNormalizer") as normalizer, patch.object(
+            DataLoader, "load_additional_data"
+        ):
+            normalizer.return_value.process_and_save_data.return_value = tables
+            loader = DataLoader(api, max_workers=max_workers)
+        del loader.dataframes["best_movies"]
+        return loader
+
+    def test_tables_load_concurrently(self):
+        """
+        Six 0.1s loads on four workers finish in two rounds rather than six.
+        """
+        api = FakeAPI()
+        loader = self.make_loader(api)
+
+        start = time.perf_counter()
+        results = loader.load_csv_to_db()
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(sorted(api.loaded), sorted(loader.dataframes))
+        self.assertEqual(api.max_active, 4)
+        self.assertLess(elapsed, 0.4)
+        self.assertEqual(results["table_5"]["rows"], 6)
+        self.assertTrue(all(r["error"] is None for r in results.values()))
+
+    def test_failing_table_is_isolated(self):
+        """
+        A failing table is reported in the summary and the other tables still load.
+        """
+        api = FakeAPI(delay=0.01, failing=("table_2",))
+        loader = self.make_loader(api, max_workers=2)
+
+        results = loader.load_csv_to_db()
+
+        self.assertEqual(len(api.loaded), 5)
+        self.assertNotIn("table_2", api.loaded)
+        self.assertIn("relation is locked", results["table_2"]["error"])
+
+    def test_streamed_failure_is_reported(self):
+        """
+        In streaming mode every table gets a result, and a table whose chunk failed
+        reports the error and the rows of the chunks loaded before it.
+        """
+        api = FakeAPI(delay=0)
+        chunks = [
+            ("movies", pd.DataFrame({"id": ["a", "b"]})),
+            ("credits", pd.DataFrame({"id": ["a"]})),
+            ("movies", pd.DataFrame({"id": ["c"]})),
+            ("movies", pd.DataFrame({"id": ["d"]})),
+        ]
+        with patch("scripts.data_loader.DataNormalizer") as normalizer:
+            normalizer.return_value.stream_normalized_data.return_value = iter(chunks)
+            loader = DataLoader(api, chunk_size=2)
+        calls = []
+
+        def load_data_to_db(df, key, **kwargs):
+            calls.append((key, kwargs["if_exists"]))
+            if len(calls) == 3:
+                raise RuntimeError("disk full")
+
+        api.load_data_to_db = load_data_to_db
+        with patch.object(DataLoader, "stream_additional_data", return_value=[]):
+            results = loader.load_csv_to_db()
+
+        self.assertEqual(
+            calls, [("movies", "replace"), ("credits", "replace"), ("movies", "append")]
+        )
+        self.assertEqual(results["movies"]["rows"], 2)
+        self.assertEqual(results["movies"]["error"], "disk full")
+        self.assertIsNone(results["credits"]["error"])
+
+    def test_pipeline_stops_after_failed_load(self):
+        """
+        The neighbor index, constraints and permissions are not built on top of a
+        table that failed to load.
+        """
+        pipeline = DataPipeline(FakeAPI(), chunk_size=2)
+        with patch("main.DataLoader") as loader, patch.object(
+            DataPipeline, "setup_logging"
+        ), patch.object(
+            DataPipeline, "build_neighbor_index"
+        ) as build_neighbor_index, patch.object(
+            DataPipeline, "setup_database_constraints"
+        ) as setup_constraints:
+            loader.return_value.load_csv_to_db.return_value = {
+                "movies": {"rows": 2, "seconds": 0.1, "error": "disk full"}
+            }
+            pipeline.run_pipeline()
+
+        build_neighbor_index.assert_not_called()
+        setup_constraints.assert_not_called()
+        self.assertIsNone(pipeline.tables)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import psycopg2
+from database.database_connection import (
+    ConnectionPool,
+    DatabaseConnection,
+    PoolTimeout,
+)
+
+
+def make_connection():
+    """
+    Builds a mocked psycopg2 connection that reports an open, idle session.
+    """
+    connection = MagicMock()
+    connection.closed = 0
+    connection.info.transaction_status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+    return connection
+
+
+class TestConnectionPool(unittest.TestCase):
+    """
+    Unit tests for the ConnectionPool, with psycopg2.connect mocked out.
+    """
+
+    def setUp(self):
+        patcher = patch(
+            "database.database_connection.psycopg2.connect",
+            side_effect=lambda **kwargs: make_connection(),
+        )
+        self.connect_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pool = ConnectionPool({"host": "localhost"}, max_size=2)
+
+    def test_connections_are_reused(self):
+        """
+        A returned connection is handed out again instead of opening a new one.
+        """
+        first = self.pool.getconn()
+        self.pool.putconn(first)
+        second = self.pool.getconn()
+
+        self.assertIs(first, second)
+        self.assertEqual(self.connect_mock.call_count, 1)
+        self.assertEqual(self.pool.stats()["checkouts"], 2)
+
+    def test_open_transaction_is_rolled_back_on_return(self):
+        """
+        Connections returned in the middle of a transaction are reset.
+        """
+        connection = self.pool.getconn()
+        connection.info.transaction_status = (
+            psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+        )
+
+        def rollback():
+            connection.info.transaction_status = (
+                psycopg2.extensions.TRANSACTION_STATUS_IDLE
+            )
+
+        connection.rollback.side_effect = rollback
+        self.pool.putconn(connection)
+
+        connection.rollback.assert_called_once()
+        self.assertEqual(self.pool.stats()["idle"], 1)
+
+    def test_closed_connection_is_replaced(self):
+        """
+        A connection that was closed while idle is discarded at checkout.
+        """
+        connection = self.pool.getconn()
+        self.pool.putconn(connection)
+        connection.closed = 1
+
+        replacement = self.pool.getconn()
+
+        self.assertIsNot(connection, replacement)
+        self.assertEqual(self.pool.stats()["health_check_failures"], 1)
+
+    def test_checkout_times_out_when_pool_is_exhausted(self):
+        """
+        Checkouts beyond max_size wait and then raise PoolTimeout.
+        """
+        self.pool.checkout_timeout = 0.01
+        self.pool.getconn()
+        self.pool.getconn()
+
+        with self.assertRaises(PoolTimeout):
+            self.pool.getconn()
+        stats = self.pool.stats()
+        self.assertEqual(stats["checked_out"], 2)
+        self.assertEqual(stats["timeouts"], 1)
+
+    def test_database_connection_returns_connection_to_pool(self):
+        """
+        DatabaseConnection.connect borrows from the pool and gives the connection back.
+        """
+        db_connection = DatabaseConnection({"host": "localhost"}, {"max_size": 1})
+        with db_connection.connect() as conn:
+            self.assertEqual(db_connection.pool_stats()["checked_out"], 1)
+        with db_connection.connect() as again:
+            self.assertIs(conn, again)
+        self.assertEqual(db_connection.pool_stats()["checked_out"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
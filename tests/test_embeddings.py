@@ -0,0 +1,75 @@
+import unittest
+import numpy as np
+import pandas as pd
+from recommender.embeddings import EmbeddingRecommender, IVFIndex
+
+
+class TestEmbeddingRecommender(unittest.TestCase):
+    """
+    It verifies the description embeddings and the approximate nearest-neighbor index.
+    """
+
+    def setUp(self):
+        topics = [
+            "space astronaut rocket planet mission crew",
+            "detective murder police crime investigation city",
+            "cooking chef kitchen food restaurant competition",
+        ]
+        rng = np.random.default_rng(0)
+        descriptions = []
+        for i in range(120):
+            words = topics[i % 3].split()
+            descriptions.append(" ".join(rng.choice(words, 8)))
+        self.movies = pd.DataFrame(
+            {
+                "id": [f"tm{i}" for i in range(120)],
+                "title": [f"Movie {i}" for i in range(120)],
+                "description": descriptions,
+            }
+        )
+        self.recommender = EmbeddingRecommender.from_frame(
+            self.movies, index=IVFIndex(nlist=6, nprobe=2)
+        )
+
+    def test_recommend_returns_movies_on_the_same_topic(self):
+        """
+        Neighbors share the query movie's topic and exclude the movie itself.
+        """
+        recommendations = self.recommender.recommend("tm0", k=5, nprobe=6)
+
+        self.assertEqual(len(recommendations), 5)
+        for recommendation in recommendations:
+            self.assertNotEqual(recommendation["id"], "tm0")
+            self.assertEqual(int(recommendation["id"][2:]) % 3, 0)
+
+    def test_add_titles_without_rebuild(self):
+        """
+        New titles are searchable after add_titles without retraining the index.
+        """
+        centroids = self.recommender.index.centroids.copy()
+        self.recommender.add_titles(
+            pd.DataFrame(
+                {
+                    "id": ["tm999"],
+                    "title": ["New Movie"],
+                    "description": ["chef kitchen food restaurant"],
+                }
+            )
+        )
+
+        np.testing.assert_array_equal(self.recommender.index.centroids, centroids)
+        recommendations = self.recommender.recommend("tm999", k=3, nprobe=6)
+        self.assertEqual(int(recommendations[0]["id"][2:]) % 3, 2)
+
+    def test_full_probe_matches_brute_force(self):
+        """
+        Scanning every list gives perfect recall in the benchmark.
+        """
+        index = self.recommender.index
+        results = index.benchmark(index.vectors[:10], k=5, nprobes=[index.nlist])
+
+        self.assertEqual(results[-1]["recall"], 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
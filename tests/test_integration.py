@@ -1,6 +1,10 @@
+import tempfile
 import unittest
+from unittest.mock import patch
+import pandas as pd
 from api.data_api import DataAPI
-from config.db_setup import db_config
+from api.query_cache import QueryCache
+from config.db_setup import db_config, pool_config
 
 
 class TestDataAPI(unittest.TestCase):
@@ -12,7 +16,7 @@ class TestDataAPI(unittest.TestCase):
         """
         Creates an instance of the DataAPI to be used in the tests.
         """
-        self.api = DataAPI(db_config)
+        self.api = DataAPI(db_config, pool_config)
 
     def test_update_data(self):
         """
@@ -45,6 +49,64 @@ class TestDataAPI(unittest.TestCase):
                 cursor.execute("ROLLBACK;")
                 raise e
 
+    def test_upsert_dataframes(self):
+        """
+        Only changed rows are written: new keys are inserted, changed rows updated,
+        missing keys deleted, and the primary key of the table is kept.
+        """
+        table = "test_upsert_movies"
+        self.api.load_data_to_db(
+            pd.DataFrame({"id": ["a", "b", "c"], "title": ["A", "B", "C"]}), table
+        )
+        self.api.administrative_query(f"ALTER TABLE {table} ADD PRIMARY KEY (id);")
+        try:
+            stats = self.api.upsert_dataframes(
+                {
+                    table: pd.DataFrame(
+                        {"id": ["a", "b", "d"], "title": ["A", "B2", "D"]}
+                    )
+                },
+                {table: ["id"]},
+            )
+            rows = self.api.select_data(f"SELECT id, title FROM {table} ORDER BY id")
+
+            self.assertEqual(
+                {key: stats[table][key] for key in ("inserted", "updated", "deleted")},
+                {"inserted": 1, "updated": 1, "deleted": 1},
+            )
+            self.assertEqual(rows["title"].tolist(), ["A", "B2", "D"])
+            self.assertEqual(self.api.primary_key(table), ["id"])
+        finally:
+            self.api.administrative_query(f"DROP TABLE {table};")
+
+    def test_select_during_load_is_not_cached_as_fresh(self):
+        """
+        A SELECT that reads a table while it is being reloaded caches the rows from
+        before the commit; the load invalidates the entry once it committed, so the
+        next SELECT misses and sees the new rows.
+        """
+        table = "test_cache_during_load"
+        query = f"SELECT title FROM {table} ORDER BY title"
+        copy_dataframe = DataAPI._copy_dataframe
+
+        def copy_during_select(api, *args, **kwargs):
+            # Runs while the load is in progress, before its commit
+            self.assertEqual(api.select_data(query)["title"].tolist(), ["old"])
+            copy_dataframe(api, *args, **kwargs)
+
+        with tempfile.TemporaryDirectory() as directory:
+            self.api.query_cache = QueryCache(directory)
+            self.api.load_data_to_db(pd.DataFrame({"title": ["old"]}), table)
+            try:
+                with patch.object(DataAPI, "_copy_dataframe", copy_during_select):
+                    self.api.load_data_to_db(pd.DataFrame({"title": ["new"]}), table)
+
+                self.assertEqual(self.api.select_data(query)["title"].tolist(), ["new"])
+                self.assertEqual(self.api.query_cache.stats()["hits"], 0)
+            finally:
+                self.api.query_cache = None
+                self.api.administrative_query(f"DROP TABLE {table};")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,105 @@
+import logging
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from config.logging_config import RateLimitedLog, setup_logging, stop_logging
+
+
+class TestSetupLogging(unittest.TestCase):
+    """
+    Tests for the queue-based logging setup.
+    """
+
+    def setUp(self):
+        self.temporary = tempfile.TemporaryDirectory()
+        self.log_file = Path(self.temporary.name) / "logs" / "test.log"
+        self.root_logger = logging.getLogger()
+        self.level = self.root_logger.level
+
+    def tearDown(self):
+        stop_logging()
+        self.root_logger.setLevel(self.level)
+        self.temporary.cleanup()
+
+    def test_idempotent(self):
+        """
+        Repeated calls attach a single handler, so every record is written once.
+        """
+        handlers = len(self.root_logger.handlers)
+        setup_logging(log_file=str(self.log_file))
+        setup_logging(log_file=str(self.log_file))
+        self.assertEqual(len(self.root_logger.handlers), handlers + 1)
+
+        logging.info("written once")
+        stop_logging()
+        self.assertEqual(len(self.root_logger.handlers), handlers)
+        self.assertEqual(self.log_file.read_text().count("written once"), 1)
+
+    def test_level(self):
+        """
+        Records below the level are not written, and a later call updates the level.
+        """
+        setup_logging(logging.WARNING, log_file=str(self.log_file))
+        logging.info("dropped")
+        setup_logging(logging.INFO)
+        logging.info("kept")
+        stop_logging()
+        content = self.log_file.read_text()
+        self.assertNotIn("dropped", content)
+        self.assertIn("INFO - kept", content)
+
+    def test_level_is_kept_without_argument(self):
+        """
+        A later call without a level, as made by modules setting up logging on
+        import, keeps the level set earlier.
+        """
+        setup_logging(logging.DEBUG, log_file=str(self.log_file))
+        setup_logging()
+        self.assertEqual(self.root_logger.level, logging.DEBUG)
+        setup_logging(logging.WARNING)
+        setup_logging()
+        self.assertEqual(self.root_logger.level, logging.WARNING)
+
+
+class TestRateLimitedLog(unittest.TestCase):
+    """
+    Tests for the rate limit of per-request messages.
+    """
+
+    def test_rate_limit(self):
+        """
+        Repeated messages are suppressed within the interval and counted in the next
+        emitted record; other keys are independent.
+        """
+        log = RateLimitedLog(interval=10.0)
+        with patch("config.logging_config.time.monotonic", return_value=100.0):
+            with self.assertLogs(level="WARNING") as logs:
+                self.assertTrue(log.warning("Writer full: %s", "a"))
+                self.assertFalse(log.warning("Writer full: %s", "b"))
+                self.assertFalse(log.warning("Writer full: %s", "c"))
+                self.assertTrue(log.error("Other: %s", "d"))
+        with patch("config.logging_config.time.monotonic", return_value=111.0):
+            with self.assertLogs(level="WARNING") as later:
+                self.assertTrue(log.warning("Writer full: %s", "e"))
+
+        self.assertEqual(
+            logs.output, ["WARNING:root:Writer full: a", "ERROR:root:Other: d"]
+        )
+        self.assertEqual(
+            later.output,
+            ["WARNING:root:Writer full: e (2 similar messages suppressed)"],
+        )
+
+    def test_disabled_level(self):
+        """
+        Messages below the root level are neither emitted nor counted.
+        """
+        log = RateLimitedLog()
+        with patch.object(logging.getLogger(), "isEnabledFor", return_value=False):
+            self.assertFalse(log.info("No movies found"))
+        self.assertEqual(log._state, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
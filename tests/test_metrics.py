@@ -0,0 +1,165 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+import pandas as pd
+from api.sqlite_data_api import SQLiteDataAPI
+from monitoring.metrics import MetricsRegistry, metrics
+from recommender.recommender import MoviesRecommender
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    """
+    Unit tests for the counters, gauges, histograms and exports of MetricsRegistry.
+    """
+
+    def setUp(self):
+        self.registry = MetricsRegistry(enabled=True)
+
+    def test_disabled_registry_records_nothing(self):
+        """
+        A disabled registry skips recording and does not evaluate label callables.
+        """
+        registry = MetricsRegistry()
+        registry.inc("calls_total")
+        with registry.timed("call", labels=lambda: self.fail("labels evaluated")) as t:
+            t.rows = 3
+        with registry.profile("stage"):
+            pass
+        self.assertEqual(
+            registry.to_json(), {"counters": {}, "gauges": {}, "histograms": {}}
+        )
+
+    def test_timed_records_latency_rows_and_errors(self):
+        """
+        timed fills the histogram, adds the rows set on the timer and counts failures.
+        """
+        with self.registry.timed("call", table="movies") as timer:
+            timer.rows = 10
+        with self.assertRaises(RuntimeError):
+            with self.registry.timed("call", labels=lambda: {"table": "movies"}):
+                raise RuntimeError("failed")
+
+        exported = self.registry.to_json()
+        (histogram,) = exported["histograms"]["call_seconds"]
+        self.assertEqual(histogram["labels"], {"table": "movies"})
+        self.assertEqual(histogram["count"], 2)
+        self.assertEqual(histogram["buckets"]["+Inf"], 2)
+        self.assertEqual(exported["counters"]["call_rows_total"][0]["value"], 10)
+        self.assertEqual(exported["counters"]["call_errors_total"][0]["value"], 1)
+
+    def test_prometheus_format(self):
+        """
+        The text export has typed, prefixed series with escaped labels and cumulative
+        histogram buckets.
+        """
+        self.registry.inc("queries_total", 2, table='say "hi"')
+        self.registry.set_gauge("rows", 5, table="movies")
+        self.registry.observe("query_seconds", 0.003)
+        self.registry.observe("query_seconds", 100.0)
+
+        text = self.registry.to_prometheus()
+        self.assertIn("# TYPE netflix_queries_total counter", text)
+        self.assertIn('netflix_queries_total{table="say \\"hi\\""} 2', text)
+        self.assertIn('netflix_rows{table="movies"} 5', text)
+        self.assertIn('netflix_query_seconds_bucket{le="0.0025"} 0', text)
+        self.assertIn('netflix_query_seconds_bucket{le="0.005"} 1', text)
+        self.assertIn('netflix_query_seconds_bucket{le="+Inf"} 2', text)
+        self.assertIn("netflix_query_seconds_count 2", text)
+
+    def test_profile_captures_stats_and_memory(self):
+        """
+        A profiled stage is timed, dumps its cProfile stats and records its peak
+        traced memory.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            self.registry.enable(profile_dir=directory, trace_memory=True)
+            with self.registry.profile("load_data"):
+                data = [0] * 100_000
+            del data
+            self.assertTrue((Path(directory) / "load_data.prof").exists())
+
+        exported = self.registry.to_json()
+        self.assertEqual(
+            exported["histograms"]["pipeline_stage_seconds"][0]["count"], 1
+        )
+        (peak,) = exported["gauges"]["pipeline_stage_peak_memory_bytes"]
+        self.assertGreater(peak["value"], 800_000)
+
+    def test_dump(self):
+        """
+        dump writes JSON, or the text format for a .prom file.
+        """
+        self.registry.inc("calls_total")
+        with tempfile.TemporaryDirectory() as directory:
+            self.registry.dump(Path(directory) / "metrics.json")
+            self.registry.dump(Path(directory) / "metrics.prom")
+            exported = json.loads((Path(directory) / "metrics.json").read_text())
+            text = (Path(directory) / "metrics.prom").read_text()
+        self.assertEqual(exported["counters"]["calls_total"][0]["value"], 1)
+        self.assertIn("netflix_calls_total 1", text)
+
+
+class TestInstrumentation(unittest.TestCase):
+    """
+    Tests for the metrics recorded by the backends and the recommender.
+    """
+
+    def setUp(self):
+        metrics.reset()
+        metrics.enable()
+        self.api = SQLiteDataAPI(
+            dataframes={"best_movies": pd.DataFrame({"TITLE": ["A", "B", "C"]})}
+        )
+
+    def tearDown(self):
+        self.api.close()
+        metrics.disable()
+        metrics.reset()
+
+    def _series(self, name):
+        return {
+            (entry["labels"]["method"], entry["labels"].get("table")): entry
+            for entry in metrics.to_json()["histograms"].get(name, [])
+        }
+
+    def test_backend_calls(self):
+        """
+        Backend calls are labeled with the method, statement type and table, and
+        count the rows they return or load.
+        """
+        self.api.select_data('SELECT "TITLE" FROM best_movies')
+        self.api.update_data("INSERT INTO best_movies VALUES (%s)", ("D",))
+
+        series = self._series("db_call_seconds")
+        select = series[("select_data", "best_movies")]
+        self.assertEqual(select["labels"]["statement"], "select")
+        self.assertEqual(select["labels"]["backend"], "sqlite")
+        self.assertEqual(
+            series[("update_data", "best_movies")]["labels"]["statement"], "insert"
+        )
+        self.assertIn(("load_data_to_db", "best_movies"), series)
+
+        rows = {
+            entry["labels"]["method"]: entry["value"]
+            for entry in metrics.to_json()["counters"]["db_call_rows_total"]
+        }
+        self.assertEqual(rows, {"load_data_to_db": 3, "select_data": 3})
+
+    def test_recommender_calls(self):
+        """
+        Public recommender calls are timed by method.
+        """
+        recommender = MoviesRecommender(self.api, neighbor_index_dir=None)
+        recommender.get_random_recommendation()
+        recommender.get_random_recommendations(2)
+
+        series = self._series("recommender_call_seconds")
+        self.assertEqual(
+            set(series),
+            {("get_random_recommendation", None), ("get_random_recommendations", None)},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+import pandas as pd
+from benchmarks.synthetic import make_credits, make_titles
+from scripts.clean_normalize import DataNormalizer
+from scripts.normalized_cache import CACHED_TABLES, NormalizedCache
+
+
+class TestNormalizedCache(unittest.TestCase):
+    """
+    Unit tests for the Feather cache of normalized DataFrames.
+    """
+
+    def setUp(self):
+        self.temporary = tempfile.TemporaryDirectory()
+        self.directory = Path(self.temporary.name)
+        self.cache = NormalizedCache(self.directory / "cache")
+
+        self.normalizer = DataNormalizer("raw_titles.csv", "raw_credits.csv")
+        self.normalizer.titles_path = self.directory / "titles.csv"
+        self.normalizer.credits_path = self.directory / "credits.csv"
+        make_titles(200).to_csv(self.normalizer.titles_path, index=False)
+        make_credits(600).to_csv(self.normalizer.credits_path, index=False)
+        self.paths = [self.normalizer.titles_path, self.normalizer.credits_path]
+
+    def tearDown(self):
+        self.temporary.cleanup()
+
+    def test_round_trip(self):
+        """
+        Cached tables come back identical, index and dtypes included.
+        """
+        dataframes = self.normalizer.process_and_save_data()
+        tables = {name: dataframes[name] for name in CACHED_TABLES}
+        key = self.cache.key(self.paths, 1)
+
+        self.assertIsNone(self.cache.load(key))
+        self.cache.save(key, tables)
+        loaded = self.cache.load(key)
+
+        self.assertEqual(set(loaded), set(tables))
+        for name, df in tables.items():
+            pd.testing.assert_frame_equal(loaded[name], df)
+
+    def test_key_follows_content_and_version(self):
+        """
+        The key changes with the file contents and the normalizer version, and a
+        file rewritten with the same contents keeps its key.
+        """
+        key = self.cache.key(self.paths, 1)
+        self.assertEqual(self.cache.key(self.paths, 1), key)
+        self.assertNotEqual(self.cache.key(self.paths, 2), key)
+
+        contents = self.normalizer.titles_path.read_bytes()
+        self.normalizer.titles_path.write_bytes(contents + b"\n")
+        self.assertNotEqual(self.cache.key(self.paths, 1), key)
+
+        self.normalizer.titles_path.write_bytes(contents)
+        os.utime(self.normalizer.titles_path, ns=(0, 0))
+        self.assertEqual(self.cache.key(self.paths, 1), key)
+
+    def test_process_and_save_data_uses_cache(self):
+        """
+        The second run loads the tables from the cache instead of normalizing, unless
+        a rebuild is requested, and clear() empties the cache.
+        """
+        expected = self.normalizer.process_and_save_data(self.cache)
+
+        with patch.object(
+            self.normalizer, "normalize_titles", side_effect=AssertionError
+        ):
+            cached = self.normalizer.process_and_save_data(self.cache)
+            with self.assertRaises(AssertionError):
+                self.normalizer.process_and_save_data(self.cache, rebuild=True)
+
+        self.assertEqual(set(cached), set(expected))
+        for name, df in expected.items():
+            pd.testing.assert_frame_equal(cached[name], df, check_dtype=False)
+
+        self.cache.clear()
+        self.assertFalse(self.cache.directory.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+from benchmarks.synthetic import make_credits, make_titles
+from scripts.clean_normalize import DataNormalizer
+from scripts.parallel_normalize import shard_bounds
+
+
+class TestParallelNormalize(unittest.TestCase):
+    """
+    It verifies that normalizing on several processes gives the tables, ids and
+    positions included, of a sequential run.
+    """
+
+    def setUp(self):
+        self.temporary = tempfile.TemporaryDirectory()
+        self.normalizer = DataNormalizer("raw_titles.csv", "raw_credits.csv")
+        self.normalizer.titles_path = Path(self.temporary.name) / "titles.csv"
+        self.normalizer.credits_path = Path(self.temporary.name) / "credits.csv"
+        make_titles(500).to_csv(self.normalizer.titles_path, index=False)
+
+    def tearDown(self):
+        self.temporary.cleanup()
+
+    def _assert_matches_sequential(self, credits_df: pd.DataFrame) -> None:
+        credits_df.to_csv(self.normalizer.credits_path, index=False)
+        expected = self.normalizer.process_and_save_data()
+        with patch("scripts.parallel_normalize.MIN_SHARD_ROWS", 500):
+            actual = self.normalizer.process_and_save_data(workers=3)
+
+        self.assertEqual(list(actual), list(expected))
+        for table_name, expected_df in expected.items():
+            with self.subTest(table=table_name):
+                pd.testing.assert_frame_equal(actual[table_name], expected_df)
+
+    def test_matches_sequential(self):
+        """
+        Credits sharded by contiguous ids are merged into the sequential result.
+        """
+        self._assert_matches_sequential(make_credits(3_000))
+
+    def test_matches_sequential_with_scattered_ids(self):
+        """
+        When the rows of a title are spread over the file, duplicates in different
+        blocks are still dropped.
+        """
+        credits_df = make_credits(3_000)
+        credits_df = pd.concat([credits_df, credits_df.head(200)], ignore_index=True)
+        credits_df = credits_df.sample(frac=1, random_state=0, ignore_index=True)
+        credits_df["index"] = np.arange(len(credits_df))
+        self._assert_matches_sequential(credits_df)
+
+    def test_shard_bounds(self):
+        """
+        Blocks cover every row once and are only cut where the id changes.
+        """
+        ids = np.array(["a"] * 5 + ["b"] * 3 + ["c"] * 1 + ["d"] * 7, dtype=object)
+
+        bounds = shard_bounds(ids, 4)
+
+        self.assertEqual(bounds[0][0], 0)
+        self.assertEqual(bounds[-1][1], len(ids))
+        for (_, stop), (start, _) in zip(bounds, bounds[1:]):
+            self.assertEqual(stop, start)
+            self.assertNotEqual(ids[start - 1], ids[start])
+        self.assertEqual(shard_bounds(ids, 1), [(0, len(ids))])
+
+
+if __name__ == "__main__":
+    unittest.main()
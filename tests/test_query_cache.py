@@ -0,0 +1,171 @@
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+import pandas as pd
+from api import query_cache
+from api.query_cache import INDEX_FILE, QueryCache, read_tables, written_tables
+
+
+class TestQueryCache(unittest.TestCase):
+    """
+    Unit tests for the disk cache of SELECT results.
+    """
+
+    def setUp(self):
+        self.temporary = tempfile.TemporaryDirectory()
+        self.cache = QueryCache(Path(self.temporary.name) / "cache", ttl=60)
+        self.result = pd.DataFrame({"id": [1, 2, 3], "title": ["a", None, "c"]})
+
+    def tearDown(self):
+        self.temporary.cleanup()
+
+    def test_hit_and_miss(self):
+        """
+        A stored result comes back for the same query regardless of whitespace, but
+        not for different parameters, and the counters follow.
+        """
+        query = "SELECT id, title FROM movies WHERE id < %s"
+        self.assertIsNone(self.cache.get(query, (4,)))
+        self.cache.put(query, (4,), self.result)
+
+        cached = self.cache.get("SELECT id,  title\n FROM movies WHERE id < %s;", (4,))
+        pd.testing.assert_frame_equal(cached, self.result)
+        self.assertIsNone(self.cache.get(query, (5,)))
+
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 2))
+        self.assertEqual(stats["entries"], 1)
+
+    def test_ttl(self):
+        """
+        Entries older than the TTL are dropped when read.
+        """
+        self.cache.put("SELECT * FROM movies", None, self.result)
+        with patch("api.query_cache.time.time", return_value=time.time() + 61):
+            self.assertIsNone(self.cache.get("SELECT * FROM movies"))
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+    def test_lru_eviction(self):
+        """
+        When the cache outgrows max_bytes the least recently used entry goes first.
+        """
+        for i in range(3):
+            self.cache.put(f"SELECT * FROM movies WHERE id = {i}", None, self.result)
+        self.cache.get("SELECT * FROM movies WHERE id = 0")
+        self.cache.max_bytes = self.cache.stats()["bytes"]
+
+        self.cache.put("SELECT * FROM movies WHERE id = 3", None, self.result)
+
+        self.assertIsNotNone(self.cache.get("SELECT * FROM movies WHERE id = 0"))
+        self.assertIsNone(self.cache.get("SELECT * FROM movies WHERE id = 1"))
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    def test_invalidation(self):
+        """
+        Writing to a table drops the entries reading it and leaves the others, and a
+        result whose query started before the write is not kept.
+        """
+        started = time.time()
+        self.cache.put(
+            "SELECT m.title FROM movies m JOIN credits c ON m.id = c.id",
+            None,
+            self.result,
+        )
+        self.cache.put("SELECT * FROM genres", None, self.result)
+
+        self.assertEqual(self.cache.invalidate(["CREDITS"]), 1)
+        self.assertIsNotNone(self.cache.get("SELECT * FROM genres"))
+
+        self.cache.put("SELECT * FROM credits", None, self.result, started)
+        self.assertIsNone(self.cache.get("SELECT * FROM credits"))
+
+    def test_comma_join_invalidation(self):
+        """
+        Writing to any table of a comma-separated FROM list drops the entry.
+        """
+        query = "SELECT m.title FROM movies m, credits c WHERE m.id = c.id"
+        self.cache.put(query, None, self.result)
+        self.assertEqual(self.cache.invalidate(["credits"]), 1)
+        self.assertIsNone(self.cache.get(query))
+
+    def test_hits_do_not_write_the_index(self):
+        """
+        Hits are counted in memory and written with the next index update or flush.
+        """
+        self.cache.put("SELECT * FROM movies", None, self.result)
+        index = Path(self.temporary.name) / "cache" / INDEX_FILE
+        written = index.stat().st_mtime_ns
+        with patch.object(self.cache, "_write_index") as write_index:
+            self.assertIsNotNone(self.cache.get("SELECT * FROM movies"))
+            write_index.assert_not_called()
+        self.assertEqual(index.stat().st_mtime_ns, written)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+        self.cache.flush()
+        other = QueryCache(self.cache.directory)
+        self.assertEqual(other.stats()["hits"], 1)
+
+    @unittest.skipIf(query_cache.fcntl is None, "no fcntl file locks")
+    def test_concurrent_updates_are_not_lost(self):
+        """
+        An invalidation by another process while an index update is in flight waits
+        for it, instead of being overwritten by the index read before.
+        """
+        other = QueryCache(self.cache.directory)
+        self.cache.put("SELECT * FROM genres", None, self.result)
+        read_index = self.cache._read_index
+
+        def slow_read_index():
+            index = read_index()
+            time.sleep(0.2)
+            return index
+
+        with patch.object(self.cache, "_read_index", slow_read_index):
+            writer = threading.Thread(
+                target=self.cache.put, args=("SELECT * FROM movies", None, self.result)
+            )
+            writer.start()
+            time.sleep(0.05)
+            self.assertEqual(other.invalidate(["genres"]), 1)
+            writer.join()
+
+        index = other._read_index()
+        self.assertIn("genres", index["invalidated"])
+        self.assertEqual(
+            [entry["sql"] for entry in index["entries"].values()],
+            ["SELECT * FROM movies"],
+        )
+
+    def test_table_names(self):
+        """
+        Read and written tables are found regardless of case, quoting and schema.
+        """
+        self.assertEqual(
+            read_tables('select * from public."Movies" m left join credits c on true'),
+            {"movies", "credits"},
+        )
+        self.assertEqual(
+            read_tables(
+                "SELECT * FROM movies m, credits AS c, (SELECT id FROM genres) g, "
+                "LATERAL (SELECT 1 FROM countries) l WHERE m.id = c.id"
+            ),
+            {"movies", "credits", "genres", "countries"},
+        )
+        self.assertEqual(
+            read_tables("SELECT * FROM movies m JOIN credits c USING (id), characters"),
+            {"movies", "credits", "characters"},
+        )
+        self.assertEqual(
+            written_tables("UPDATE movies SET title = 'x'; DELETE FROM credits"),
+            {"movies", "credits"},
+        )
+        self.assertEqual(
+            written_tables("INSERT INTO best_movies VALUES (1)"), {"best_movies"}
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+from recommender.recommendation_writer import RecommendationWriter
+
+
+class TestRecommendationWriter(unittest.TestCase):
+    """
+    It verifies that recommendations are written in batches and flushed on close.
+    """
+
+    def setUp(self):
+        self.api_mock = MagicMock()
+
+    def test_titles_are_written_in_batches(self):
+        """
+        Titles are inserted in batches of at most batch_size and all of them are
+        written once the writer is closed.
+        """
+        writer = RecommendationWriter(self.api_mock, batch_size=2, flush_interval=60)
+        for title in ["Inception", "Heat", "Forrest Gump"]:
+            self.assertTrue(writer.record(title))
+        writer.close()
+
+        written = [
+            row[0]
+            for call in self.api_mock.insert_rows.call_args_list
+            for row in call.args[2]
+        ]
+        self.assertEqual(written, ["Inception", "Heat", "Forrest Gump"])
+        self.api_mock.insert_rows.assert_any_call(
+            "recommendations", ["title"], [("Inception",), ("Heat",)]
+        )
+        self.assertEqual(writer.stats()["flushed"], 3)
+
+    def test_titles_are_dropped_when_queue_is_full(self):
+        """
+        When the database cannot keep up, record() gives up after put_timeout and
+        counts the title as dropped.
+        """
+        release = threading.Event()
+        self.api_mock.insert_rows.side_effect = lambda *args: release.wait()
+        writer = RecommendationWriter(
+            self.api_mock,
+            batch_size=1,
+            max_queue_size=1,
+            put_timeout=0.01,
+        )
+        results = [writer.record(f"Movie {i}") for i in range(5)]
+        release.set()
+        writer.close()
+
+        stats = writer.stats()
+        self.assertIn(False, results)
+        self.assertEqual(stats["dropped"], results.count(False))
+        self.assertEqual(stats["flushed"], results.count(True))
+
+    def test_title_recorded_during_close_is_written(self):
+        """
+        A title whose record() call is still putting it on the queue when close()
+        runs is written before the worker stops.
+        """
+        writer = RecommendationWriter(self.api_mock, flush_interval=60)
+        put = writer._queue.put
+        putting = threading.Event()
+
+        def slow_put(item, *args, **kwargs):
+            if item == "Heat":
+                putting.set()
+                time.sleep(0.2)
+            put(item, *args, **kwargs)
+
+        writer._queue.put = slow_put
+        recorder = threading.Thread(target=writer.record, args=("Heat",))
+        recorder.start()
+        putting.wait()
+        writer.close()
+        recorder.join()
+
+        self.assertEqual(writer.stats()["queued"], 1)
+        self.assertEqual(writer.stats()["flushed"], 1)
+        self.api_mock.insert_rows.assert_called_once_with(
+            "recommendations", ["title"], [("Heat",)]
+        )
+        self.assertFalse(writer.record("Alien"))
+
+
+if __name__ == "__main__":
+    unittest.main()
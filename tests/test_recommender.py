@@ -1,6 +1,7 @@
+import asyncio
 import unittest
 from recommender.recommender import MoviesRecommender
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 import pandas as pd
 
 
@@ -31,6 +32,36 @@ class TestMoviesRecommender(unittest.TestCase):
             recommendation = self.recommender.get_random_recommendation()
             self.assertEqual(recommendation, "Inception")
 
+    def test_candidates_are_cached(self):
+        """
+        Test case to verify that candidate titles are read from the database once and
+        then served from memory until they are invalidated.
+        """
+        mock_df = pd.DataFrame({"TITLE": ["Inception", "Forrest Gump"]})
+        self.api_mock.select_data.return_value = mock_df
+
+        for _ in range(3):
+            self.assertIn(
+                self.recommender.get_random_recommendation(),
+                ["Inception", "Forrest Gump"],
+            )
+        self.api_mock.select_data.assert_called_once()
+
+        self.recommender.invalidate_candidates()
+        self.recommender.get_random_recommendation()
+        self.assertEqual(self.api_mock.select_data.call_count, 2)
+
+    def test_get_random_recommendations(self):
+        """
+        Test case to verify that batch recommendations are sampled without replacement.
+        """
+        mock_df = pd.DataFrame({"TITLE": ["Inception", "Forrest Gump", "Heat"]})
+        self.api_mock.select_data.return_value = mock_df
+
+        recommendations = self.recommender.get_random_recommendations(5)
+        self.assertCountEqual(recommendations, ["Inception", "Forrest Gump", "Heat"])
+        self.assertEqual(len(self.recommender.get_random_recommendations(2)), 2)
+
     def test_record_recommendation(self):
         """
         Test case to ensure that record_recommendation method correctly records a
@@ -45,5 +76,58 @@ class TestMoviesRecommender(unittest.TestCase):
         )
 
 
+class TestAsyncMoviesRecommender(unittest.IsolatedAsyncioTestCase):
+    """
+    It verifies the async counterparts of the recommendation methods.
+    """
+
+    def setUp(self):
+        self.api_mock = MagicMock()
+        self.async_api_mock = AsyncMock()
+        self.async_api_mock.select_data.return_value = pd.DataFrame(
+            {"TITLE": ["Inception", "Forrest Gump", "Heat"]}
+        )
+        self.recommender = MoviesRecommender(
+            self.api_mock, async_api=self.async_api_mock
+        )
+
+    async def test_concurrent_requests_share_one_load(self):
+        """
+        Concurrent requests load the candidates once, through the async API.
+        """
+        recommendations = await asyncio.gather(
+            *(self.recommender.aget_random_recommendation() for _ in range(100))
+        )
+
+        self.assertTrue(set(recommendations) <= {"Inception", "Forrest Gump", "Heat"})
+        self.async_api_mock.select_data.assert_awaited_once()
+        self.api_mock.select_data.assert_not_called()
+        self.assertEqual(len(await self.recommender.aget_random_recommendations(5)), 3)
+
+    async def test_arecord_recommendation(self):
+        """
+        Recommendations are recorded through the async API, or queued on the writer
+        without blocking.
+        """
+        await self.recommender.arecord_recommendation("Inception")
+        self.async_api_mock.update_data.assert_awaited_once_with(
+            "INSERT INTO recommendations (title) VALUES (%s)", ("Inception",)
+        )
+
+        self.recommender.writer = MagicMock()
+        await self.recommender.arecord_recommendation("Heat")
+        self.recommender.writer.record.assert_called_once_with("Heat", block=False)
+
+    async def test_falls_back_to_threads(self):
+        """
+        Without an async API the DataAPI queries run in worker threads.
+        """
+        self.api_mock.select_data.return_value = pd.DataFrame({"TITLE": ["Heat"]})
+        recommender = MoviesRecommender(self.api_mock)
+
+        self.assertEqual(await recommender.aget_random_recommendation(), "Heat")
+        self.api_mock.select_data.assert_called_once()
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,139 @@
+import json
+import threading
+import time
+import unittest
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from api.sqlite_data_api import SQLiteDataAPI
+from recommender.recommender import MoviesRecommender
+from recommender.service import MicroBatcher, RecommendationService, make_server
+
+
+def make_api() -> SQLiteDataAPI:
+    """
+    An in-memory backend with four movies: a, b and c share a genre, d shares none.
+    """
+    return SQLiteDataAPI(
+        dataframes={
+            "best_movies": pd.DataFrame({"TITLE": ["Heat", "Ronin", "Alien"]}),
+            "movies": pd.DataFrame(
+                {"id": ["a", "b", "c", "d"], "title": ["A", "B", "C", "D"]}
+            ),
+            "movie_genres": pd.DataFrame(
+                {"id": ["a", "b", "c", "d"], "genre_id": [1, 1, 1, 2]}
+            ),
+            "movie_countries": pd.DataFrame(
+                {"id": ["a", "b", "c"], "country_id": [1, 1, 2]}
+            ),
+            "credits": pd.DataFrame({"person_id": [7, 7], "id": ["a", "b"]}),
+        }
+    )
+
+
+class TestMicroBatcher(unittest.TestCase):
+    """
+    Unit tests for the coalescing of concurrent calls.
+    """
+
+    def test_concurrent_items_share_a_batch(self):
+        """
+        Items submitted within the window are handled in one call, in order.
+        """
+        calls = []
+        batcher = MicroBatcher(
+            lambda items: calls.append(items) or [i * 2 for i in items],
+            max_batch_size=100,
+            max_wait=0.05,
+        )
+        futures = [batcher.submit(i) for i in range(10)]
+
+        self.assertEqual([future.result() for future in futures], list(range(0, 20, 2)))
+        self.assertEqual(calls, [list(range(10))])
+        self.assertEqual(batcher.stats()["max_batch"], 10)
+
+    def test_handler_error_reaches_every_caller(self):
+        """
+        A failing batch raises in every caller instead of leaving them waiting.
+        """
+
+        def fail(items):
+            raise RuntimeError("boom")
+
+        batcher = MicroBatcher(fail, max_wait=0.01)
+        future = batcher.submit(1)
+
+        with self.assertRaises(RuntimeError):
+            future.result(timeout=1)
+
+
+class TestRecommendationService(unittest.TestCase):
+    """
+    End-to-end tests of the HTTP service on the in-memory backend.
+    """
+
+    def setUp(self):
+        self.service = RecommendationService(
+            MoviesRecommender(make_api(), neighbor_index_dir=None), max_wait=0.02
+        )
+        self.service.warm_up()
+        self.server = make_server(self.service, port=0)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def request(self, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        with urllib.request.urlopen(self.url + path, data) as response:
+            return json.loads(response.read())
+
+    def test_endpoints(self):
+        """
+        Random, similar and batch requests are answered, and counted in /metrics.
+        """
+        titles = self.request("/recommend/random?n=2")["titles"]
+        similar = self.request("/recommend/similar/a?k=2")["recommendations"]
+        batch = self.request("/recommend/batch", {"ids": ["c", "zzz"], "k": 1})
+
+        self.assertEqual(len(set(titles)), 2)
+        self.assertTrue(set(titles) <= {"Heat", "Ronin", "Alien"})
+        self.assertEqual([movie["id"] for movie in similar], ["b", "c"])
+        self.assertEqual(len(batch["results"]["c"]), 1)
+        self.assertEqual(batch["results"]["zzz"], [])
+
+        metrics = self.request("/metrics")
+        self.assertEqual(metrics["requests"], 3)
+        self.assertGreater(metrics["endpoints"]["similar"]["p99_ms"], 0)
+
+    def test_concurrent_requests_are_batched(self):
+        """
+        Concurrent similar-movie requests are answered with fewer matrix products
+        than requests.
+        """
+        with ThreadPoolExecutor(16) as executor:
+            answers = list(
+                executor.map(
+                    lambda _: self.request("/recommend/similar/b?k=1"), range(32)
+                )
+            )
+
+        self.assertTrue(all(a["recommendations"][0]["id"] == "a" for a in answers))
+        stats = self.request("/metrics")["batches"]["similar"]
+        self.assertEqual(stats["items"], 32)
+        self.assertLess(stats["batches"], 32)
+
+    def test_bad_request(self):
+        """
+        Invalid parameters are rejected with 400 and unknown paths with 404.
+        """
+        for path, status in (("/recommend/random?n=0", 400), ("/nope", 404)):
+            with self.assertRaises(urllib.error.HTTPError) as raised:
+                self.request(path)
+            self.assertEqual(raised.exception.code, status)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+from recommender.neighbor_index import NeighborIndex
+from recommender.similarity import SimilarityEngine
+
+
+class TestSimilarityEngine(unittest.TestCase):
+    """
+    It verifies that movies sharing genres, countries and cast are ranked as similar.
+    """
+
+    def setUp(self):
+        movies = pd.DataFrame(
+            {
+                "id": ["tm1", "tm2", "tm3", "tm4"],
+                "title": ["Heat", "Collateral", "Up", "Ronin"],
+                "type": ["MOVIE"] * 4,
+                "release_year": [1995, 2004, 2009, 1998],
+                "runtime": [170, 120, 96, 122],
+                "imdb_score": [8.3, 7.5, 8.3, 7.2],
+            }
+        )
+        movie_genres = pd.DataFrame(
+            {"id": ["tm1", "tm2", "tm3", "tm4"], "genre_id": [1, 1, 2, 1]}
+        )
+        movie_countries = pd.DataFrame(
+            {"id": ["tm1", "tm2", "tm3", "tm4"], "country_id": [1, 1, 1, 2]}
+        )
+        credits = pd.DataFrame(
+            {"id": ["tm1", "tm2", "tm4", "tm3"], "person_id": [10, 10, 11, 12]}
+        )
+        self.engine = SimilarityEngine.from_frames(
+            movies, movie_genres, movie_countries, credits
+        )
+
+    def test_recommend_similar_ranks_by_shared_features(self):
+        """
+        The movie sharing genre, country and cast comes first and the query movie
+        itself is never returned.
+        """
+        recommendations = self.engine.recommend_similar("tm1", k=2)
+
+        self.assertEqual([r["id"] for r in recommendations], ["tm2", "tm4"])
+        self.assertGreater(recommendations[0]["score"], recommendations[1]["score"])
+        self.assertLessEqual(recommendations[0]["score"], 1.0)
+
+    def test_batch_matches_single_queries(self):
+        """
+        Batched queries return the same answers as single ones, and unknown ids
+        return an empty list.
+        """
+        batch = self.engine.recommend_similar_batch(["tm2", "missing", "tm3"], k=3)
+
+        self.assertEqual(batch[0], self.engine.recommend_similar("tm2", k=3))
+        self.assertEqual(batch[1], [])
+        self.assertEqual(batch[2], self.engine.recommend_similar("tm3", k=3))
+
+    def test_neighbor_index_round_trip(self):
+        """
+        The precomputed index, built in blocks and memory-mapped back from disk,
+        answers like the engine itself.
+        """
+        index = NeighborIndex.build(self.engine, k=2, block_size=3)
+        with tempfile.TemporaryDirectory() as directory:
+            index.save(directory)
+            loaded = NeighborIndex.load(directory)
+
+            self.assertIsInstance(loaded.neighbors, np.memmap)
+            self.assertEqual(loaded.neighbors.dtype, np.int32)
+            self.assertEqual(loaded.header["k"], 2)
+            for title_id in ["tm1", "tm2", "tm3", "tm4"]:
+                expected = self.engine.recommend_similar(title_id, k=2)
+                actual = loaded.recommend_similar(title_id, k=2)
+                self.assertEqual([r["id"] for r in actual], [r["id"] for r in expected])
+                np.testing.assert_allclose(
+                    [r["score"] for r in actual], [r["score"] for r in expected]
+                )
+            self.assertIsInstance(loaded.order, np.memmap)
+            self.assertEqual(loaded.recommend_similar("tm0"), [])
+            self.assertEqual(loaded.recommend_similar("tm9"), [])
+            del loaded
+
+    def test_neighbor_index_rebuild_is_atomic(self):
+        """
+        An index is read whole from one build: a rebuild interrupted before its
+        header is written leaves the previous index readable, a finished one
+        replaces it and removes its arrays, and arrays of the wrong length are
+        rejected.
+        """
+        first = NeighborIndex.build(self.engine, k=1)
+        second = NeighborIndex.build(self.engine, k=2)
+        replace = os.replace
+
+        def fail_on_header(source, target):
+            if Path(target).name == "header.json":
+                raise OSError("disk full")
+            replace(source, target)
+
+        with tempfile.TemporaryDirectory() as directory:
+            first.save(directory)
+            with patch("recommender.neighbor_index.os.replace", fail_on_header):
+                with self.assertRaises(OSError):
+                    second.save(directory)
+            self.assertEqual(NeighborIndex.load(directory, mmap=False).k, 1)
+
+            second.save(directory)
+            self.assertEqual(NeighborIndex.load(directory, mmap=False).k, 2)
+            self.assertEqual(len(list(Path(directory).glob("*.npy"))), 5)
+
+            header = Path(directory) / "header.json"
+            header.write_text(json.dumps({**second.header, "count": 3}))
+            with self.assertRaises(ValueError):
+                NeighborIndex.load(directory)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+from benchmarks.startup import (
+    STARTUP_BUDGET_MS,
+    heavy_imports,
+    import_times,
+    startup_time,
+)
+
+
+class TestStartupTime(unittest.TestCase):
+    """
+    Enforces the import time budget of the entry points measured with -X importtime.
+    """
+
+    def test_entry_points(self):
+        """
+        Importing an entry point stays within its budget and does not import pandas,
+        SQLAlchemy, SciPy, Arrow or the .env loader.
+        """
+        for module, budget in STARTUP_BUDGET_MS.items():
+            with self.subTest(module=module):
+                milliseconds, times = startup_time(module)
+                self.assertEqual(heavy_imports(times), [])
+                self.assertLess(milliseconds, budget)
+
+    def test_embedded_backends_without_postgres_driver(self):
+        """
+        The SQLite and DuckDB backends import neither psycopg2 nor the PostgreSQL
+        backend, so they run where the driver is not installed.
+        """
+        for module in ["api.sqlite_data_api", "api.duckdb_data_api"]:
+            with self.subTest(module=module):
+                times = import_times(module)
+                self.assertNotIn("psycopg2", times)
+                self.assertNotIn("api.data_api", times)
+
+
+if __name__ == "__main__":
+    unittest.main()